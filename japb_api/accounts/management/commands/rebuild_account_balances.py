@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from japb_api.accounts.models import Account, AccountBalance
+from japb_api.transactions.models import Transaction
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the running balance ledger of the accounts from their transactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report the accounts whose ledger doesn't match their transactions",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # locked before the totals are read, saves wait for the rebuild
+            # instead of having their delta overwritten
+            balances = AccountBalance.lock(Account.objects.values_list("pk", flat=True))
+            totals = dict(
+                Transaction.objects.values("account")
+                .annotate(total=Sum("amount"))
+                .values_list("account", "total")
+            )
+
+            mismatches = []
+            for account_id, current in balances.items():
+                expected = totals.get(account_id) or 0
+                if current != expected:
+                    mismatches.append((account_id, current, expected))
+
+            for account_id, current, expected in mismatches:
+                self.stdout.write(
+                    f"Account {account_id}: ledger balance {current}, expected {expected}"
+                )
+
+            if options["check"]:
+                if mismatches:
+                    raise CommandError(f"{len(mismatches)} account balances are out of sync")
+                self.stdout.write(self.style.SUCCESS("Account balances are in sync"))
+                return
+
+            AccountBalance.objects.bulk_create(
+                [
+                    AccountBalance(account_id=account_id, balance=expected)
+                    for account_id, _, expected in mismatches
+                ],
+                update_conflicts=True,
+                unique_fields=["account"],
+                update_fields=["balance", "updated_at"],
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"{len(mismatches)} account balances rebuilt"))
@@ -0,0 +1,50 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_account_balances(apps, schema_editor):
+    Account = apps.get_model("accounts", "Account")
+    AccountBalance = apps.get_model("accounts", "AccountBalance")
+    Transaction = apps.get_model("transactions", "Transaction")
+
+    totals = dict(
+        Transaction.objects.values("account")
+        .annotate(total=models.Sum("amount"))
+        .values_list("account", "total")
+    )
+    AccountBalance.objects.bulk_create(
+        [
+            AccountBalance(account_id=account_id, balance=totals.get(account_id) or 0)
+            for account_id in Account.objects.values_list("pk", flat=True)
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("accounts", "0003_account_user"),
+        ("transactions", "0013_transactionitem"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AccountBalance",
+            fields=[
+                (
+                    "account",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="ledger",
+                        serialize=False,
+                        to="accounts.account",
+                    ),
+                ),
+                ("balance", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate_account_balances, migrations.RunPython.noop),
+    ]
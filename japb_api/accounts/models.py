@@ -1,5 +1,67 @@
 from django.db import models
-from ..currencies.models import Currency
+from django.db.models.functions import Coalesce
+from ..core.money import to_decimal
+from ..currencies.models import Currency, CurrencyConversionHistorial
+
+
+class AccountQuerySet(models.QuerySet):
+    def with_balance_summary(self):
+        """
+        Loads the currency and ledger balance of the accounts in the same query
+        and annotates the latest conversion rate of their currency to USD.
+        """
+        latest_conversion = CurrencyConversionHistorial.objects.filter(
+            currency_from=models.OuterRef("currency"),
+            currency_to__name="USD",
+        ).order_by("-date")
+
+        return self.select_related("currency", "ledger").annotate(
+            latest_conversion_rate_to_main=models.Subquery(
+                latest_conversion.values("rate")[:1]
+            )
+        )
+
+    def currency_balances(self):
+        """
+        Balance in currency units, as an exact Decimal, and max decimal places
+        of the accounts by currency id, with a single grouped query over the
+        ledgers. The scaled balances are summed by currency and decimal places
+        and added up in Python.
+        """
+        rows = (
+            self.values("currency", "decimal_places")
+            .annotate(balance=models.Sum(Coalesce("ledger__balance", 0)))
+            .order_by()
+        )
+        summaries = {}
+        for row in rows:
+            summary = summaries.setdefault(
+                row["currency"],
+                {"currency": row["currency"], "balance": 0, "max_decimal_places": 0},
+            )
+            summary["balance"] += to_decimal(row["balance"], row["decimal_places"])
+            summary["max_decimal_places"] = max(summary["max_decimal_places"], row["decimal_places"])
+        return summaries
+
+    def with_rate_to_main(self):
+        """
+        Annotates the latest rate of the currency of the accounts to USD. The
+        rate is the one of the default conversion source of the currency, or of
+        any source when it has none. USD accounts have a rate of 1 and accounts
+        without a rate have none.
+        """
+        latest_conversion = CurrencyConversionHistorial.objects.filter(
+            currency_from=models.OuterRef("currency"),
+            currency_to__name="USD",
+            source=Coalesce(models.OuterRef("currency__default_conversion_source"), models.F("source")),
+        ).order_by("-date")
+        rate = models.Case(
+            models.When(currency__name="USD", then=models.Value(1.0)),
+            default=models.Subquery(latest_conversion.values("rate")[:1]),
+            output_field=models.FloatField(),
+        )
+
+        return self.annotate(rate_to_main=rate)
 
 
 class Account(models.Model):
@@ -10,5 +72,68 @@ class Account(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AccountQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.name}"
+
+    def get_balance(self) -> int:
+        try:
+            return self.ledger.balance
+        except AccountBalance.DoesNotExist:
+            return 0
+
+
+# Running balance of an account, kept in sync with its transactions so
+# reading a balance doesn't need to sum the whole transaction history.
+# The balance is stored as an integer just like transactions.
+class AccountBalance(models.Model):
+    account = models.OneToOneField(
+        Account, primary_key=True, related_name="ledger", on_delete=models.CASCADE
+    )
+    balance = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.account} {self.balance}"
+
+    @classmethod
+    def apply_delta(cls, account_id, delta):
+        if not delta:
+            return
+
+        updated = cls.objects.filter(account_id=account_id).update(
+            balance=models.F("balance") + delta
+        )
+        if updated:
+            return
+
+        # first movement of the account, create its ledger entry
+        _, created = cls.objects.get_or_create(
+            account_id=account_id, defaults={"balance": delta}
+        )
+        if not created:
+            cls.objects.filter(account_id=account_id).update(
+                balance=models.F("balance") + delta
+            )
+
+    @classmethod
+    def lock(cls, account_ids):
+        """
+        Locks the ledger rows of the accounts until the end of the database
+        transaction, missing rows are created first with a zero balance.
+        Returns the balances by account id.
+        """
+        account_ids = list(account_ids)
+        cls.objects.bulk_create(
+            [cls(account_id=account_id) for account_id in account_ids],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        # always in the same order, like the grouped ledger updates
+        return dict(
+            cls.objects.select_for_update()
+            .filter(account_id__in=account_ids)
+            .order_by("account_id")
+            .values_list("account_id", "balance")
+        )
@@ -0,0 +1,136 @@
+"""
+Net worth of a user in USD. The current net worth comes from a single query
+over the accounts, their ledgers and the latest rates, and is broken down by
+currency and account. The history sums the end balances of the monthly
+account reports, converted with the rate at the end of every month.
+"""
+from datetime import datetime, time
+from decimal import Decimal
+from django.db import models
+from django.utils import timezone
+
+from japb_api.core.money import format_amount, format_decimal, to_decimal
+from japb_api.currencies.rates import get_rate_timeline
+from japb_api.reports.models import ReportAccount
+from .models import Account
+
+MAIN_CURRENCY = "USD"
+
+
+def get_net_worth(user):
+    accounts = (
+        Account.objects.filter(user=user)
+        .with_rate_to_main()
+        .values(
+            "id",
+            "name",
+            "decimal_places",
+            "currency",
+            "currency__name",
+            "ledger__balance",
+            "rate_to_main",
+        )
+        .order_by("currency__name", "name", "id")
+    )
+
+    currencies = {}
+    account_rows = []
+    for account in accounts:
+        currency = currencies.setdefault(
+            account["currency"],
+            {
+                "id": account["currency"],
+                "name": account["currency__name"],
+                "balance": 0,
+                "balance_as_main_currency": 0 if account["rate_to_main"] else None,
+                "rate_to_main": account["rate_to_main"],
+                "decimal_places": 0,
+            },
+        )
+        # the balances in currency units are exact, only the USD amounts use the rates
+        balance = account["ledger__balance"] or 0
+        amount = to_decimal(balance, account["decimal_places"])
+        balance_as_main_currency = None
+        if account["rate_to_main"]:
+            balance_as_main_currency = amount / Decimal(str(account["rate_to_main"]))
+        currency["balance"] += amount
+        currency["decimal_places"] = max(currency["decimal_places"], account["decimal_places"])
+        if currency["balance_as_main_currency"] is not None:
+            currency["balance_as_main_currency"] += balance_as_main_currency
+
+        account_rows.append(
+            {
+                "id": account["id"],
+                "name": account["name"],
+                "currency": account["currency"],
+                "balance": format_amount(balance, account["decimal_places"]),
+                "balance_as_main_currency": format_decimal(balance_as_main_currency, 2),
+            }
+        )
+
+    total = sum(
+        currency["balance_as_main_currency"]
+        for currency in currencies.values()
+        if currency["balance_as_main_currency"] is not None
+    )
+    return {
+        "currency": MAIN_CURRENCY,
+        "total": format_decimal(total, 2),
+        # currencies without a rate to USD are not part of the total
+        "currencies": [
+            {
+                "id": currency["id"],
+                "name": currency["name"],
+                "balance": format_decimal(currency["balance"], currency["decimal_places"]),
+                "balance_as_main_currency": format_decimal(currency["balance_as_main_currency"], 2),
+                "rate_to_main": currency["rate_to_main"],
+            }
+            for currency in currencies.values()
+        ],
+        "accounts": account_rows,
+    }
+
+
+def get_net_worth_history(user, start=None, end=None):
+    """
+    Net worth in USD at the end of every month with account reports, from
+    one grouped query over the reports. The rates come from the cached rate
+    timelines of the currencies.
+    """
+    reports = ReportAccount.objects.filter(user=user)
+    if start:
+        reports = reports.filter(to_date__gte=start)
+    if end:
+        reports = reports.filter(to_date__lte=end)
+
+    balances = (
+        reports.values(
+            "to_date",
+            "account__currency",
+            "account__currency__name",
+            "account__currency__default_conversion_source",
+            "account__decimal_places",
+        )
+        .annotate(end_balance=models.Sum("end_balance"))
+        .order_by("to_date")
+    )
+
+    history = {}
+    for balance in balances:
+        total = history.setdefault(balance["to_date"], 0)
+        # exact in currency units, only the conversion to USD uses the rate
+        amount = to_decimal(balance["end_balance"], balance["account__decimal_places"])
+        if balance["account__currency__name"] == MAIN_CURRENCY:
+            history[balance["to_date"]] = total + amount
+            continue
+
+        timeline = get_rate_timeline(
+            balance["account__currency"],
+            MAIN_CURRENCY,
+            balance["account__currency__default_conversion_source"],
+        )
+        rate = timeline.rate_at(timezone.make_aware(datetime.combine(balance["to_date"], time.max)))
+        if rate:
+            history[balance["to_date"]] = total + amount / Decimal(str(rate))
+
+    return [{"date": date, "total": format_decimal(total, 2)} for date, total in history.items()]
@@ -1,8 +1,8 @@
+from decimal import Decimal
 from rest_framework import serializers
-from django.db.models import Sum
 from .models import Account
-from japb_api.transactions.models import Transaction
-from japb_api.currencies.models import Currency, CurrencyConversionHistorial
+from japb_api.core.money import format_amount, format_decimal, to_decimal
+from japb_api.currencies.rates import get_latest_rate
 
 
 # Serializer for the Account model.
@@ -30,39 +30,40 @@ class AccountSerializer(serializers.ModelSerializer):
         read_only_field = (["id", "created_at", "balance", "balance_as_main_currency"],)
 
     def get_latest_conversion_rate_to_main(self, account):
-        queryset = CurrencyConversionHistorial.objects.filter(
-            currency_from=account.currency.id,
-            currency_to=Currency.objects.get(name="USD"),
-        )
-        conversion = queryset.order_by("-date").first()
-        if conversion:
-            return conversion.rate
-        else:
-            return None
+        # accounts loaded with AccountQuerySet.with_balance_summary
+        # already have the rate annotated
+        if hasattr(account, "latest_conversion_rate_to_main"):
+            return account.latest_conversion_rate_to_main
+
+        return get_latest_rate(account.currency_id, "USD")
 
-    # The get_balance method calculates the balance of the account
-    # using all currency transactions associated with it.
-    # It filters the CurrencyTransaction model for transactions with the current account's id,
-    # sums their amounts using the aggregate method, and returns the balance.
+    # The get_balance method reads the balance of the account
+    # from its running balance ledger, which is kept up to date
+    # every time a transaction of the account is created, updated or deleted.
+    # The balance is the scaled integer of the ledger, to_representation
+    # formats it with the decimal places of the account.
     def get_balance(self, account):
-        queryset = Transaction.objects.filter(account=account.id, user=account.user)
-        amount_sum = queryset.aggregate(total=Sum("amount", default=0))["total"]
-        # the amounts of the accounts where decimal_places is not 2 are divided by decimal_places * 10
-        # if the account uses 2 decimal places, return total
-        return amount_sum / (10**account.decimal_places)
+        return account.get_balance()
 
     def get_balance_as_main_currency(self, account):
         conversion = self.get_latest_conversion_rate_to_main(account)
         if not conversion:
             return None
 
-        return self.get_balance(account) / conversion
+        return to_decimal(self.get_balance(account), account.decimal_places) / Decimal(str(conversion))
 
     def to_representation(self, instance):
         rep = super().to_representation(instance)
-        rep["balance"] = f'{rep["balance"]:.{instance.decimal_places}f}'
+        rep["balance"] = format_amount(rep["balance"], instance.decimal_places)
         if rep["balance_as_main_currency"]:
-            rep[
-                "balance_as_main_currency"
-            ] = f'{rep["balance_as_main_currency"]:.{instance.decimal_places}f}'
+            rep["balance_as_main_currency"] = format_decimal(
+                rep["balance_as_main_currency"], instance.decimal_places
+            )
         return rep
+
+
+class NetWorthQuerySerializer(serializers.Serializer):
+    history = serializers.BooleanField(default=False)
+    # range of the history, by the end date of the monthly reports
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
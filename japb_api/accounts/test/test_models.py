@@ -0,0 +1,96 @@
+from io import StringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from japb_api.core.testing import TestCase
+from japb_api.users.factories import UserFactory
+from japb_api.currencies.models import Currency
+from japb_api.transactions.models import Transaction
+from japb_api.transactions.factories import TransactionFactory, CurrencyExchangeFactory
+from ..models import Account, AccountBalance
+
+
+class TestAccountBalanceLedger(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.currency = Currency.objects.create(name="USD")
+        self.account = Account.objects.create(
+            user=self.user, name="Test Account", currency=self.currency
+        )
+        self.account2 = Account.objects.create(
+            user=self.user, name="Test Account 2", currency=self.currency
+        )
+
+    def test_create_transaction_updates_balance(self):
+        TransactionFactory(amount=1000, account=self.account, user=self.user)
+        TransactionFactory(amount=-250, account=self.account, user=self.user)
+
+        self.assertEqual(Account.objects.get(pk=self.account.pk).get_balance(), 750)
+
+    def test_update_transaction_updates_balance(self):
+        transaction = TransactionFactory(amount=1000, account=self.account, user=self.user)
+
+        transaction = Transaction.objects.get(pk=transaction.pk)
+        transaction.amount = 400
+        transaction.save()
+
+        self.assertEqual(Account.objects.get(pk=self.account.pk).get_balance(), 400)
+
+    def test_moving_transaction_updates_both_balances(self):
+        transaction = TransactionFactory(amount=1000, account=self.account, user=self.user)
+
+        transaction.account = self.account2
+        transaction.save()
+
+        self.assertEqual(Account.objects.get(pk=self.account.pk).get_balance(), 0)
+        self.assertEqual(Account.objects.get(pk=self.account2.pk).get_balance(), 1000)
+
+    def test_delete_transaction_updates_balance(self):
+        TransactionFactory(amount=1000, account=self.account, user=self.user)
+        transaction = TransactionFactory(amount=300, account=self.account, user=self.user)
+
+        transaction.delete()
+
+        self.assertEqual(Account.objects.get(pk=self.account.pk).get_balance(), 1000)
+
+    def test_delete_exchange_updates_balance_once(self):
+        exchange = CurrencyExchangeFactory(amount=500, account=self.account, user=self.user)
+        self.assertEqual(Account.objects.get(pk=self.account.pk).get_balance(), 500)
+
+        exchange.delete()
+
+        self.assertEqual(Account.objects.get(pk=self.account.pk).get_balance(), 0)
+
+    def test_rebuild_command_fixes_out_of_sync_balances(self):
+        TransactionFactory(amount=1200, account=self.account, user=self.user)
+        # accounts without movements have no ledger row yet, and are in sync
+        call_command("rebuild_account_balances", "--check", stdout=StringIO())
+
+        AccountBalance.objects.filter(account=self.account).update(balance=999)
+        stdout = StringIO()
+        with self.assertRaises(CommandError):
+            call_command("rebuild_account_balances", "--check", stdout=stdout)
+        self.assertEqual(
+            stdout.getvalue(), f"Account {self.account.pk}: ledger balance 999, expected 1200\n"
+        )
+
+        call_command("rebuild_account_balances", stdout=StringIO())
+
+        self.assertEqual(AccountBalance.objects.get(account=self.account).balance, 1200)
+        self.assertEqual(AccountBalance.objects.get(account=self.account2).balance, 0)
+        call_command("rebuild_account_balances", "--check", stdout=StringIO())
+
+    def test_rebuild_command_locks_the_ledgers_before_reading(self):
+        TransactionFactory(amount=1200, account=self.account, user=self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command("rebuild_account_balances", stdout=StringIO())
+
+        sql = [query["sql"] for query in queries]
+        lock = next(i for i, query in enumerate(sql) if query.startswith('SELECT "accounts_accountbalance"'))
+        totals = next(i for i, query in enumerate(sql) if "SUM(" in query)
+        self.assertLess(lock, totals)
+        if connection.features.has_select_for_update:
+            self.assertIn("FOR UPDATE", sql[lock])
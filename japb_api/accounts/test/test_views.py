@@ -1,12 +1,17 @@
 import pytz
+from datetime import date, datetime
 from faker import Faker
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from japb_api.core.testing import APITestCase
 from japb_api.users.factories import UserFactory
-from japb_api.currencies.models import Currency
+from japb_api.currencies.models import Currency, CurrencyConversionHistorial
+from japb_api.reports.models import ReportAccount
+from japb_api.currencies.factories import CurrencyConversionHistorialFactory
 from japb_api.transactions.factories import TransactionFactory
 from ..models import Account
 
@@ -240,3 +245,199 @@ class TestAccountsViews(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.json()["balance"], "0.00025000")
+
+    def test_api_accounts_list_shows_latest_conversion_rate(self):
+        account = Account.objects.get()
+        ves_currency = Currency.objects.create(name="VES")
+        ves_account = Account.objects.create(
+            name="VES Account", currency=ves_currency, user=self.user
+        )
+        CurrencyConversionHistorialFactory(
+            currency_from=ves_currency,
+            currency_to=self.currency,
+            rate=40.0,
+            date="2024-01-01T00:00:00Z",
+        )
+        CurrencyConversionHistorialFactory(
+            currency_from=ves_currency,
+            currency_to=self.currency,
+            rate=50.0,
+            date="2024-02-01T00:00:00Z",
+        )
+        TransactionFactory(amount=10000, account=ves_account, user=self.user)
+
+        response = self.client.get(reverse("accounts-list"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = {result["id"]: result for result in response.json()["results"]}
+        self.assertEqual(results[ves_account.id]["latest_conversion_rate_to_main"], 50.0)
+        self.assertEqual(results[ves_account.id]["balance"], "100.00")
+        self.assertEqual(results[ves_account.id]["balance_as_main_currency"], "2.00")
+        self.assertIsNone(results[account.id]["latest_conversion_rate_to_main"])
+
+    def test_api_accounts_list_queries_dont_grow_with_accounts(self):
+        url = reverse("accounts-list")
+        with CaptureQueriesContext(connection) as single_account_queries:
+            self.client.get(url)
+
+        ves_currency = Currency.objects.create(name="VES")
+        for i in range(5):
+            account = Account.objects.create(
+                name=f"Account {i}", currency=ves_currency, user=self.user
+            )
+            TransactionFactory(amount=100, account=account, user=self.user)
+            CurrencyConversionHistorialFactory(
+                currency_from=ves_currency, currency_to=self.currency, rate=40.0
+            )
+
+        with CaptureQueriesContext(connection) as many_accounts_queries:
+            response = self.client.get(url)
+
+        self.assertEqual(response.json()["count"], 6)
+        self.assertEqual(len(many_accounts_queries), len(single_account_queries))
+
+
+class TestNetWorthViews(APITestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token.access_token}")
+        self.url = reverse("accounts-net-worth")
+
+        self.usd = Currency.objects.create(name="USD")
+        self.ves = Currency.objects.create(name="VES", default_conversion_source="paralelo")
+        self.ars = Currency.objects.create(name="ARS")
+        self.create_rate(self.ves, "paralelo", 40.0, "2024-01-15T00:00:00")
+        self.create_rate(self.ves, "paralelo", 50.0, "2024-02-15T00:00:00")
+        # not the default source of VES
+        self.create_rate(self.ves, "bcv", 10.0, "2024-02-20T00:00:00")
+
+        self.usd_account = Account.objects.create(name="Cash", currency=self.usd, user=self.user)
+        self.ves_account = Account.objects.create(
+            name="Bank", currency=self.ves, user=self.user, decimal_places=3
+        )
+        self.ars_account = Account.objects.create(name="Pesos", currency=self.ars, user=self.user)
+        TransactionFactory(account=self.usd_account, user=self.user, amount=10000)
+        TransactionFactory(account=self.ves_account, user=self.user, amount=1000000)
+        TransactionFactory(account=self.ars_account, user=self.user, amount=50000)
+        # other users are not included
+        Account.objects.create(name="Cash", currency=self.usd, user=UserFactory())
+
+    def create_rate(self, currency, source, rate, date):
+        conversion = CurrencyConversionHistorial.objects.create(
+            currency_from=currency, currency_to=self.usd, source=source, rate=rate
+        )
+        CurrencyConversionHistorial.objects.filter(pk=conversion.pk).update(
+            date=datetime.fromisoformat(date).replace(tzinfo=pytz.utc)
+        )
+
+    def test_net_worth(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["currency"], "USD")
+        # 100 USD + 1000 VES / 50, ARS has no rate
+        self.assertEqual(response.json()["total"], "120.00")
+        self.assertEqual(
+            response.json()["currencies"],
+            [
+                {
+                    "id": self.ars.id,
+                    "name": "ARS",
+                    "balance": "500.00",
+                    "balance_as_main_currency": None,
+                    "rate_to_main": None,
+                },
+                {
+                    "id": self.usd.id,
+                    "name": "USD",
+                    "balance": "100.00",
+                    "balance_as_main_currency": "100.00",
+                    "rate_to_main": 1.0,
+                },
+                {
+                    "id": self.ves.id,
+                    "name": "VES",
+                    "balance": "1000.000",
+                    "balance_as_main_currency": "20.00",
+                    "rate_to_main": 50.0,
+                },
+            ],
+        )
+        self.assertEqual(
+            [(account["id"], account["balance"]) for account in response.json()["accounts"]],
+            [
+                (self.ars_account.id, "500.00"),
+                (self.usd_account.id, "100.00"),
+                (self.ves_account.id, "1000.000"),
+            ],
+        )
+        self.assertNotIn("history", response.json())
+
+    def test_net_worth_queries_do_not_grow_with_accounts(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+
+        for _ in range(3):
+            account = Account.objects.create(name="Bank", currency=self.ves, user=self.user)
+            TransactionFactory(account=account, user=self.user, amount=100)
+
+        with self.assertNumQueries(len(queries)):
+            self.client.get(self.url)
+
+    def test_net_worth_history(self):
+        for account, to_date, end_balance in [
+            (self.usd_account, date(2024, 1, 31), 5000),
+            (self.ves_account, date(2024, 1, 31), 400000),
+            (self.usd_account, date(2024, 2, 29), 10000),
+            (self.ves_account, date(2024, 2, 29), 1000000),
+            (self.ars_account, date(2024, 2, 29), 50000),
+        ]:
+            ReportAccount.objects.create(
+                user=self.user,
+                account=account,
+                from_date=to_date.replace(day=1),
+                to_date=to_date,
+                end_balance=end_balance,
+            )
+
+        response = self.client.get(self.url, {"history": "true"})
+
+        self.assertEqual(
+            response.json()["history"],
+            [{"date": "2024-01-31", "total": "60.00"}, {"date": "2024-02-29", "total": "120.00"}],
+        )
+
+        response = self.client.get(self.url, {"history": "true", "start": "2024-02-01"})
+        self.assertEqual(response.json()["history"], [{"date": "2024-02-29", "total": "120.00"}])
+
+    def test_net_worth_is_exact(self):
+        account = Account.objects.create(
+            name="Broker", currency=self.usd, user=self.user, decimal_places=3
+        )
+        TransactionFactory(account=account, user=self.user, amount=165)
+
+        response = self.client.get(self.url)
+
+        # converted from the ledger integer, 0.165 rounded half to even
+        rows = {row["id"]: row for row in response.json()["accounts"]}
+        self.assertEqual(rows[account.id]["balance_as_main_currency"], "0.16")
+        self.assertEqual(response.json()["total"], "120.16")
+
+    def test_net_worth_history_is_exact(self):
+        account = Account.objects.create(
+            name="Broker", currency=self.usd, user=self.user, decimal_places=3
+        )
+        ReportAccount.objects.create(
+            user=self.user,
+            account=account,
+            from_date=date(2024, 3, 1),
+            to_date=date(2024, 3, 31),
+            end_balance=165,
+        )
+
+        response = self.client.get(self.url, {"history": "true"})
+
+        # 0.165 rounded half to even, as a float it is just above 0.165
+        self.assertEqual(response.json()["history"], [{"date": "2024-03-31", "total": "0.16"}])
@@ -1,10 +1,13 @@
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, filters
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
 from japb_api.core.permissions import IsOwner
 from .models import Account
-from .serializers import AccountSerializer
+from .net_worth import get_net_worth, get_net_worth_history
+from .serializers import AccountSerializer, NetWorthQuerySerializer
 
 
 class AccountViewSet(viewsets.ModelViewSet):
@@ -15,4 +18,21 @@ class AccountViewSet(viewsets.ModelViewSet):
     ordering = ["name"]
 
     def get_queryset(self):
-        return Account.objects.filter(user=self.request.user)
+        return Account.objects.filter(user=self.request.user).with_balance_summary()
+
+    @action(detail=False, methods=["get"], url_path="net-worth")
+    def net_worth(self, request):
+        """
+        Net worth of the user in USD with its breakdown by currency and by
+        account. With ?history=true, the net worth at the end of every month
+        with reports is included, optionally between ?start= and ?end= dates.
+        """
+        query = NetWorthQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+
+        result = get_net_worth(request.user)
+        if query.validated_data["history"]:
+            result["history"] = get_net_worth_history(
+                request.user, query.validated_data.get("start"), query.validated_data.get("end")
+            )
+        return Response(result)
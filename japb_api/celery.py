@@ -32,4 +32,8 @@ app.conf.beat_schedule = {
         # every first day of the month at 00:00
         'schedule': crontab(minute=0, hour=0),
     },
+    'refresh_dirty_product_lists': {
+        'task': 'japb_api.products.tasks.refresh_dirty_product_lists',
+        'schedule': crontab(minute='*/15'),
+    },
 }
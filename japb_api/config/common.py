@@ -65,9 +65,30 @@ class Common(Configuration):
 
     # Celery Configuration
     CELERY_BROKER_URL = 'redis://redis:6379/0'  # Use Redis as the message broker
+    CELERY_RESULT_BACKEND = 'redis://redis:6379/0'  # Needed to aggregate chord results
     CELERY_ACCEPT_CONTENT = ['json']
     CELERY_TASK_SERIALIZER = 'json'
 
+    # Cache, shared by every web and celery process
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_CACHE_URL', 'redis://redis:6379/1'),
+        }
+    }
+
+    # Users per subtask when rebuilding the reports every night
+    REPORTS_REBUILD_CHUNK_SIZE = int(os.getenv('REPORTS_REBUILD_CHUNK_SIZE', 50))
+
+    # Rows per bulk insert when importing bank statements
+    STATEMENT_IMPORT_CHUNK_SIZE = int(os.getenv('STATEMENT_IMPORT_CHUNK_SIZE', 500))
+
+    # Transactions per UPDATE when recomputing their main currency amounts
+    MAIN_CURRENCY_RECOMPUTE_CHUNK_SIZE = int(os.getenv('MAIN_CURRENCY_RECOMPUTE_CHUNK_SIZE', 1000))
+
+    # Seconds without transaction writes before the product lists of a user are refreshed
+    PRODUCT_LIST_REFRESH_DELAY = int(os.getenv('PRODUCT_LIST_REFRESH_DELAY', 30))
+
     # Postgres
     DATABASES = {
         'default': dj_database_url.config(
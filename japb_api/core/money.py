@@ -0,0 +1,88 @@
+"""
+Amounts are stored as integers scaled by the decimal places of their
+account, 1234.5 in an account with 2 decimal places is 123450. These helpers
+convert between the decimal strings of the API and the scaled integers with
+integer arithmetic, so large balances don't lose precision in a float.
+"""
+from decimal import Decimal, InvalidOperation
+
+
+def parse_amount(value, decimal_places):
+    """
+    Scaled integer of a decimal string or number, digits beyond decimal_places
+    are truncated towards zero. Floats are read from their shortest repr, so
+    0.29 is 29 with 2 decimal places. Raises ValueError for anything that is
+    not a finite number.
+    """
+    if isinstance(value, str):
+        # plain decimal strings are scaled by moving the dot
+        units, _, cents = value.strip().partition(".")
+        if units[-1:].isdecimal() and (cents.isdecimal() or not cents):
+            try:
+                return int(units + cents[:decimal_places].ljust(decimal_places, "0"))
+            except ValueError:
+                # exponents and invalid amounts are left to Decimal
+                pass
+    elif isinstance(value, int) and not isinstance(value, bool):
+        return value * 10**decimal_places
+    elif isinstance(value, float):
+        value = repr(value)
+    try:
+        amount = Decimal(value.strip() if isinstance(value, str) else value)
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"{value!r} is not a valid amount")
+    if not amount.is_finite():
+        raise ValueError(f"{value!r} is not a valid amount")
+    return int(amount.scaleb(decimal_places))
+
+
+def to_decimal(amount, decimal_places):
+    """Exact Decimal in currency units of a scaled integer"""
+    return Decimal(amount).scaleb(-decimal_places)
+
+
+def round_scaled(amount, digits):
+    """Drops the last digits of a scaled integer, rounding half to even"""
+    if digits <= 0:
+        return amount * 10**-digits
+    quotient, remainder = divmod(amount, 10**digits)
+    half = 5 * 10 ** (digits - 1)
+    if remainder > half or (remainder == half and quotient % 2):
+        quotient += 1
+    return quotient
+
+
+def format_amount(amount, decimal_places, places=None):
+    """
+    Decimal string of a scaled integer, "-1234.560" for -1234560 with 3
+    decimal places. With places the amount is shown with that many decimals
+    instead, rounded half to even. None is returned as is.
+    """
+    if amount is None:
+        return None
+    if places is None:
+        places = decimal_places
+    elif places != decimal_places:
+        amount = round_scaled(amount, decimal_places - places)
+
+    if not places:
+        return str(amount)
+    # the digits padded to at least one unit, split at the dot
+    if amount < 0:
+        digits = str(-amount).zfill(places + 1)
+        return f"-{digits[:-places]}.{digits[-places:]}"
+    digits = str(amount).zfill(places + 1)
+    return f"{digits[:-places]}.{digits[-places:]}"
+
+
+def format_decimal(value, places):
+    """
+    Decimal string of an amount in currency units with places decimals, for
+    the values that are already decimals or floats, like amounts converted
+    with a rate. None is returned as is.
+    """
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return format_amount(value, 0, places)
+    return f"{value:.{places}f}"
@@ -1,4 +1,12 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as Base64Error
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 
 
 class LargeResultsSetPagination(PageNumberPagination):
@@ -11,3 +19,96 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = "page_size"
     max_page_size = 100
+
+
+class DateKeysetPagination(StandardResultsSetPagination):
+    """
+    Page number pagination, or keyset pagination on (date, id) from the newest
+    when the request has a cursor parameter, empty for the first page.
+
+    Keyset pages filter on the position of the last item of the previous page
+    instead of using an OFFSET, so they cost the same at any depth, and only
+    count the results with count=true. Their order is always (date, id), a
+    cursor with an ordering parameter is rejected.
+    """
+
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    ordering_query_param = api_settings.ORDERING_PARAM
+    invalid_cursor_message = "Invalid cursor"
+    cursor_ordering_message = "Pages with a cursor are always ordered by date, ordering can't be used."
+
+    keyset = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+
+        if self.ordering_query_param in request.query_params:
+            raise ValidationError({self.ordering_query_param: [self.cursor_ordering_message]})
+
+        self.keyset = True
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request.query_params[self.cursor_query_param])
+
+        self.count = None
+        if request.query_params.get(self.count_query_param) in ("true", "1"):
+            self.count = queryset.count()
+
+        results = list(self.get_keyset_queryset(queryset, position)[:page_size + 1])
+        self.next_position = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            self.next_position = self.get_position(results[-1])
+        return results
+
+    def get_keyset_queryset(self, queryset, position):
+        """The items after the position, from the newest"""
+        queryset = queryset.order_by("-date", "-id")
+        if position:
+            date, pk = position
+            # date__lte bounds the range read from a (date, id) index, the OR
+            # alone is applied as a filter on every row before the position
+            queryset = queryset.filter(Q(date__lt=date) | Q(date=date, id__lt=pk), date__lte=date)
+        return queryset
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+
+        response = {"next": self.get_next_link(), "results": data}
+        if self.count is not None:
+            response = {"count": self.count, **response}
+        return Response(response)
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    def get_position(self, item):
+        # items are model instances or values() rows
+        if isinstance(item, dict):
+            return item["date"], item["id"]
+        return item.date, item.id
+
+    def encode_cursor(self, position):
+        date, pk = position
+        return urlsafe_b64encode(f"{date.isoformat()}|{pk}".encode()).decode()
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            date, pk = urlsafe_b64decode(cursor.encode()).decode().split("|")
+            date = parse_datetime(date)
+            pk = int(pk)
+        except (Base64Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return date, pk
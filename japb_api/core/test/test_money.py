@@ -0,0 +1,81 @@
+from decimal import Decimal
+from django.test import SimpleTestCase
+
+from ..money import format_amount, format_decimal, parse_amount, round_scaled, to_decimal
+
+
+class TestFormatAmount(SimpleTestCase):
+    def test_format_amount(self):
+        self.assertEqual(format_amount(123456, 2), "1234.56")
+        self.assertEqual(format_amount(-123456, 3), "-123.456")
+        self.assertEqual(format_amount(5, 2), "0.05")
+        self.assertEqual(format_amount(-5, 2), "-0.05")
+        self.assertEqual(format_amount(0, 2), "0.00")
+        self.assertEqual(format_amount(-42, 0), "-42")
+        self.assertIsNone(format_amount(None, 2))
+
+    def test_format_large_amounts_exactly(self):
+        # a float can't hold this balance, 1e16 VES with 2 decimal places
+        amount = 10**18 + 1
+        self.assertEqual(format_amount(amount, 2), "10000000000000000.01")
+        self.assertNotEqual(f"{amount / 100:.2f}", "10000000000000000.01")
+
+    def test_format_with_other_places(self):
+        self.assertEqual(format_amount(1234, 3, 2), "1.23")
+        self.assertEqual(format_amount(1235, 3, 2), "1.24")
+        self.assertEqual(format_amount(1225, 3, 2), "1.22")
+        self.assertEqual(format_amount(-1235, 3, 2), "-1.24")
+        self.assertEqual(format_amount(-4, 3, 2), "0.00")
+        self.assertEqual(format_amount(12, 1, 3), "1.200")
+
+    def test_round_scaled(self):
+        self.assertEqual(round_scaled(15, 1), 2)
+        self.assertEqual(round_scaled(25, 1), 2)
+        self.assertEqual(round_scaled(-25, 1), -2)
+        self.assertEqual(round_scaled(-26, 1), -3)
+        self.assertEqual(round_scaled(3, -2), 300)
+
+    def test_format_decimal(self):
+        self.assertEqual(format_decimal(Decimal("1.005"), 2), "1.00")
+        self.assertEqual(format_decimal(Decimal("1.015"), 2), "1.02")
+        self.assertEqual(format_decimal(0.5, 3), "0.500")
+        self.assertEqual(format_decimal(7, 2), "7.00")
+        self.assertIsNone(format_decimal(None, 2))
+
+    def test_to_decimal(self):
+        self.assertEqual(to_decimal(123456, 3), Decimal("123.456"))
+        self.assertEqual(to_decimal(10**20 + 1, 2), Decimal("1000000000000000000.01"))
+
+
+class TestParseAmount(SimpleTestCase):
+    def test_parse_strings(self):
+        self.assertEqual(parse_amount("1234.56", 2), 123456)
+        self.assertEqual(parse_amount(" -50.5 ", 2), -5050)
+        self.assertEqual(parse_amount("0.29", 2), 29)
+        self.assertEqual(parse_amount("1e3", 2), 100000)
+        self.assertEqual(parse_amount("10000000000000000.01", 2), 10**18 + 1)
+
+    def test_parse_numbers(self):
+        # int(0.29 * 100) is 28
+        self.assertEqual(parse_amount(0.29, 2), 29)
+        self.assertEqual(parse_amount(50, 3), 50000)
+        self.assertEqual(parse_amount(Decimal("1.5"), 0), 1)
+
+    def test_truncates_extra_digits(self):
+        self.assertEqual(parse_amount("1.239", 2), 123)
+        self.assertEqual(parse_amount("-1.239", 2), -123)
+        self.assertEqual(parse_amount(0.00040000, 2), 0)
+
+    def test_invalid_amounts(self):
+        for value in ("", "abc", "1,5", "nan", "inf", None, [1]):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    parse_amount(value, 2)
+
+    def test_round_trip(self):
+        for amount in (0, 1, -1, 99, -100, 123456789, -(10**20) - 7):
+            for decimal_places in (0, 2, 3, 8):
+                with self.subTest(amount=amount, decimal_places=decimal_places):
+                    self.assertEqual(
+                        parse_amount(format_amount(amount, decimal_places), decimal_places), amount
+                    )
@@ -0,0 +1,73 @@
+from django import test
+from django.core.cache import cache
+from django.db import connection
+from rest_framework import test as rest_test
+
+from japb_api.currencies.rates import invalidate_rates
+
+
+class IsolatedCacheMixin:
+    """
+    Starts every test with an empty cache. Cached rates and categories are
+    invalidated once a change is committed, which never happens in a test
+    transaction, so the values cached by a test would leak into the next one.
+    """
+
+    def _pre_setup(self):
+        super()._pre_setup()
+        cache.clear()
+        # the latest rates are also kept by the process for a while
+        invalidate_rates()
+
+
+class TestCase(IsolatedCacheMixin, test.TestCase):
+    pass
+
+
+class APITestCase(IsolatedCacheMixin, rest_test.APITestCase):
+    pass
+
+
+class QueryPlanTestMixin:
+    """
+    Assertions over the query plan the database picks for a queryset.
+    Test tables are tiny, so on postgres sequential scans are disabled
+    for the rest of the test transaction to let the planner show which
+    index it would use.
+    """
+
+    def disable_seqscan(self):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def get_query_plan(self, queryset):
+        self.disable_seqscan()
+        return queryset.explain()
+
+    def get_executed_query_plans(self, func, *args, **kwargs):
+        """
+        Plans of the queries run by func, for code that evaluates its
+        querysets instead of returning them
+        """
+        queries = []
+
+        def capture(execute, sql, params, many, context):
+            queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        self.disable_seqscan()
+        with connection.execute_wrapper(capture):
+            func(*args, **kwargs)
+
+        prefix = connection.ops.explain_query_prefix()
+        plans = []
+        with connection.cursor() as cursor:
+            for sql, params in queries:
+                cursor.execute(f"{prefix} {sql}", params)
+                plans.append("\n".join(" ".join(map(str, row)) for row in cursor.fetchall()))
+        return plans
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = self.get_query_plan(queryset)
+        self.assertIn(index_name, plan, f"{index_name} not used by:\n{plan}")
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+class CurrenciesConfig(AppConfig):
+    name = "japb_api.currencies"
+
+    def ready(self):
+        # Import signals here to ensure they are registered when the app is ready
+        from . import signals
+
+        # rates written by data migrations don't send the model signals
+        post_migrate.connect(signals.invalidate_cached_rates, sender=self)
@@ -0,0 +1,164 @@
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from django.core.cache import cache
+
+# A rate fetched from a source, currencies by name
+FetchedRate = namedtuple("FetchedRate", ["currency_from", "currency_to", "source", "rate"])
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class SourceError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    Skips a source after `threshold` consecutive failed fetches for `cooldown`
+    seconds. The state lives in the shared cache, so every worker sees it.
+    After the cooldown a single fetch is tried again, and a new failure opens
+    the circuit right away.
+    """
+
+    def __init__(self, name, threshold=3, cooldown=60 * 60):
+        self.failures_key = f"currencies:circuit:{name}:failures"
+        self.open_key = f"currencies:circuit:{name}:open"
+        self.threshold = threshold
+        self.cooldown = cooldown
+
+    def is_open(self):
+        return cache.get(self.open_key) is not None
+
+    def record_success(self):
+        cache.delete_many([self.failures_key, self.open_key])
+
+    def record_failure(self):
+        # incremented in the cache, concurrent failures of the workers all count
+        cache.add(self.failures_key, 0, 60 * 60 * 24)
+        try:
+            failures = cache.incr(self.failures_key)
+        except ValueError:
+            # the counter expired right after it was added
+            cache.add(self.failures_key, 1, 60 * 60 * 24)
+            failures = 1
+        if failures >= self.threshold:
+            cache.set(self.open_key, True, self.cooldown)
+
+    def reset(self):
+        self.record_success()
+
+
+class ConversionSource:
+    """
+    A source of conversion rates served over HTTP.
+
+    Subclasses set the source `name` stored in the historial, the `url` and
+    the (currency_from, currency_to) `pairs` they serve, and implement `parse`
+    to turn a response into FetchedRates. Registered subclasses are refreshed
+    by update_currency_historial for the pairs in use.
+    """
+
+    name = None
+    url = None
+    pairs = ()
+    headers = {}
+    # (connect, read) seconds
+    timeout = (3.05, 10)
+    retries = 2
+    # seconds before the first retry, doubled on every retry
+    backoff = 1
+    # sources reading the response body in chunks can stop downloading early
+    stream = False
+
+    def __init__(self, url=None, timeout=None, retries=None, backoff=None, pairs=None):
+        if pairs is not None:
+            # only these pairs of the served ones are kept from a fetch
+            self.pairs = tuple(pairs)
+        if url is not None:
+            self.url = url
+        if timeout is not None:
+            self.timeout = timeout
+        if retries is not None:
+            self.retries = retries
+        if backoff is not None:
+            self.backoff = backoff
+        self.circuit_breaker = CircuitBreaker(self.key)
+
+    @property
+    def key(self):
+        return type(self).__name__
+
+    def __str__(self):
+        return self.key
+
+    def parse(self, response):
+        raise NotImplementedError
+
+    def request(self, session):
+        """GETs the url of the source, retrying connection errors and 5xx responses"""
+        for attempt in range(self.retries + 1):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                response = session.get(
+                    self.url, headers=self.headers, timeout=self.timeout, stream=self.stream
+                )
+            except requests.RequestException as error:
+                last_error = SourceError(f"{self}: {error}")
+                continue
+            if response.status_code in RETRY_STATUS_CODES:
+                response.close()
+                last_error = SourceError(f"{self}: HTTP {response.status_code}")
+                continue
+            if response.status_code != 200:
+                response.close()
+                raise SourceError(f"{self}: HTTP {response.status_code}")
+            return response
+        raise last_error
+
+    def fetch(self, session):
+        """
+        Fetched rates of the source, an empty list when the source fails or
+        its circuit is open
+        """
+        if self.circuit_breaker.is_open():
+            print(f"Skipping {self}, too many failures")
+            return []
+
+        try:
+            with self.request(session) as response:
+                rates = [
+                    rate
+                    for rate in self.parse(response)
+                    if (rate.currency_from, rate.currency_to) in self.pairs
+                ]
+            if not rates:
+                raise SourceError(f"{self}: no rates found")
+        except (SourceError, requests.RequestException, ValueError, KeyError) as error:
+            print(f"Failed to fetch rates: {error}")
+            self.circuit_breaker.record_failure()
+            return []
+
+        self.circuit_breaker.record_success()
+        return rates
+
+
+def get_session(pool_size=10):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_rates(sources):
+    """Fetches every source concurrently on a shared pooled session"""
+    if not sources:
+        return []
+
+    with get_session(len(sources)) as session, ThreadPoolExecutor(len(sources)) as executor:
+        results = executor.map(lambda source: source.fetch(session), sources)
+        return [rate for rates in results for rate in rates]
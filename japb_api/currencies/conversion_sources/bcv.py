@@ -0,0 +1,99 @@
+import codecs
+from html.parser import HTMLParser
+
+from .base import ConversionSource, FetchedRate
+from .registry import register
+
+# ids of the blocks of the BCV home page with the official rate of a currency
+BCV_BLOCKS = {
+    "dolar": "USD",
+    "euro": "EUR",
+    "yuan": "CNY",
+    "lira": "TRY",
+    "rublo": "RUB",
+}
+
+
+class BcvRatesParser(HTMLParser):
+    """
+    Incremental parser keeping the text of the first non empty <strong>
+    inside every target block, `done` once every target block has been found
+    """
+
+    def __init__(self, blocks):
+        super().__init__()
+        self.blocks = set(blocks)
+        self.values = {}
+        self._block = None
+        self._depth = 0
+        self._text = None
+
+    @property
+    def done(self):
+        return self.blocks.issubset(self.values)
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "div":
+            if self._block:
+                self._depth += 1
+            else:
+                block = dict(attrs).get("id")
+                if block in self.blocks and block not in self.values:
+                    self._block = block
+                    self._depth = 1
+        elif tag == "strong" and self._block:
+            self._text = []
+
+    def handle_endtag(self, tag):
+        if tag == "div" and self._block:
+            self._depth -= 1
+            if not self._depth:
+                self._block = None
+        elif tag == "strong" and self._text is not None:
+            # the text may come in several pieces when split between chunks
+            value = "".join(self._text).strip()
+            if value and self._block:
+                self.values.setdefault(self._block, value)
+            self._text = None
+
+    def handle_data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+
+def parse_bcv_number(value):
+    """BCV rates use "." for thousands and "," for decimals"""
+    return float(value.replace(".", "").replace(",", "."))
+
+
+@register
+class BcvSource(ConversionSource):
+    """
+    Official VES rates of every currency published on the BCV home page. The
+    page is streamed and the download stops once the blocks of the requested
+    pairs are found.
+    """
+
+    name = "bcv"
+    url = "https://www.bcv.org.ve/"
+    pairs = tuple(("VES", currency) for currency in BCV_BLOCKS.values())
+    stream = True
+    chunk_size = 8 * 1024
+
+    def parse(self, response):
+        blocks = {
+            block: currency
+            for block, currency in BCV_BLOCKS.items()
+            if ("VES", currency) in self.pairs
+        }
+        parser = BcvRatesParser(blocks)
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        for chunk in response.iter_content(self.chunk_size):
+            parser.feed(decoder.decode(chunk))
+            if parser.done:
+                break
+
+        return [
+            FetchedRate("VES", blocks[block], self.name, parse_bcv_number(value))
+            for block, value in parser.values.items()
+        ]
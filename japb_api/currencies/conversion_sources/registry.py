@@ -0,0 +1,70 @@
+import pkgutil
+from importlib import import_module
+from django.core.exceptions import ValidationError
+
+_sources = []
+_discovered = {"done": False}
+
+
+def register(source_class):
+    """
+    Class decorator adding a conversion source to the registry. When several
+    sources serve the same pair and source name, the first registered wins.
+    """
+    if source_class not in _sources:
+        _sources.append(source_class)
+    return source_class
+
+
+def autodiscover():
+    """Imports every module of the conversion_sources package once"""
+    if _discovered["done"]:
+        return
+    package = import_module(__package__)
+    for module in pkgutil.iter_modules(package.__path__):
+        import_module(f"{__package__}.{module.name}")
+    _discovered["done"] = True
+
+
+def get_registered_sources():
+    autodiscover()
+    return list(_sources)
+
+
+def get_source_names():
+    return sorted({source_class.name for source_class in get_registered_sources()})
+
+
+def get_served_pairs():
+    """Every (currency_from, currency_to, source) served by a registered source"""
+    return {
+        (currency_from, currency_to, source_class.name)
+        for source_class in get_registered_sources()
+        for currency_from, currency_to in source_class.pairs
+    }
+
+
+def get_sources_for_pairs(pairs):
+    """
+    One source instance per adapter that serves any of the given
+    (currency_from, currency_to, source) pairs, limited to those pairs so a
+    single request per adapter refreshes all of them. Pairs no registered
+    source serves are ignored.
+    """
+    assigned = {}
+    for currency_from, currency_to, name in sorted(set(pairs)):
+        for source_class in get_registered_sources():
+            if source_class.name == name and (currency_from, currency_to) in source_class.pairs:
+                assigned.setdefault(source_class, []).append((currency_from, currency_to))
+                break
+
+    return [
+        source_class(pairs=assigned[source_class])
+        for source_class in get_registered_sources()
+        if source_class in assigned
+    ]
+
+
+def validate_source_name(value):
+    if value and value not in get_source_names():
+        raise ValidationError(f'"{value}" is not a registered conversion source')
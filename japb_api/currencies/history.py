@@ -0,0 +1,80 @@
+"""
+Rate history of a (currency_from, currency_to, source) bucketed by day, week
+or month. Buckets and their aggregates are computed by the database, the
+open and close rates of every bucket are read with a second query by the
+first and last date of the buckets.
+"""
+from datetime import timedelta
+from django.db.models import Avg, Count, Max, Min
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import CurrencyConversionHistorial
+
+INTERVALS = ("day", "week", "month")
+# the auto interval is the shortest one that keeps the series under this size
+MAX_POINTS = 400
+INTERVAL_DAYS = {"day": 1, "week": 7, "month": 31}
+
+
+def get_interval(start, end):
+    span = end - start
+    for interval in INTERVALS:
+        if span <= timedelta(days=INTERVAL_DAYS[interval] * MAX_POINTS):
+            return interval
+    return INTERVALS[-1]
+
+
+def get_rate_history(currency_from_id, currency_to, source=None, interval=None, start=None, end=None):
+    """
+    (interval, buckets) of the rates in the range, buckets have date, open,
+    high, low, close, avg and count and are sorted by date. Without interval,
+    the shortest one under MAX_POINTS buckets for the range is used.
+    currency_to is the currency name, like the other rate helpers.
+    """
+    queryset = CurrencyConversionHistorial.objects.filter(
+        currency_from=currency_from_id, currency_to__name=currency_to
+    )
+    if source:
+        queryset = queryset.filter(source=source)
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lte=end)
+
+    if interval is None:
+        first_date = start or queryset.order_by("date").values_list("date", flat=True).first()
+        now = timezone.now()
+        interval = get_interval(first_date or now, end or now)
+
+    buckets = list(
+        queryset.annotate(bucket=Trunc("date", interval, tzinfo=timezone.get_current_timezone()))
+        .values("bucket")
+        .annotate(
+            high=Max("rate"),
+            low=Min("rate"),
+            avg=Avg("rate"),
+            count=Count("id"),
+            first_date=Min("date"),
+            last_date=Max("date"),
+        )
+        .order_by("bucket")
+    )
+    if not buckets:
+        return interval, []
+
+    dates = {bucket["first_date"] for bucket in buckets} | {bucket["last_date"] for bucket in buckets}
+    rates = dict(queryset.filter(date__in=dates).order_by("id").values_list("date", "rate"))
+
+    return interval, [
+        {
+            "date": bucket["bucket"],
+            "open": rates[bucket["first_date"]],
+            "high": bucket["high"],
+            "low": bucket["low"],
+            "close": rates[bucket["last_date"]],
+            "avg": bucket["avg"],
+            "count": bucket["count"],
+        }
+        for bucket in buckets
+    ]
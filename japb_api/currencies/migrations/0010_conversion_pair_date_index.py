@@ -0,0 +1,19 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("currencies", "0009_currency_add_eur"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="currencyconversionhistorial",
+            index=models.Index(
+                fields=["currency_from", "currency_to", "source", "-date"],
+                name="conversion_pair_date_idx",
+            ),
+        ),
+    ]
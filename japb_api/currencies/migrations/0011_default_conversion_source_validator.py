@@ -0,0 +1,24 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:41
+
+from django.db import migrations, models
+import japb_api.currencies.conversion_sources.registry
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("currencies", "0010_conversion_pair_date_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="currency",
+            name="default_conversion_source",
+            field=models.CharField(
+                max_length=100,
+                null=True,
+                validators=[
+                    japb_api.currencies.conversion_sources.registry.validate_source_name
+                ],
+            ),
+        ),
+    ]
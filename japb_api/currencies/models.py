@@ -1,5 +1,7 @@
 from django.db import models
 
+from .conversion_sources.registry import validate_source_name
+
 
 class Currency(models.Model):
     # some currencies are global and some are user specific
@@ -7,7 +9,7 @@ class Currency(models.Model):
     name = models.CharField(max_length=100)
     symbol = models.CharField(max_length=5, null=True)
     default_conversion_source = models.CharField(
-        max_length=100, null=True
+        max_length=100, null=True, validators=[validate_source_name]
     )
 
     def __str__(self):
@@ -33,5 +35,14 @@ class CurrencyConversionHistorial(models.Model):
     rate = models.FloatField()
     date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # latest rate of a pair and source
+            models.Index(
+                fields=["currency_from", "currency_to", "source", "-date"],
+                name="conversion_pair_date_idx",
+            )
+        ]
+
     def __str__(self):
         return f"{self.currency_from} to {self.currency_to} - {self.rate}"
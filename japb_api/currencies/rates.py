@@ -0,0 +1,208 @@
+"""
+Conversion rates, cached in two tiers.
+
+Rates only change when update_currency_historial runs, so the latest rate
+and the rate timeline of every (currency_from, currency_to, source) are kept
+in the shared Django cache until the rates are invalidated, and in a
+per-process LRU in front of it. Shared entries are keyed by a version that invalidate_rates() replaces,
+every process checks that version at most once every LOCAL_CACHE_TTL seconds
+and drops its LRU when it changed.
+"""
+import time
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from functools import lru_cache
+from uuid import uuid4
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import OuterRef, Subquery
+
+from .models import CurrencyConversionHistorial
+
+VERSION_KEY = "currencies:rates:version"
+# unix time of the last invalidation, stored along with the version
+CHANGED_AT_KEY = "currencies:rates:changed_at"
+# seconds a process trusts its local copy before checking the shared version
+LOCAL_CACHE_TTL = 30
+# shared entries are replaced by a new version on every invalidation
+SHARED_CACHE_TIMEOUT = 60 * 60 * 24
+
+LatestRate = namedtuple("LatestRate", ["rate", "date"])
+PairRate = namedtuple("PairRate", ["currency_from", "currency_to", "source", "rate", "date"])
+NO_RATE = LatestRate(None, None)
+
+_local = {"version": None, "checked_at": None}
+
+
+class RateTimeline:
+    """
+    Rates of a (currency_from, currency_to, source) sorted by date, as two
+    parallel arrays of timestamps and rates. The rate at a date is found by
+    a binary search over the timestamps.
+    """
+
+    def __init__(self, timestamps=(), rates=()):
+        self.timestamps = array("d", timestamps)
+        self.rates = array("d", rates)
+
+    @classmethod
+    def load(cls, currency_from_id, currency_to, source=None):
+        queryset = CurrencyConversionHistorial.objects.filter(
+            currency_from=currency_from_id, currency_to__name=currency_to
+        )
+        if source:
+            queryset = queryset.filter(source=source)
+
+        timeline = cls()
+        for date, rate in queryset.order_by("date", "id").values_list("date", "rate").iterator():
+            timeline.timestamps.append(date.timestamp())
+            timeline.rates.append(rate)
+        return timeline
+
+    def __len__(self):
+        return len(self.rates)
+
+    def rate_at(self, date):
+        """latest rate at the given date, or None before the first rate"""
+        index = bisect_right(self.timestamps, date.timestamp())
+        return self.rates[index - 1] if index else None
+
+    def rates_at(self, dates):
+        return [self.rate_at(date) for date in dates]
+
+
+def get_version():
+    now = time.monotonic()
+    checked_at = _local["checked_at"]
+    if checked_at is None or now - checked_at > LOCAL_CACHE_TTL:
+        version = cache.get(VERSION_KEY)
+        if version is None:
+            version = uuid4().hex
+            if not cache.add(VERSION_KEY, version, None):
+                version = cache.get(VERSION_KEY, version)
+        if version != _local["version"]:
+            _get_latest_rate.cache_clear()
+            _get_rate_timeline.cache_clear()
+            _get_latest_rates.cache_clear()
+            _local["version"] = version
+        _local["checked_at"] = now
+    return _local["version"]
+
+
+def invalidate_rates():
+    """Drops the cached rates of every process"""
+    cache.set_many({VERSION_KEY: uuid4().hex, CHANGED_AT_KEY: int(time.time())}, None)
+    _local["checked_at"] = None
+
+
+def get_changed_at():
+    """
+    Unix time of the last change of the rates. When the cache lost it the
+    rates are taken as changed now, clients revalidate once more at worst.
+    """
+    changed_at = cache.get(CHANGED_AT_KEY)
+    if changed_at is None:
+        changed_at = int(time.time())
+        if not cache.add(CHANGED_AT_KEY, changed_at, None):
+            changed_at = cache.get(CHANGED_AT_KEY, changed_at)
+    return changed_at
+
+
+def load_latest_rate(currency_from_id, currency_to, source=None):
+    queryset = CurrencyConversionHistorial.objects.filter(
+        currency_from=currency_from_id, currency_to__name=currency_to
+    )
+    if source:
+        queryset = queryset.filter(source=source)
+    conversion = queryset.order_by("-date").values_list("rate", "date").first()
+    return LatestRate(*conversion) if conversion else NO_RATE
+
+
+@lru_cache(maxsize=1024)
+def _get_latest_rate(version, currency_from_id, currency_to, source):
+    key = f"currencies:rates:{version}:{currency_from_id}:{currency_to}:{source or '*'}"
+    latest = cache.get(key)
+    if latest is None:
+        latest = load_latest_rate(currency_from_id, currency_to, source)
+        cache.set(key, tuple(latest), SHARED_CACHE_TIMEOUT)
+    return LatestRate(*latest)
+
+
+def get_latest_conversion(currency_from_id, currency_to="USD", source=None):
+    """
+    Latest (rate, date) of a currency to another one, by the currency_to
+    name. Without source, the latest rate of any source is returned.
+    """
+    return _get_latest_rate(get_version(), currency_from_id, currency_to, source or None)
+
+
+def get_latest_rate(currency_from_id, currency_to="USD", source=None):
+    return get_latest_conversion(currency_from_id, currency_to, source).rate
+
+
+def load_latest_rates():
+    """
+    Latest rate of every (currency_from, currency_to, source) with a single
+    query, DISTINCT ON where the database supports it
+    """
+    queryset = CurrencyConversionHistorial.objects.values_list(
+        "currency_from__name", "currency_to__name", "source", "rate", "date"
+    )
+    if connection.features.can_distinct_on_fields:
+        # the id breaks ties between rates stored at the same time, like the subquery
+        queryset = queryset.order_by(
+            "currency_from", "currency_to", "source", "-date", "-id"
+        ).distinct("currency_from", "currency_to", "source")
+    else:
+        latest = CurrencyConversionHistorial.objects.filter(
+            currency_from=OuterRef("currency_from"),
+            currency_to=OuterRef("currency_to"),
+            source=OuterRef("source"),
+        ).order_by("-date", "-id")
+        queryset = queryset.filter(pk=Subquery(latest.values("pk")[:1]))
+    return [PairRate(*row) for row in queryset]
+
+
+@lru_cache(maxsize=1)
+def _get_latest_rates(version):
+    key = f"currencies:rates:{version}:latest"
+    rates = cache.get(key)
+    if rates is None:
+        rates = [tuple(rate) for rate in load_latest_rates()]
+        cache.set(key, rates, SHARED_CACHE_TIMEOUT)
+    return [PairRate(*rate) for rate in rates]
+
+
+def get_latest_rates():
+    """Latest PairRate of every pair and source, cached like the latest rates"""
+    return _get_latest_rates(get_version())
+
+
+@lru_cache(maxsize=64)
+def _get_rate_timeline(version, currency_from_id, currency_to, source):
+    key = f"currencies:timeline:{version}:{currency_from_id}:{currency_to}:{source or '*'}"
+    timeline = cache.get(key)
+    if timeline is None:
+        timeline = RateTimeline.load(currency_from_id, currency_to, source)
+        cache.set(key, timeline, SHARED_CACHE_TIMEOUT)
+    return timeline
+
+
+def get_rate_timeline(currency_from_id, currency_to="USD", source=None):
+    """
+    Every rate of a currency to another one, loaded once and cached like
+    the latest rates. Without source, the rates of every source are merged.
+    """
+    return _get_rate_timeline(get_version(), currency_from_id, currency_to, source or None)
+
+
+def get_rate_at(currency_from_id, date, currency_to="USD", source=None):
+    """
+    Rate of a currency at the given date. Dates after the latest rate are
+    answered with the latest rate, older dates with the rate timeline.
+    """
+    latest = get_latest_conversion(currency_from_id, currency_to, source)
+    if latest.date is None or date >= latest.date:
+        return latest.rate
+    return get_rate_timeline(currency_from_id, currency_to, source).rate_at(date)
@@ -1,7 +1,10 @@
+from decimal import Decimal
 from rest_framework import serializers
-from .models import Currency, CurrencyConversionHistorial
+from .history import INTERVALS
+from .models import Currency
+from .rates import get_latest_rate
 from japb_api.accounts.models import Account
-from japb_api.accounts.serializers import AccountSerializer
+from japb_api.core.money import format_decimal
 
 
 class CurrencySerializer(serializers.ModelSerializer):
@@ -22,28 +25,23 @@ class CurrencySerializer(serializers.ModelSerializer):
         read_only_field = ["id", "created_at", "balance"]
 
     def get_latest_conversion_rate_to_main(self, currency):
-        try:
-            usd_currency = Currency.objects.get(name="USD")
-        except Currency.DoesNotExist:
+        # only the rates of the default source of the currency are used
+        if not currency.default_conversion_source:
             return None
+        return get_latest_rate(currency.id, "USD", currency.default_conversion_source)
 
-        queryset = CurrencyConversionHistorial.objects.filter(
-            currency_from=currency.id, currency_to=usd_currency, source=currency.default_conversion_source
-        )
-
-        conversion = queryset.order_by("-date").first()
-
-        if conversion:
-            return conversion.rate
-        else:
-            return None
+    def get_currency_balances(self):
+        # a single grouped query for every currency of the request, the
+        # context is shared by the currencies of a list
+        if "currency_balances" not in self.context:
+            self.context["currency_balances"] = Account.objects.filter(
+                user=self.context["request"].user
+            ).currency_balances()
+        return self.context["currency_balances"]
 
     def get_balance(self, currency):
-        queryset = Account.objects.filter(
-            currency=currency.id, user=self.context["request"].user
-        )
-        accounts = AccountSerializer(queryset, many=True).data
-        return sum([float(account["balance"]) for account in accounts])
+        summary = self.get_currency_balances().get(currency.id)
+        return summary["balance"] if summary else 0
 
     def get_balance_as_main_currency(self, currency):
         balance = self.get_balance(currency)
@@ -51,21 +49,35 @@ class CurrencySerializer(serializers.ModelSerializer):
         if not conversion:
             return None
 
-        return balance / conversion
+        return balance / Decimal(str(conversion))
 
     def to_representation(self, instance):
         rep = super().to_representation(instance)
 
-        accounts = Account.objects.filter(
-            currency=instance.id, user=self.context["request"].user
-        )
+        summary = self.get_currency_balances().get(instance.id)
         max_decimal_places = 2  # Default decimal places
-        if accounts.exists():
-            max_decimal_places = max([account.decimal_places for account in accounts])
+        if summary:
+            max_decimal_places = summary["max_decimal_places"]
 
-        rep["balance"] = f'{rep["balance"]:.{max_decimal_places}f}'
+        rep["balance"] = format_decimal(rep["balance"], max_decimal_places)
         if rep["balance_as_main_currency"]:
-            rep[
-                "balance_as_main_currency"
-            ] = f'{rep["balance_as_main_currency"]:.{max_decimal_places}f}'
+            rep["balance_as_main_currency"] = format_decimal(
+                rep["balance_as_main_currency"], max_decimal_places
+            )
         return rep
+
+
+class RateHistoryQuerySerializer(serializers.Serializer):
+    currency_from = serializers.CharField(default="VES")
+    currency_to = serializers.CharField(default="USD")
+    # defaults to the default conversion source of currency_from
+    source = serializers.CharField(required=False)
+    # picked from the range when not given
+    interval = serializers.ChoiceField(choices=INTERVALS, required=False)
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+
+    def validate(self, data):
+        if data.get("start") and data.get("end") and data["start"] > data["end"]:
+            raise serializers.ValidationError({"end": "end must be after start"})
+        return data
@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from .models import Currency, CurrencyConversionHistorial
+from .rates import invalidate_rates
+
+
+# The latest rates are cached until a rate or currency changes, rates
+# written with bulk_create have to call invalidate_rates themselves. The
+# cache is dropped once the change is committed, otherwise a request could
+# cache the old rates again before the new ones are visible.
+def invalidate_cached_rates(sender, **kwargs):
+    transaction.on_commit(invalidate_rates)
+
+
+for model in (Currency, CurrencyConversionHistorial):
+    post_save.connect(invalidate_cached_rates, sender=model)
+    post_delete.connect(invalidate_cached_rates, sender=model)
@@ -1,36 +1,67 @@
+from django.db import transaction
+
 from japb_api.celery import app
+from japb_api.accounts.models import Account
 from japb_api.currencies.models import Currency, CurrencyConversionHistorial
-import japb_api.currencies.conversion_sources.ves_to_eur as ves_to_eur
-import japb_api.currencies.conversion_sources.ves_to_usd as ves_to_usd
+from japb_api.currencies.conversion_sources.base import fetch_rates
+from japb_api.currencies.conversion_sources.registry import get_served_pairs, get_sources_for_pairs
+from japb_api.currencies.rates import invalidate_rates
 
+MAIN_CURRENCY = "USD"
 
-@app.task
-def update_currency_historial():
-    rate = ves_to_usd.VesToUsd.getLatestRate()
-    if rate:
-        CurrencyConversionHistorial.objects.create(
-            currency_from=Currency.objects.get(name="VES"),
-            currency_to=Currency.objects.get(name="USD"),
-            source="paralelo",
-            rate=rate,
-        )
 
-    rate_bcv = ves_to_usd.VesToUsd.getLatestRateBCV()
+def get_pairs_in_use():
+    """
+    Served (currency_from, currency_to, source) pairs from a currency held by
+    an account to the main currency or to another held currency
+    """
+    held = set(Account.objects.values_list("currency__name", flat=True).distinct())
+    targets = held | {MAIN_CURRENCY}
+    return {
+        (currency_from, currency_to, source)
+        for currency_from, currency_to, source in get_served_pairs()
+        if currency_from in held and currency_to in targets and currency_from != currency_to
+    }
 
-    if rate_bcv:
-        CurrencyConversionHistorial.objects.create(
-            currency_from=Currency.objects.get(name="VES"),
-            currency_to=Currency.objects.get(name="USD"),
-            source="bcv",
-            rate=rate_bcv,
-        )
 
-    rate_bcv_eur = ves_to_eur.VesToEur.getLatestRateBCV()
+def get_conversion_sources():
+    """A source per adapter, limited to the pairs in use"""
+    return get_sources_for_pairs(get_pairs_in_use())
+
 
-    if rate_bcv_eur:
-        CurrencyConversionHistorial.objects.create(
-            currency_from=Currency.objects.get(name="VES"),
-            currency_to=Currency.objects.get(name="EUR"),
-            source="bcv",
-            rate=rate_bcv_eur,
+def save_fetched_rates(rates):
+    """Writes the fetched rates with a single insert"""
+    names = {rate.currency_from for rate in rates} | {rate.currency_to for rate in rates}
+    currencies = dict(
+        Currency.objects.filter(name__in=names, user__isnull=True).values_list("name", "pk")
+    )
+
+    conversions = []
+    for rate in rates:
+        if rate.currency_from not in currencies or rate.currency_to not in currencies:
+            print(f"Skipping {rate.currency_from} to {rate.currency_to} rate, unknown currency")
+            continue
+        conversions.append(
+            CurrencyConversionHistorial(
+                currency_from_id=currencies[rate.currency_from],
+                currency_to_id=currencies[rate.currency_to],
+                source=rate.source,
+                rate=rate.rate,
+            )
         )
+
+    CurrencyConversionHistorial.objects.bulk_create(conversions)
+    # bulk_create doesn't send the signals that invalidate the cached rates
+    if conversions:
+        transaction.on_commit(invalidate_rates)
+    return conversions
+
+
+@app.task
+def update_currency_historial():
+    """
+    Fetches the rates of the pairs in use concurrently, with one request per
+    conversion source, and stores them
+    """
+    conversions = save_fetched_rates(fetch_rates(get_conversion_sources()))
+    return f"{len(conversions)} conversion rates updated"
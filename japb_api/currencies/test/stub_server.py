@@ -0,0 +1,61 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer:
+    """
+    Local HTTP server for the conversion source tests. Every path is answered
+    with the next response queued for it: (status, body) tuples, or a number
+    of seconds to hang before answering 200. The hits and the monotonic start
+    time of every request are recorded per path.
+    """
+
+    def __init__(self):
+        self.responses = {}
+        self.hits = {}
+        self.started = {}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.started.setdefault(self.path, []).append(time.monotonic())
+                stub.hits[self.path] = stub.hits.get(self.path, 0) + 1
+                queued = stub.responses.get(self.path) or [(404, "")]
+                response = queued.pop(0) if len(queued) > 1 else queued[0]
+                if isinstance(response, (int, float)):
+                    time.sleep(response)
+                    response = (200, "{}")
+                status, body = response
+                if not isinstance(body, str):
+                    body = json.dumps(body)
+                body = body.encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def respond(self, path, *responses):
+        self.responses[path] = list(responses)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
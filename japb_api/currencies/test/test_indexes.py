@@ -0,0 +1,25 @@
+
+from japb_api.core.testing import QueryPlanTestMixin, TestCase
+from japb_api.currencies.factories import CurrencyFactory
+from japb_api.currencies.models import CurrencyConversionHistorial
+
+
+class TestCurrencyConversionIndexes(QueryPlanTestMixin, TestCase):
+    def setUp(self) -> None:
+        self.currency_from = CurrencyFactory()
+        self.currency_to = CurrencyFactory()
+        for rate in (10, 11, 12):
+            CurrencyConversionHistorial.objects.create(
+                currency_from=self.currency_from,
+                currency_to=self.currency_to,
+                rate=rate,
+                source="BCV",
+            )
+
+    def test_latest_rate_of_pair_uses_index(self) -> None:
+        queryset = CurrencyConversionHistorial.objects.filter(
+            currency_from=self.currency_from,
+            currency_to=self.currency_to,
+            source="BCV",
+        ).order_by("-date")[:1]
+        self.assertUsesIndex(queryset, "conversion_pair_date_idx")
@@ -0,0 +1,138 @@
+from datetime import datetime, timezone
+from django.core.cache import cache
+from freezegun import freeze_time
+
+from japb_api.core.testing import TestCase
+from japb_api.currencies.factories import CurrencyFactory
+from japb_api.currencies.models import CurrencyConversionHistorial
+from japb_api.currencies import rates
+from japb_api.currencies.rates import (
+    CHANGED_AT_KEY,
+    RateTimeline,
+    get_changed_at,
+    get_latest_rate,
+    get_rate_at,
+    load_latest_rates,
+    get_rate_timeline,
+)
+
+
+class TestConversionRates(TestCase):
+    def setUp(self):
+        self.ves = CurrencyFactory(name="VES")
+        self.usd = CurrencyFactory(name="USD")
+        self.old_rate = self.create_rate(20, "bcv", datetime(2023, 1, 1, tzinfo=timezone.utc))
+        self.create_rate(40, "bcv", datetime(2023, 2, 1, tzinfo=timezone.utc))
+        self.create_rate(80, "paralelo", datetime(2023, 1, 15, tzinfo=timezone.utc))
+
+    def create_rate(self, rate, source, date):
+        # date is auto_now_add, it is moved before the rate is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            conversion = CurrencyConversionHistorial.objects.create(
+                currency_from=self.ves, currency_to=self.usd, rate=rate, source=source
+            )
+            CurrencyConversionHistorial.objects.filter(pk=conversion.pk).update(date=date)
+        return conversion
+
+    def test_get_latest_rate(self):
+        self.assertEqual(get_latest_rate(self.ves.id, "USD", "bcv"), 40)
+        self.assertEqual(get_latest_rate(self.ves.id, "USD", "paralelo"), 80)
+        # the latest of any source
+        self.assertEqual(get_latest_rate(self.ves.id, "USD"), 40)
+        self.assertIsNone(get_latest_rate(self.usd.id, "USD"))
+        self.assertIsNone(get_latest_rate(self.ves.id, "EUR"))
+
+    def test_latest_rates_ties_are_broken_by_id(self):
+        date = datetime(2023, 3, 1, tzinfo=timezone.utc)
+        self.create_rate(50, "bcv", date)
+        self.create_rate(45, "bcv", date)
+
+        latest = {(rate.currency_from, rate.source): rate.rate for rate in load_latest_rates()}
+
+        self.assertEqual(latest, {("VES", "bcv"): 45, ("VES", "paralelo"): 80})
+
+    def test_latest_rate_is_cached(self):
+        get_latest_rate(self.ves.id, "USD", "bcv")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(get_latest_rate(self.ves.id, "USD", "bcv"), 40)
+
+        # another process without the rate in its LRU uses the shared cache
+        rates._get_latest_rate.cache_clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_latest_rate(self.ves.id, "USD", "bcv"), 40)
+
+    def test_new_rates_invalidate_the_cache(self):
+        self.assertEqual(get_latest_rate(self.ves.id, "USD", "bcv"), 40)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CurrencyConversionHistorial.objects.create(
+                currency_from=self.ves, currency_to=self.usd, rate=45, source="bcv"
+            )
+            # the cache is kept until the new rate is committed
+            self.assertEqual(get_latest_rate(self.ves.id, "USD", "bcv"), 40)
+        self.assertEqual(get_latest_rate(self.ves.id, "USD", "bcv"), 45)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CurrencyConversionHistorial.objects.filter(rate=45).delete()
+        self.assertEqual(get_latest_rate(self.ves.id, "USD", "bcv"), 40)
+
+    def test_changed_at(self):
+        with freeze_time("2024-01-02 10:00:00"):
+            rates.invalidate_rates()
+        self.assertEqual(get_changed_at(), datetime(2024, 1, 2, 10, tzinfo=timezone.utc).timestamp())
+
+        # lost from the cache, the rates are taken as changed now
+        cache.delete(CHANGED_AT_KEY)
+        with freeze_time("2024-01-03 10:00:00"):
+            self.assertEqual(get_changed_at(), datetime(2024, 1, 3, 10, tzinfo=timezone.utc).timestamp())
+        self.assertEqual(get_changed_at(), datetime(2024, 1, 3, 10, tzinfo=timezone.utc).timestamp())
+
+    def test_get_rate_at(self):
+        get_latest_rate(self.ves.id, "USD", "bcv")
+
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                get_rate_at(self.ves.id, datetime(2023, 3, 1, tzinfo=timezone.utc), "USD", "bcv"),
+                40,
+            )
+        self.assertEqual(
+            get_rate_at(self.ves.id, datetime(2023, 1, 20, tzinfo=timezone.utc), "USD", "bcv"), 20
+        )
+        self.assertIsNone(
+            get_rate_at(self.ves.id, datetime(2022, 12, 1, tzinfo=timezone.utc), "USD", "bcv")
+        )
+
+    def test_rate_timeline(self):
+        timeline = RateTimeline.load(self.ves.id, "USD", "bcv")
+
+        self.assertEqual(len(timeline), 2)
+        self.assertIsNone(timeline.rate_at(datetime(2022, 12, 31, tzinfo=timezone.utc)))
+        self.assertEqual(timeline.rate_at(datetime(2023, 1, 1, tzinfo=timezone.utc)), 20)
+        self.assertEqual(timeline.rate_at(datetime(2023, 1, 31, tzinfo=timezone.utc)), 20)
+        self.assertEqual(timeline.rate_at(datetime(2023, 2, 1, tzinfo=timezone.utc)), 40)
+        self.assertEqual(
+            timeline.rates_at(
+                [
+                    datetime(2023, 1, 20, tzinfo=timezone.utc),
+                    datetime(2023, 1, 16, tzinfo=timezone.utc),
+                ]
+            ),
+            [20, 20],
+        )
+        # every source merged
+        timeline = RateTimeline.load(self.ves.id, "USD")
+        self.assertEqual(timeline.rate_at(datetime(2023, 1, 20, tzinfo=timezone.utc)), 80)
+
+    def test_rate_timeline_is_cached(self):
+        get_latest_rate(self.ves.id, "USD", "bcv")
+        get_rate_timeline(self.ves.id, "USD", "bcv")
+
+        rates._get_rate_timeline.cache_clear()
+        with self.assertNumQueries(0):
+            timeline = get_rate_timeline(self.ves.id, "USD", "bcv")
+            # historical lookups resolve in memory
+            for day in range(1, 32):
+                get_rate_at(self.ves.id, datetime(2023, 1, day, tzinfo=timezone.utc), "USD", "bcv")
+
+        self.assertEqual(list(timeline.rates), [20, 40])
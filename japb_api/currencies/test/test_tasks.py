@@ -0,0 +1,267 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase
+
+from japb_api.core.testing import TestCase
+from japb_api.accounts.factories import AccountFactory
+from japb_api.currencies.models import Currency, CurrencyConversionHistorial
+from japb_api.currencies.rates import get_latest_rate
+from japb_api.currencies.conversion_sources.base import CircuitBreaker, FetchedRate, fetch_rates
+from japb_api.currencies.conversion_sources.bcv import BcvSource
+from japb_api.currencies.conversion_sources.ves_to_usd import VesToUsdParalelo
+from japb_api.currencies.conversion_sources.registry import (
+    get_registered_sources,
+    get_source_names,
+    get_sources_for_pairs,
+)
+from japb_api.currencies.tasks import get_conversion_sources, get_pairs_in_use, save_fetched_rates
+from .stub_server import StubServer
+
+BCV_PAGE = """
+<html><body>
+<div id="euro"><div class="field-content">
+<div><span> EUR </span><strong> 1.234,56780000 </strong></div>
+</div></div>
+<div id="yuan"><div><strong> 40,12345678 </strong></div></div>
+<div id="lira"><div><strong> 9,87654321 </strong></div></div>
+<div id="rublo"><div><strong> 3,50000000 </strong></div></div>
+<div id="dolar"><div><strong> 160,50000000 </strong></div></div>
+</body></html>
+"""
+
+
+class TestUpdateCurrencyHistorial(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = StubServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.ves, _ = Currency.objects.get_or_create(name="VES")
+        self.usd, _ = Currency.objects.get_or_create(name="USD")
+        self.eur, _ = Currency.objects.get_or_create(name="EUR")
+        self.server.responses.clear()
+        self.server.hits.clear()
+        self.server.started.clear()
+        self.server.respond("/paralelo", (200, {"fuente": "paralelo", "promedio": 243.81}))
+        self.server.respond("/bcv", (200, BCV_PAGE))
+
+        self.sources = [
+            VesToUsdParalelo(url=self.server.url("/paralelo"), backoff=0),
+            BcvSource(url=self.server.url("/bcv"), backoff=0, pairs=[("VES", "USD"), ("VES", "EUR")]),
+        ]
+        for source in self.sources:
+            source.circuit_breaker.reset()
+
+    def get_rates(self):
+        return set(
+            CurrencyConversionHistorial.objects.values_list(
+                "currency_from__name", "currency_to__name", "source", "rate"
+            )
+        )
+
+    def test_fetch_and_save_all_sources(self):
+        get_latest_rate(self.ves.id, "USD", "bcv")
+
+        with self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(2):
+            save_fetched_rates(fetch_rates(self.sources))
+
+        self.assertEqual(
+            self.get_rates(),
+            {
+                ("VES", "USD", "paralelo", 243.81),
+                ("VES", "USD", "bcv", 160.5),
+                ("VES", "EUR", "bcv", 1234.5678),
+            },
+        )
+        # the cached rates are invalidated
+        self.assertEqual(get_latest_rate(self.ves.id, "USD", "bcv"), 160.5)
+
+    def test_sources_are_fetched_concurrently(self):
+        self.server.respond("/paralelo", 1, (200, {"promedio": 243.81}))
+        self.server.respond("/bcv", 1, (200, BCV_PAGE))
+        for source in self.sources:
+            source.timeout = 0.4
+            source.retries = 1
+
+        rates = fetch_rates(self.sources)
+
+        self.assertEqual(len(rates), 3)
+        # fetched one after the other, the second source would only be requested
+        # once the first one timed out
+        first_requests = [self.server.started[path][0] for path in ("/paralelo", "/bcv")]
+        self.assertLess(max(first_requests) - min(first_requests), 0.4)
+
+    def test_bcv_rates_are_fetched_with_one_request(self):
+        source = BcvSource(url=self.server.url("/bcv"))
+
+        rates = fetch_rates([source])
+
+        self.assertEqual(
+            {(rate.currency_to, rate.rate) for rate in rates},
+            {("USD", 160.5), ("EUR", 1234.5678), ("CNY", 40.12345678), ("TRY", 9.87654321), ("RUB", 3.5)},
+        )
+        self.assertEqual(self.server.hits["/bcv"], 1)
+
+    def test_retries_server_errors(self):
+        self.server.respond("/paralelo", (503, ""), (500, ""), (200, {"promedio": 243.81}))
+
+        rates = fetch_rates(self.sources[:1])
+
+        self.assertEqual([rate.rate for rate in rates], [243.81])
+        self.assertEqual(self.server.hits["/paralelo"], 3)
+
+    def test_failed_source_does_not_block_the_others(self):
+        self.server.respond("/paralelo", 5)
+        self.sources[0].timeout = 0.2
+
+        save_fetched_rates(fetch_rates(self.sources))
+
+        self.assertEqual(
+            self.get_rates(), {("VES", "USD", "bcv", 160.5), ("VES", "EUR", "bcv", 1234.5678)}
+        )
+        self.assertEqual(self.server.hits["/paralelo"], 3)
+
+    def test_circuit_breaker(self):
+        source = VesToUsdParalelo(url=self.server.url("/paralelo"), retries=0)
+        self.server.respond("/paralelo", (500, ""))
+
+        for _ in range(3):
+            self.assertEqual(fetch_rates([source]), [])
+        self.assertTrue(source.circuit_breaker.is_open())
+
+        # open circuits are not requested
+        self.server.respond("/paralelo", (200, {"promedio": 243.81}))
+        self.assertEqual(fetch_rates([source]), [])
+        self.assertEqual(self.server.hits["/paralelo"], 3)
+
+        # after the cooldown a successful fetch closes it
+        cache.delete(source.circuit_breaker.open_key)
+        self.assertEqual(len(fetch_rates([source])), 1)
+        self.assertFalse(source.circuit_breaker.is_open())
+
+    def test_concurrent_failures_are_all_counted(self):
+        breaker = CircuitBreaker("concurrent", threshold=20)
+        breaker.reset()
+        self.addCleanup(breaker.reset)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for _ in range(19):
+                executor.submit(breaker.record_failure)
+
+        self.assertEqual(cache.get(breaker.failures_key), 19)
+        self.assertFalse(breaker.is_open())
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open())
+
+    def test_unknown_currencies_are_skipped(self):
+        self.eur.delete()
+
+        conversions = save_fetched_rates(fetch_rates(self.sources))
+
+        self.assertEqual(len(conversions), 2)
+
+    def test_rates_of_other_pairs_are_dropped(self):
+        source = VesToUsdParalelo(url=self.server.url("/paralelo"), pairs=[("VES", "EUR")])
+
+        self.assertEqual(fetch_rates([source]), [])
+
+
+class TestConversionSourceRegistry(TestCase):
+    def setUp(self):
+        self.ves, _ = Currency.objects.get_or_create(name="VES")
+        self.usd, _ = Currency.objects.get_or_create(name="USD")
+        self.eur, _ = Currency.objects.get_or_create(name="EUR")
+
+    def test_registered_sources(self):
+        sources = get_registered_sources()
+
+        self.assertIn(VesToUsdParalelo, sources)
+        self.assertIn(BcvSource, sources)
+        self.assertEqual(get_source_names(), ["bcv", "paralelo"])
+
+    def test_sources_for_pairs(self):
+        sources = get_sources_for_pairs(
+            [("VES", "USD", "bcv"), ("VES", "USD", "paralelo"), ("VES", "ARS", "bcv")]
+        )
+
+        self.assertEqual(
+            {type(source): source.pairs for source in sources},
+            {BcvSource: (("VES", "USD"),), VesToUsdParalelo: (("VES", "USD"),)},
+        )
+
+    def test_no_pairs_in_use_without_accounts(self):
+        self.assertEqual(get_pairs_in_use(), set())
+        self.assertEqual(get_conversion_sources(), [])
+
+    def test_pairs_in_use(self):
+        AccountFactory(currency=self.ves)
+
+        self.assertEqual(
+            get_pairs_in_use(), {("VES", "USD", "bcv"), ("VES", "USD", "paralelo")}
+        )
+
+        # VES to EUR is refreshed once an account holds EUR
+        AccountFactory(currency=self.eur)
+
+        self.assertEqual(
+            get_pairs_in_use(),
+            {("VES", "USD", "bcv"), ("VES", "USD", "paralelo"), ("VES", "EUR", "bcv")},
+        )
+        self.assertEqual(
+            {type(source) for source in get_conversion_sources()},
+            {VesToUsdParalelo, BcvSource},
+        )
+
+    def test_default_conversion_source_is_validated(self):
+        self.ves.default_conversion_source = "bcv"
+        self.ves.clean_fields(exclude=["user", "symbol"])
+
+        self.ves.default_conversion_source = "unknown"
+        with self.assertRaises(ValidationError):
+            self.ves.clean_fields(exclude=["user", "symbol"])
+
+
+class FakeResponse:
+    encoding = "utf-8"
+
+    def __init__(self, body, chunk_size):
+        self.chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+        self.read = 0
+
+    def iter_content(self, chunk_size):
+        for chunk in self.chunks:
+            self.read += 1
+            yield chunk
+
+
+class TestBcvSource(SimpleTestCase):
+    def test_parse_stops_once_the_blocks_are_found(self):
+        body = (BCV_PAGE.replace("</body></html>", "") + "<p>news</p>" * 10000).encode()
+        response = FakeResponse(body, 64)
+
+        rates = BcvSource().parse(response)
+
+        self.assertEqual(len(rates), 5)
+        self.assertLess(response.read, 20)
+        self.assertGreater(len(response.chunks), 1000)
+
+    def test_parse_only_the_requested_pairs(self):
+        response = FakeResponse(BCV_PAGE.encode(), 16)
+
+        rates = BcvSource(pairs=[("VES", "EUR")]).parse(response)
+
+        self.assertEqual(rates, [FetchedRate("VES", "EUR", "bcv", 1234.5678)])
+        # the euro block comes first
+        self.assertLess(response.read, len(response.chunks))
+
+    def test_parse_missing_blocks(self):
+        rates = BcvSource().parse(FakeResponse(b"<html><div id='euro'></div></html>", 16))
+
+        self.assertEqual(rates, [])
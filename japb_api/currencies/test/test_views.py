@@ -1,11 +1,15 @@
 import pytz
+from datetime import datetime
 from faker import Faker
+from freezegun import freeze_time
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from ..models import Currency, CurrencyConversionHistorial
+from japb_api.core.testing import APITestCase
 from japb_api.currencies.factories import CurrencyFactory
 from japb_api.users.factories import UserFactory
 from japb_api.accounts.models import Account
@@ -133,6 +137,43 @@ class TestCurrencyViews(APITestCase):
             "{:.2f}".format(SUM_OF_MAIN_CURRENCY_TRANSACTIONS),
         )
 
+    def test_api_get_currency_list_queries_do_not_grow_with_accounts(self):
+        usd = Currency.objects.create(name="USD", symbol="$")
+        ves = Currency.objects.create(name="VES", symbol="Bs.", default_conversion_source="paralelo")
+        CurrencyConversionHistorial.objects.create(
+            currency_from=ves, currency_to=usd, source="paralelo", rate=40.0
+        )
+        url = reverse("currencies-list")
+
+        def create_accounts(count):
+            for _ in range(count):
+                for currency, decimal_places in [(usd, 2), (ves, 3)]:
+                    account = Account.objects.create(
+                        name="Account", currency=currency, user=self.user, decimal_places=decimal_places
+                    )
+                    Transaction.objects.create(
+                        amount=10**decimal_places * 20, account=account, user=self.user,
+                        date=self.fake.date_time(tzinfo=pytz.UTC),
+                    )
+            # warm up the rates cache
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            return len(queries), response.json()["results"]
+
+        few_queries, _ = create_accounts(1)
+        many_queries, results = create_accounts(4)
+
+        self.assertEqual(few_queries, many_queries)
+        self.assertEqual(
+            [
+                (result["name"], result["balance"], result["balance_as_main_currency"])
+                for result in results
+                if result["name"] in ("USD", "VES")
+            ],
+            [("USD", "100.00", None), ("VES", "100.000", "2.500")],
+        )
+
     def test_api_get_a_currency(self):
         currency = CurrencyFactory()
 
@@ -449,3 +490,213 @@ class TestCurrencyConversionViews(APITestCase):
         }
 
         self.assertEqual(response.json(), expected_response)
+
+    def test_api_get_currency_conversion_all_pairs(self):
+        eur_currency = Currency.objects.create(name="EUR", symbol="€")
+        for currency_to, source, rate in [
+            (self.usd_currency, "paralelo", 250.0),
+            (self.usd_currency, "bcv", 200.0),
+            (eur_currency, "bcv", 220.0),
+        ]:
+            CurrencyConversionHistorial.objects.create(
+                currency_from=self.ves_currency, currency_to=currency_to, source=source, rate=rate
+            )
+        CurrencyConversionHistorial.objects.create(
+            currency_from=eur_currency, currency_to=self.usd_currency, source="bcv", rate=0.9
+        )
+
+        response = self.client.get(reverse("currency-conversion-list"))
+
+        self.assertEqual(
+            response.json(),
+            {
+                "VES": {
+                    "USD": {"rates": {"paralelo": 250.0, "bcv": 200.0}, "gap": 20.0},
+                    "EUR": {"rates": {"bcv": 220.0}},
+                },
+                "EUR": {"USD": {"rates": {"bcv": 0.9}}},
+            },
+        )
+
+    def test_api_get_currency_conversion_gap_sign(self):
+        eur_currency = Currency.objects.create(name="EUR", symbol="€")
+        for currency_to, source, rate in [
+            (self.usd_currency, "paralelo", 200.0),
+            (self.usd_currency, "bcv", 250.0),
+            (eur_currency, "paralelo", 200.0),
+            (eur_currency, "bcv", 250.0),
+        ]:
+            CurrencyConversionHistorial.objects.create(
+                currency_from=self.ves_currency, currency_to=currency_to, source=source, rate=rate
+            )
+
+        response = self.client.get(reverse("currency-conversion-list"))
+
+        # VES to USD keeps the sign of paralelo over bcv, other pairs use the spread
+        self.assertEqual(response.json()["VES"]["USD"]["gap"], -25.0)
+        self.assertEqual(response.json()["VES"]["EUR"]["gap"], 20.0)
+
+    def test_api_get_currency_conversion_queries(self):
+        for source, rate in [("paralelo", 250.0), ("bcv", 200.0), ("paralelo", 260.0)]:
+            CurrencyConversionHistorial.objects.create(
+                currency_from=self.ves_currency, currency_to=self.usd_currency, source=source, rate=rate
+            )
+        url = reverse("currency-conversion-list")
+
+        # the user and the latest rates of every pair
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.json()["VES"]["USD"]["rates"], {"paralelo": 260.0, "bcv": 200.0})
+
+        # cached until new rates are stored
+        with self.assertNumQueries(1):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            CurrencyConversionHistorial.objects.create(
+                currency_from=self.ves_currency, currency_to=self.usd_currency, source="bcv", rate=210.0
+            )
+        response = self.client.get(url)
+        self.assertEqual(response.json()["VES"]["USD"]["rates"], {"paralelo": 260.0, "bcv": 210.0})
+
+
+class TestRateHistoryViews(APITestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token.access_token}")
+
+        self.usd_currency = Currency.objects.create(name="USD", symbol="$")
+        self.ves_currency = Currency.objects.create(
+            name="VES", symbol="Bs.", default_conversion_source="paralelo"
+        )
+        self.url = reverse("currency-conversion-history")
+
+    def create_rate(self, date, rate, source="paralelo"):
+        # the cached rates are invalidated once the rate and its date are committed
+        with self.captureOnCommitCallbacks(execute=True):
+            conversion = CurrencyConversionHistorial.objects.create(
+                currency_from=self.ves_currency, currency_to=self.usd_currency, source=source, rate=rate
+            )
+            CurrencyConversionHistorial.objects.filter(pk=conversion.pk).update(
+                date=datetime.fromisoformat(date).replace(tzinfo=pytz.utc)
+            )
+
+    def test_daily_buckets(self):
+        self.create_rate("2024-01-01T08:00:00", 10)
+        self.create_rate("2024-01-01T12:00:00", 14)
+        self.create_rate("2024-01-01T20:00:00", 12)
+        self.create_rate("2024-01-02T08:00:00", 20)
+        self.create_rate("2024-01-02T09:00:00", 500, source="bcv")
+
+        response = self.client.get(self.url, {"interval": "day"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["source"], "paralelo")
+        self.assertEqual(response.json()["interval"], "day")
+        self.assertEqual(
+            response.json()["results"],
+            [
+                {
+                    "date": "2024-01-01T00:00:00Z",
+                    "open": 10.0,
+                    "high": 14.0,
+                    "low": 10.0,
+                    "close": 12.0,
+                    "avg": 12.0,
+                    "count": 3,
+                },
+                {
+                    "date": "2024-01-02T00:00:00Z",
+                    "open": 20.0,
+                    "high": 20.0,
+                    "low": 20.0,
+                    "close": 20.0,
+                    "avg": 20.0,
+                    "count": 1,
+                },
+            ],
+        )
+
+    def test_monthly_buckets_of_a_source_in_a_range(self):
+        self.create_rate("2024-01-05T08:00:00", 10, source="bcv")
+        self.create_rate("2024-01-20T08:00:00", 30, source="bcv")
+        self.create_rate("2024-02-05T08:00:00", 40, source="bcv")
+        self.create_rate("2024-03-05T08:00:00", 50, source="bcv")
+
+        response = self.client.get(
+            self.url,
+            {
+                "source": "bcv",
+                "interval": "month",
+                "start": "2024-01-01T00:00:00Z",
+                "end": "2024-02-28T00:00:00Z",
+            },
+        )
+
+        self.assertEqual(
+            [(bucket["date"], bucket["open"], bucket["close"]) for bucket in response.json()["results"]],
+            [("2024-01-01T00:00:00Z", 10.0, 30.0), ("2024-02-01T00:00:00Z", 40.0, 40.0)],
+        )
+
+    def test_interval_is_picked_from_the_range(self):
+        self.create_rate("2021-01-01T08:00:00", 10)
+        self.create_rate("2021-01-02T08:00:00", 10)
+        self.create_rate("2023-06-01T08:00:00", 20)
+
+        response = self.client.get(self.url, {"end": "2024-01-01T00:00:00Z"})
+        self.assertEqual(response.json()["interval"], "week")
+        self.assertEqual(len(response.json()["results"]), 2)
+
+        response = self.client.get(self.url, {"start": "2014-01-01T00:00:00Z", "end": "2024-01-01T00:00:00Z"})
+        self.assertEqual(response.json()["interval"], "month")
+
+        response = self.client.get(self.url, {"start": "2023-01-01T00:00:00Z", "end": "2024-01-01T00:00:00Z"})
+        self.assertEqual(response.json()["interval"], "day")
+
+    def test_conditional_requests(self):
+        with freeze_time("2024-01-02 10:00:00"):
+            self.create_rate("2024-01-01T08:00:00", 10)
+
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+        # when the rates were stored, not the date of the latest one
+        self.assertEqual(response["Last-Modified"], "Tue, 02 Jan 2024 10:00:00 GMT")
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE="Tue, 02 Jan 2024 10:00:00 GMT")
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # other parameters are another resource
+        response = self.client.get(self.url, {"interval": "month"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # new rates change the ETag
+        with freeze_time("2024-01-09 10:00:00"):
+            self.create_rate("2024-01-09T08:00:00", 20)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), 2)
+
+        # and Last-Modified, even for a rate dated before the previous update
+        with freeze_time("2024-01-10 10:00:00"):
+            self.create_rate("2023-12-31T08:00:00", 5)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE="Tue, 09 Jan 2024 10:00:00 GMT")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Last-Modified"], "Wed, 10 Jan 2024 10:00:00 GMT")
+
+    def test_invalid_parameters(self):
+        response = self.client.get(self.url, {"interval": "year"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(self.url, {"currency_from": "ARS"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_empty_history(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["results"], [])
+        self.assertNotIn("Last-Modified", response)
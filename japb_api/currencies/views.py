@@ -1,6 +1,13 @@
-from .models import Currency, CurrencyConversionHistorial
-from .serializers import CurrencySerializer
+import hashlib
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .history import get_rate_history
+from .models import Currency
+from .rates import get_changed_at, get_latest_conversion, get_latest_rates, get_version
+from .serializers import CurrencySerializer, RateHistoryQuerySerializer
 from rest_framework import viewsets, filters
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from japb_api.core.permissions import IsAdminOrReadOnly
@@ -28,51 +35,84 @@ class CurrencyConversionViewSet(viewsets.ViewSet):
                         "paralelo": 260.13,
                         "bcv": 160.12
                     },
-                    "gap": 0.6155 // bcv / paralelo
+                    "gap": 38.45 // (paralelo - bcv) / paralelo * 100
                 }
              }
         }
+        Every pair with rates is included. VES to USD keeps the signed gap of
+        paralelo over bcv, negative when bcv is higher. Other pairs with rates
+        from more than one source get (highest - lowest) / highest * 100.
         """
-        try:
-            usd_currency = Currency.objects.get(name="USD")
-            ves_currency = Currency.objects.get(name="VES")
+        # VES to USD is always included for the existing clients
+        result = {"VES": {"USD": {"rates": {}}}}
+        for rate in get_latest_rates():
+            pair = result.setdefault(rate.currency_from, {}).setdefault(rate.currency_to, {"rates": {}})
+            pair["rates"][rate.source] = rate.rate
 
-            # Get latest VES to USD rate (paralelo source)
-            ves_conversion = (
-                CurrencyConversionHistorial.objects.filter(
-                    currency_from=ves_currency,
-                    currency_to=usd_currency,
-                    source="paralelo",
-                )
-                .order_by("-date")
-                .first()
-            )
+        for currency_from, pairs in result.items():
+            for currency_to, pair in pairs.items():
+                rates = pair["rates"]
+                if (currency_from, currency_to) == ("VES", "USD"):
+                    if "paralelo" in rates and "bcv" in rates:
+                        gap = (rates["paralelo"] - rates["bcv"]) / rates["paralelo"] * 100
+                        pair["gap"] = round(gap, 2)
+                elif len(rates) > 1:
+                    gap = (max(rates.values()) - min(rates.values())) / max(rates.values()) * 100
+                    pair["gap"] = round(gap, 2)
 
-            # Get latest VES to USD rate (BCV source)
-            ves_bcv_conversion = (
-                CurrencyConversionHistorial.objects.filter(
-                    currency_from=ves_currency, currency_to=usd_currency, source="bcv"
-                )
-                .order_by("-date")
-                .first()
-            )
+        return Response(result)
 
-            result = {"VES": {"USD": {"rates": {}}}}
-
-            if ves_bcv_conversion:
-                result["VES"]["USD"]["rates"]["bcv"] = ves_bcv_conversion.rate
-
-            if ves_conversion:
-                result["VES"]["USD"]["rates"]["paralelo"] = ves_conversion.rate
+    @action(detail=False, methods=["get"])
+    def history(self, request):
+        """
+        Rates of a currency pair and source bucketed by day, week or month:
+        {
+            "currency_from": "VES",
+            "currency_to": "USD",
+            "source": "paralelo",
+            "interval": "day",
+            "results": [
+                {"date": "...", "open": 1, "high": 2, "low": 1, "close": 2, "avg": 1.5, "count": 2}
+            ]
+        }
+        The ETag changes with every rates update and Last-Modified is the time
+        of that update, so clients can revalidate cheaply.
+        """
+        query = RateHistoryQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
 
-            # Calculate gap if both rates are available
-            if ves_bcv_conversion and ves_conversion:
-                gap = (
-                    (ves_conversion.rate - ves_bcv_conversion.rate) / ves_conversion.rate
-                ) * 100
-                result["VES"]["USD"]["gap"] = round(gap, 2)
+        currency = Currency.objects.filter(name=params["currency_from"], user__isnull=True).first()
+        if currency is None:
+            raise Http404
+        source = params.get("source") or currency.default_conversion_source
+        interval, start, end = params.get("interval"), params.get("start"), params.get("end")
 
-            return Response(result)
+        latest = get_latest_conversion(currency.id, params["currency_to"], source)
+        key = ":".join(
+            str(value)
+            for value in (get_version(), currency.id, params["currency_to"], source, interval, start, end)
+        )
+        etag = f'"{hashlib.md5(key.encode()).hexdigest()}"'
+        # the date of a rate is when it was published, not when it was stored
+        last_modified = get_changed_at() if latest.date else None
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
 
-        except Currency.DoesNotExist:
-            return Response({"VES": {"USD": {"rates": {}}}})
+        interval, results = get_rate_history(
+            currency.id, params["currency_to"], source, interval, start, end
+        )
+        response = Response(
+            {
+                "currency_from": currency.name,
+                "currency_to": params["currency_to"],
+                "source": source,
+                "interval": interval,
+                "results": results,
+            }
+        )
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified)
+        return response
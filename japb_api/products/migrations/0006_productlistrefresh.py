@@ -0,0 +1,30 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0003_alter_user_first_name"),
+        ("products", "0005_productlist_period_end_productlist_period_start_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductListRefresh",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("requested_at", models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -43,3 +43,14 @@ class ProductListItem(models.Model):
             f"Qty Purchased: {self.quantity_purchased} "
             f"Pl: {self.product_list.name}"
         )
+
+
+class ProductListRefresh(models.Model):
+    """
+    Users whose product lists are waiting for a refresh, a row is kept until
+    the refresh runs so a burst of transaction writes queues a single one
+    """
+
+    user = models.OneToOneField("users.User", on_delete=models.CASCADE, primary_key=True)
+    # last write that requested the refresh
+    requested_at = models.DateTimeField()
@@ -52,6 +52,55 @@ class ProductListItemSerializer(serializers.ModelSerializer):
         ]
 
 
+# values() of the items read by serialize_product_list_item_rows, the
+# querysets are annotated with the total
+PRODUCT_LIST_ITEM_ROW_FIELDS = (
+    "id",
+    "product",
+    "product__name",
+    "product__cost",
+    "product__category",
+    "product__category__name",
+    "product__category__color",
+    "product_list",
+    "quantity",
+    "quantity_purchased",
+    "total",
+    "created_at",
+    "updated_at",
+)
+
+
+def serialize_product_list_item_rows(rows):
+    """
+    Same output as ProductListItemSerializer(many=True).data for the values()
+    rows of PRODUCT_LIST_ITEM_ROW_FIELDS
+    """
+    datetime_field = serializers.DateTimeField()
+    items = []
+    for row in rows:
+        item = {
+            "id": row["id"],
+            "product": row["product"],
+            "product_name": row["product__name"],
+            "product_cost": str(row["product__cost"]),
+            "product__category": None,
+        }
+        if row["product__category"] is not None:
+            item["product__category"] = str(row["product__category__name"])
+            color = row["product__category__color"]
+            # without a category the serializer skips the color
+            item["product_category_color"] = None if color is None else str(color)
+        item["product_list"] = row["product_list"]
+        item["quantity"] = row["quantity"]
+        item["quantity_purchased"] = row["quantity_purchased"]
+        item["total"] = None if row["total"] is None else int(row["total"])
+        item["created_at"] = datetime_field.to_representation(row["created_at"])
+        item["updated_at"] = datetime_field.to_representation(row["updated_at"])
+        items.append(item)
+    return items
+
+
 class ProductListSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
     total = serializers.SerializerMethodField()
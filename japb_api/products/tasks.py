@@ -1,10 +1,13 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Sum
+from django.utils import timezone
 from celery import shared_task
 
 from japb_api.celery import app
-from japb_api.products.models import ProductList, ProductListItem
+from japb_api.products.models import ProductList, ProductListItem, ProductListRefresh
 from japb_api.users.models import User
 from japb_api.transactions.models import Transaction, TransactionItem
 
@@ -72,3 +75,70 @@ def update_user_product_list_items(user_pk):
                 transaction_items_for_product.aggregate(Sum("quantity"))["quantity__sum"] or 0
             )
             product_list_item.save()
+
+
+def schedule_product_list_refresh(user_pk):
+    """
+    Marks the product lists of the user as dirty. Only the first write of a
+    burst queues a refresh, it runs once no other write happened for
+    PRODUCT_LIST_REFRESH_DELAY seconds.
+    """
+    user_pk = str(user_pk)
+    now = timezone.now()
+    if ProductListRefresh.objects.filter(user=user_pk).update(requested_at=now):
+        return
+
+    _, created = ProductListRefresh.objects.get_or_create(
+        user_id=user_pk, defaults={"requested_at": now}
+    )
+    if created:
+        transaction.on_commit(
+            lambda: refresh_user_product_lists.apply_async(
+                (user_pk,), countdown=settings.PRODUCT_LIST_REFRESH_DELAY
+            )
+        )
+
+
+@app.task
+def refresh_user_product_lists(user_pk):
+    refresh = ProductListRefresh.objects.filter(user=user_pk).first()
+    if refresh is None:
+        return "Product lists already refreshed"
+
+    # writes after the refresh was queued move the refresh forward
+    quiet_at = refresh.requested_at + timedelta(seconds=settings.PRODUCT_LIST_REFRESH_DELAY)
+    wait = (quiet_at - timezone.now()).total_seconds()
+    if wait > 0:
+        refresh_user_product_lists.apply_async((user_pk,), countdown=wait)
+        return f"Product lists refresh delayed {wait:.0f}s"
+
+    # the mark is only dropped with the refresh, a failed refresh keeps it
+    # for the next run of refresh_dirty_product_lists
+    with transaction.atomic():
+        update_user_product_list_items(user_pk)
+        deleted, _ = ProductListRefresh.objects.filter(
+            user=user_pk, requested_at=refresh.requested_at
+        ).delete()
+
+    if not deleted:
+        # a write arrived during the refresh, wait for the next quiet window
+        refresh_user_product_lists.apply_async(
+            (user_pk,), countdown=settings.PRODUCT_LIST_REFRESH_DELAY
+        )
+        return "Product lists refreshed, another refresh queued"
+    return "Product lists refreshed"
+
+
+@app.task
+def refresh_dirty_product_lists():
+    """
+    Refreshes the product lists that stayed dirty after their quiet window,
+    in case the queued refresh of a user was lost
+    """
+    quiet_since = timezone.now() - timedelta(seconds=settings.PRODUCT_LIST_REFRESH_DELAY)
+    user_pks = ProductListRefresh.objects.filter(requested_at__lte=quiet_since).values_list(
+        "user", flat=True
+    )
+    for user_pk in user_pks:
+        refresh_user_product_lists(user_pk)
+    return f"Refreshed product lists of {len(user_pks)} users"
@@ -1,12 +1,16 @@
 from faker import Faker
+from decimal import Decimal
+from django.db import models
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from japb_api.users.factories import UserFactory
 from japb_api.transactions.models import Category
-from ..models import Product
+from ..models import Product, ProductList, ProductListItem
+from ..serializers import ProductListItemSerializer
 
 
 class TestProducts(APITestCase):
@@ -170,3 +174,45 @@ class TestProducts(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["results"]), 1)
         self.assertEqual(response.data["results"][0]["name"], "Expensive Product")
+
+
+class TestProductListItemRendering(APITestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token.access_token}")
+
+        category = Category.objects.create(name="Test \u2028 Category", description="Test Category")
+        product_list = ProductList.objects.create(user=self.user, name="Test List")
+        products = [
+            Product.objects.create(name="Test \"Product\"", cost=Decimal("1300.25"), category=category),
+            Product.objects.create(name="Other Product", cost=Decimal("0.99")),
+            Product.objects.create(name="Free Product", cost=0),
+        ]
+        for quantity, product in enumerate(products * 2, start=1):
+            ProductListItem.objects.create(
+                user=self.user,
+                product=product,
+                product_list=product_list,
+                quantity=quantity,
+                quantity_purchased=quantity // 2,
+            )
+
+    def test_list_renders_like_the_serializer(self):
+        response = self.client.get(reverse("products-list-item-list"), {"ordering": "-total"})
+
+        queryset = (
+            ProductListItem.objects.filter(user=self.user)
+            .annotate(
+                total=models.ExpressionWrapper(
+                    models.F("quantity") * models.F("product__cost"),
+                    output_field=models.DecimalField(),
+                )
+            )
+            .order_by("-total")
+        )
+        expected = response.json()
+        expected["results"] = ProductListItemSerializer(queryset, many=True).data
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+        self.assertNotIn("product_category_color", response.json()["results"][-1])
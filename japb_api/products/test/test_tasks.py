@@ -1,11 +1,18 @@
+from unittest.mock import patch
 from django.test import TestCase
 from datetime import timedelta, datetime
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 from freezegun import freeze_time
 
-from japb_api.products.models import ProductList, ProductListItem, Product
-from japb_api.products.tasks import renew_product_lists, update_user_product_list_items
+from japb_api.products.models import ProductList, ProductListItem, Product, ProductListRefresh
+from japb_api.products.tasks import (
+    renew_product_lists,
+    update_user_product_list_items,
+    schedule_product_list_refresh,
+    refresh_user_product_lists,
+    refresh_dirty_product_lists,
+)
 from japb_api.users.models import User
 from japb_api.transactions.models import Transaction, TransactionItem
 from japb_api.transactions.factories import TransactionFactory
@@ -381,3 +388,122 @@ class TestUpdateUserProductListItems(TestCase):
 
         # Should only count our user's transactions (3), not the other user's (5)
         self.assertEqual(self.current_list_item1.quantity_purchased, 3)
+
+
+@freeze_time("2023-03-15 12:00:00")
+class TestProductListRefresh(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="refreshuser", email="refresh@example.com", password="password"
+        )
+        self.product = Product.objects.create(name="Product", user=self.user)
+        product_list = ProductList.objects.create(
+            user=self.user,
+            name="Groceries",
+            period_type="MONTHLY",
+            period_start=datetime(2023, 3, 1).date(),
+            period_end=datetime(2023, 4, 1).date(),
+        )
+        self.list_item = ProductListItem.objects.create(
+            user=self.user, product=self.product, product_list=product_list, quantity=5
+        )
+        transaction = TransactionFactory.create(
+            user=self.user, amount=1000, date=datetime(2023, 3, 10, tzinfo=timezone.utc)
+        )
+        TransactionItem.objects.create(
+            transaction=transaction, product=self.product, quantity=2, price=5
+        )
+
+    def test_schedule_coalesces_writes(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            for _ in range(50):
+                schedule_product_list_refresh(self.user.pk)
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(ProductListRefresh.objects.count(), 1)
+
+        with freeze_time("2023-03-15 12:00:10"), self.captureOnCommitCallbacks() as callbacks:
+            schedule_product_list_refresh(self.user.pk)
+
+        self.assertEqual(len(callbacks), 0)
+        self.assertEqual(
+            ProductListRefresh.objects.get().requested_at,
+            datetime(2023, 3, 15, 12, 0, 10, tzinfo=timezone.utc),
+        )
+
+    def test_refresh_waits_for_quiet_window(self):
+        schedule_product_list_refresh(self.user.pk)
+
+        with freeze_time("2023-03-15 12:00:20"), patch.object(
+            refresh_user_product_lists, "apply_async"
+        ) as apply_async:
+            refresh_user_product_lists(str(self.user.pk))
+
+        apply_async.assert_called_once_with((str(self.user.pk),), countdown=10.0)
+        self.list_item.refresh_from_db()
+        self.assertEqual(self.list_item.quantity_purchased, 0)
+        self.assertEqual(ProductListRefresh.objects.count(), 1)
+
+    def test_refresh_after_quiet_window(self):
+        schedule_product_list_refresh(self.user.pk)
+
+        with freeze_time("2023-03-15 12:00:30"):
+            refresh_user_product_lists(str(self.user.pk))
+
+        self.list_item.refresh_from_db()
+        self.assertEqual(self.list_item.quantity_purchased, 2)
+        self.assertFalse(ProductListRefresh.objects.exists())
+        # the next refresh has nothing to do
+        self.assertEqual(
+            refresh_user_product_lists(str(self.user.pk)), "Product lists already refreshed"
+        )
+
+    def test_refresh_dirty_product_lists(self):
+        schedule_product_list_refresh(self.user.pk)
+
+        refresh_dirty_product_lists()
+        self.assertEqual(ProductListRefresh.objects.count(), 1)
+
+        with freeze_time("2023-03-15 12:01:00"):
+            refresh_dirty_product_lists()
+
+        self.list_item.refresh_from_db()
+        self.assertEqual(self.list_item.quantity_purchased, 2)
+        self.assertFalse(ProductListRefresh.objects.exists())
+
+    def test_failed_refresh_keeps_the_mark(self):
+        schedule_product_list_refresh(self.user.pk)
+
+        with freeze_time("2023-03-15 12:00:30"), patch(
+            "japb_api.products.tasks.update_user_product_list_items", side_effect=RuntimeError
+        ):
+            with self.assertRaises(RuntimeError):
+                refresh_user_product_lists(str(self.user.pk))
+
+        self.assertEqual(ProductListRefresh.objects.count(), 1)
+
+        with freeze_time("2023-03-15 12:01:00"):
+            refresh_dirty_product_lists()
+
+        self.list_item.refresh_from_db()
+        self.assertEqual(self.list_item.quantity_purchased, 2)
+        self.assertFalse(ProductListRefresh.objects.exists())
+
+    def test_write_during_refresh_queues_another_refresh(self):
+        schedule_product_list_refresh(self.user.pk)
+
+        def write_during_refresh(user_pk):
+            schedule_product_list_refresh(user_pk)
+
+        with freeze_time("2023-03-15 12:00:30"), patch(
+            "japb_api.products.tasks.update_user_product_list_items",
+            side_effect=write_during_refresh,
+        ), patch.object(refresh_user_product_lists, "apply_async") as apply_async:
+            result = refresh_user_product_lists(str(self.user.pk))
+
+        self.assertEqual(result, "Product lists refreshed, another refresh queued")
+        apply_async.assert_called_once_with((str(self.user.pk),), countdown=30)
+        self.assertEqual(
+            ProductListRefresh.objects.get().requested_at,
+            datetime(2023, 3, 15, 12, 0, 30, tzinfo=timezone.utc),
+        )
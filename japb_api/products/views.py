@@ -2,8 +2,11 @@ from django.db import models
 from rest_framework import viewsets, filters
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
 
 from japb_api.core.permissions import IsOwner
+from japb_api.core.renderers import FastJSONRenderer
 from .models import Product, ProductList, ProductListItem
 from .serializers import (
     ProductSerializer,
@@ -12,6 +15,8 @@ from .serializers import (
     ProductFilterSet,
     ProductListFilterSet,
     ProductListItemFilterSet,
+    PRODUCT_LIST_ITEM_ROW_FIELDS,
+    serialize_product_list_item_rows,
 )
 
 
@@ -58,6 +63,7 @@ class ProductListItemViewSet(viewsets.ModelViewSet):
     )
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_class = ProductListItemFilterSet
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
     ordering_fields = ["total", "product__category", "created_at", "updated_at"]
     ordering = ["-product__category"]
 
@@ -72,3 +78,11 @@ class ProductListItemViewSet(viewsets.ModelViewSet):
             )
             .all()
         )
+
+    def list(self, request, *args, **kwargs):
+        # values() rows instead of ProductListItemSerializer, the payload is the same
+        queryset = self.filter_queryset(self.get_queryset()).values(*PRODUCT_LIST_ITEM_ROW_FIELDS)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize_product_list_item_rows(page))
+        return Response(serialize_product_list_item_rows(queryset))
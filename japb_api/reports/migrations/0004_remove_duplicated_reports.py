@@ -0,0 +1,27 @@
+from django.db import migrations
+from django.db.models import Min
+
+
+def remove_duplicated_reports(apps, schema_editor):
+    # keep the oldest report of every period, the rest are duplicates
+    for model_name, key_field in [
+        ("ReportAccount", "account"),
+        ("ReportCurrency", "currency"),
+    ]:
+        Report = apps.get_model("reports", model_name)
+        reports_to_keep = (
+            Report.objects.values("user", key_field, "from_date", "to_date")
+            .annotate(keep=Min("id"))
+            .values("keep")
+        )
+        Report.objects.exclude(id__in=reports_to_keep).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reports", "0003_reportaccount_user_reportcurrency_user"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicated_reports, migrations.RunPython.noop),
+    ]
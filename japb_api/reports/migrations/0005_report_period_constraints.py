@@ -0,0 +1,39 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reports", "0004_remove_duplicated_reports"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="reportaccount",
+            index=models.Index(
+                fields=["user", "account", "to_date"], name="report_account_to_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reportcurrency",
+            index=models.Index(
+                fields=["user", "currency", "to_date"],
+                name="report_currency_to_date_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="reportaccount",
+            constraint=models.UniqueConstraint(
+                fields=("user", "account", "from_date", "to_date"),
+                name="unique_report_account_period",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="reportcurrency",
+            constraint=models.UniqueConstraint(
+                fields=("user", "currency", "from_date", "to_date"),
+                name="unique_report_currency_period",
+            ),
+        ),
+    ]
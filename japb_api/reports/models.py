@@ -50,10 +50,61 @@ class Report(models.Model):
     def get_to_date_with_timezone(self) -> datetime:
         return timezone.make_aware(self.get_to_date())
 
+    @classmethod
+    def apply_movement(cls, filters, day, delta, movement_field=None):
+        """
+        Applies an amount moved on `day` to the stored reports matching `filters`
+        without recalculating them, in a single UPDATE: reports ending on or after
+        the day get their end balance shifted, reports starting after it get their
+        initial balance shifted and reports containing it get the amount added to
+        `movement_field` (total_income or total_expenses).
+        """
+        if not delta:
+            return
+
+        updates = {
+            "end_balance": models.F("end_balance") + delta,
+            "initial_balance": models.Case(
+                models.When(from_date__gt=day, then=models.F("initial_balance") + delta),
+                default=models.F("initial_balance"),
+            ),
+            "updated_at": timezone.now(),
+        }
+        if movement_field:
+            updates[movement_field] = models.Case(
+                models.When(from_date__lte=day, then=models.F(movement_field) + delta),
+                default=models.F(movement_field),
+            )
+
+        cls.objects.filter(to_date__gte=day, **filters).update(**updates)
+
 
 class ReportAccount(Report):
     account = models.ForeignKey(Account, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "account", "from_date", "to_date"],
+                name="unique_report_account_period",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "account", "to_date"], name="report_account_to_date_idx"
+            )
+        ]
+
+    @classmethod
+    def apply_transaction(cls, user_id, account_id, day, amount, reverse=False):
+        movement_field = "total_income" if amount > 0 else "total_expenses"
+        cls.apply_movement(
+            {"user_id": user_id, "account_id": account_id},
+            day,
+            -amount if reverse else amount,
+            movement_field,
+        )
+
     def get_transactions_queryset(self) -> QuerySet["Transaction"]:
         return Transaction.objects.filter(
             user=self.user,
@@ -104,6 +155,37 @@ class ReportAccount(Report):
 class ReportCurrency(Report):
     currency = models.ForeignKey(Currency, on_delete=models.CASCADE)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "currency", "from_date", "to_date"],
+                name="unique_report_currency_period",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "currency", "to_date"], name="report_currency_to_date_idx"
+            )
+        ]
+
+    @classmethod
+    def apply_transaction(
+        cls, user_id, currency_id, day, amount, exchange_type=None, reverse=False
+    ):
+        # exchanges between accounts of the same currency are not income or expenses
+        movement_field = None
+        if amount > 0 and exchange_type != "to_same_currency":
+            movement_field = "total_income"
+        elif amount < 0 and exchange_type != "from_same_currency":
+            movement_field = "total_expenses"
+
+        cls.apply_movement(
+            {"user_id": user_id, "currency_id": currency_id},
+            day,
+            -amount if reverse else amount,
+            movement_field,
+        )
+
     def get_account_reports_in_month_range(self) -> QuerySet["ReportAccount"]:
         return ReportAccount.objects.filter(
             user=self.user,
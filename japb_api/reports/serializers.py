@@ -1,8 +1,87 @@
 import django_filters
 from rest_framework import serializers
+from rest_framework.validators import UniqueTogetherValidator
 from .models import ReportAccount, ReportCurrency
+from django.db.models import Max
 from japb_api.accounts.models import Account
 from japb_api.currencies.models import Currency
+from japb_api.core.money import format_amount
+
+
+def get_balance_status(initial_balance, end_balance):
+    if end_balance > initial_balance:
+        return "positive"
+    elif end_balance < initial_balance:
+        return "negative"
+    else:
+        return "neutral"
+
+
+REPORT_AMOUNT_FIELDS = ("initial_balance", "end_balance", "total_income", "total_expenses")
+
+# values() of the reports read by serialize_report_rows, plus the account or currency
+REPORT_ROW_FIELDS = (
+    "id",
+    "from_date",
+    "to_date",
+    "initial_balance",
+    "end_balance",
+    "total_income",
+    "total_expenses",
+    "created_at",
+    "updated_at",
+)
+
+
+def serialize_report_rows(rows, owner_field, decimal_places):
+    """
+    Same output as the report serializers for the values() rows of
+    REPORT_ROW_FIELDS and owner_field ("account" or "currency"), with the
+    amounts formatted with decimal_places(row)
+    """
+    date_field = serializers.DateField()
+    datetime_field = serializers.DateTimeField()
+    reports = []
+    for row in rows:
+        places = decimal_places(row)
+        reports.append(
+            {
+                "id": row["id"],
+                "from_date": date_field.to_representation(row["from_date"]),
+                "to_date": date_field.to_representation(row["to_date"]),
+                "initial_balance": format_amount(row["initial_balance"], places),
+                "end_balance": format_amount(row["end_balance"], places),
+                "balance_status": get_balance_status(row["initial_balance"], row["end_balance"]),
+                "total_income": format_amount(row["total_income"], places),
+                "total_expenses": format_amount(row["total_expenses"], places),
+                owner_field: row[owner_field],
+                "created_at": datetime_field.to_representation(row["created_at"]),
+                "updated_at": datetime_field.to_representation(row["updated_at"]),
+            }
+        )
+    return reports
+
+
+def serialize_report_account_rows(queryset):
+    """Same output as ReportAccountSerializer(many=True).data, from one query"""
+    rows = queryset.values(*REPORT_ROW_FIELDS, "account", "account__decimal_places")
+    return serialize_report_rows(rows, "account", lambda row: row["account__decimal_places"])
+
+
+def serialize_report_currency_rows(queryset):
+    """
+    Same output as ReportCurrencySerializer(many=True).data, the greatest
+    decimal places of the accounts of every currency come from one grouped query
+    """
+    rows = list(queryset.values(*REPORT_ROW_FIELDS, "currency"))
+    decimal_places = dict(
+        Account.objects.filter(currency__in={row["currency"] for row in rows})
+        .values("currency")
+        .annotate(decimal_places=Max("decimal_places"))
+        .values_list("currency", "decimal_places")
+        .order_by()
+    )
+    return serialize_report_rows(rows, "currency", lambda row: decimal_places[row["currency"]])
 
 
 class ReportAccountSerializer(serializers.ModelSerializer):
@@ -35,32 +114,20 @@ class ReportAccountSerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+        validators = [
+            UniqueTogetherValidator(
+                queryset=ReportAccount.objects.all(),
+                fields=["user", "account", "from_date", "to_date"],
+            )
+        ]
 
     def get_balance_status(self, report):
-        if report.end_balance > report.initial_balance:
-            return "positive"
-        elif report.end_balance < report.initial_balance:
-            return "negative"
-        else:
-            return "neutral"
+        return get_balance_status(report.initial_balance, report.end_balance)
 
     def to_representation(self, instance):
         rep = super().to_representation(instance)
-        initial_balance = rep.get("initial_balance") / (
-            10**instance.account.decimal_places
-        )
-        end_balance = rep.get("end_balance") / (10**instance.account.decimal_places)
-        total_income = rep.get("total_income") / (10**instance.account.decimal_places)
-        total_expenses = rep.get("total_expenses") / (
-            10**instance.account.decimal_places
-        )
-
-        rep[
-            "initial_balance"
-        ] = f"{initial_balance:.{instance.account.decimal_places}f}"
-        rep["end_balance"] = f"{end_balance:.{instance.account.decimal_places}f}"
-        rep["total_income"] = f"{total_income:.{instance.account.decimal_places}f}"
-        rep["total_expenses"] = f"{total_expenses:.{instance.account.decimal_places}f}"
+        for field in REPORT_AMOUNT_FIELDS:
+            rep[field] = format_amount(rep.get(field), instance.account.decimal_places)
 
         return rep
 
@@ -95,14 +162,15 @@ class ReportCurrencySerializer(serializers.ModelSerializer):
             "created_at",
             "updated_at",
         ]
+        validators = [
+            UniqueTogetherValidator(
+                queryset=ReportCurrency.objects.all(),
+                fields=["user", "currency", "from_date", "to_date"],
+            )
+        ]
 
     def get_balance_status(self, report):
-        if report.end_balance > report.initial_balance:
-            return "positive"
-        elif report.end_balance < report.initial_balance:
-            return "negative"
-        else:
-            return "neutral"
+        return get_balance_status(report.initial_balance, report.end_balance)
 
     def to_representation(self, instance):
         rep = super().to_representation(instance)
@@ -113,15 +181,8 @@ class ReportCurrencySerializer(serializers.ModelSerializer):
             .decimal_places
         )
 
-        initial_balance = rep.get("initial_balance") / (10**greater_decimal_places)
-        end_balance = rep.get("end_balance") / (10**greater_decimal_places)
-        total_income = rep.get("total_income") / (10**greater_decimal_places)
-        total_expenses = rep.get("total_expenses") / (10**greater_decimal_places)
-
-        rep["initial_balance"] = f"{initial_balance:.{greater_decimal_places}f}"
-        rep["end_balance"] = f"{end_balance:.{greater_decimal_places}f}"
-        rep["total_income"] = f"{total_income:.{greater_decimal_places}f}"
-        rep["total_expenses"] = f"{total_expenses:.{greater_decimal_places}f}"
+        for field in REPORT_AMOUNT_FIELDS:
+            rep[field] = format_amount(rep.get(field), greater_decimal_places)
 
         return rep
 
@@ -1,103 +1,263 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 import calendar
+from dateutil.relativedelta import relativedelta
+
+from celery import chord
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum, Window, Func
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
 
-from japb_api.users.models import User
 from japb_api.reports.models import ReportAccount, ReportCurrency
-from japb_api.accounts.models import Account
-from japb_api.currencies.models import Currency
+from japb_api.accounts.models import Account, AccountBalance
+from japb_api.transactions.models import Transaction
 from japb_api.celery import app
 
 
 def get_last_n_months(n=12):
-    today = datetime.today()
+    first_day_of_month = datetime.today().replace(day=1).date()
     result = []
 
-    # Loop through the last 12 months
-    for i in range(n):
+    # Loop through the last n months, oldest first
+    for i in reversed(range(n)):
         # Calculate the first day of the month
-        first_day = (today.replace(day=1) - timedelta(days=i * 30)).replace(day=1)
+        first_day = first_day_of_month - relativedelta(months=i)
         # Calculate the last day of the month
         last_day = first_day.replace(
             day=calendar.monthrange(first_day.year, first_day.month)[1]
         )
-        result.append([first_day, last_day])
+        result.append((first_day, last_day))
 
     return result
 
 
-def update_reports_of_account(account):
-    month_ranges = get_last_n_months(48)
+class RunningSum(Func):
+    # SUM() usable as a window over an aggregate: SUM(SUM(amount)) OVER (...)
+    function = "SUM"
+    window_compatible = True
 
-    for month_range in month_ranges:
-        from_date = month_range[0]
-        to_date = month_range[1]
 
-        # check existing report
-        report_account = ReportAccount.objects.filter(
-            user=account.user, account=account, from_date=from_date, to_date=to_date
+def get_monthly_account_movements(accounts):
+    """
+    Groups the transactions of the accounts by month in a single query, with the
+    income, expenses and the running balance of the account at the end of the month.
+    """
+    return (
+        Transaction.objects.filter(account__in=accounts, user=F("account__user"))
+        .annotate(month=TruncMonth("date"))
+        .values("account", "month")
+        .annotate(
+            total=Sum("amount"),
+            income=Sum("amount", filter=Q(amount__gt=0), default=0),
+            expenses=Sum("amount", filter=Q(amount__lt=0), default=0),
+            balance=Window(
+                RunningSum(Sum("amount")),
+                partition_by=[F("account")],
+                order_by=F("month").asc(),
+            ),
         )
-        if not report_account.exists():
-            report_account = ReportAccount.objects.create(
-                user=account.user, account=account, from_date=from_date, to_date=to_date
-            )
-        else:
-            # check for duplicated reports
-            if report_account.count() > 1:
-                report_account.exclude(pk=report_account.first().pk).delete()
-            report_account = report_account.first()
+        .order_by("account", "month")
+    )
+
+
+def get_monthly_currency_movements(accounts, since):
+    """
+    Groups the transactions of the users of the accounts by currency and month,
+    exchanges between accounts of the same currency are not income or expenses.
+    """
+    return (
+        Transaction.objects.filter(
+            user__in=accounts.values("user"),
+            date__gte=timezone.make_aware(datetime.combine(since, datetime.min.time())),
+        )
+        .annotate(month=TruncMonth("date"))
+        .values("user", "account__currency", "month")
+        .annotate(
+            income=Sum(
+                "amount",
+                filter=Q(amount__gt=0) & ~Q(currencyexchange__type="to_same_currency"),
+                default=0,
+            ),
+            expenses=Sum(
+                "amount",
+                filter=Q(amount__lt=0) & ~Q(currencyexchange__type="from_same_currency"),
+                default=0,
+            ),
+        )
+    )
+
 
-        report_account.calculate_initial_balance()\
-            .calculate_end_balance()\
-            .calculate_total_income()\
-            .calculate_total_expenses()\
-            .save()
+def calculate_account_reports(accounts, months):
+    movements = {}
+    for row in get_monthly_account_movements(accounts):
+        movements.setdefault(row["account"], []).append(row)
 
+    reports = {}
+    for account_id, user_id in accounts.values_list("pk", "user"):
+        rows = movements.get(account_id, [])
+        index = 0
+        balance = 0
+        for from_date, to_date in months:
+            # skip to the first month with transactions after the previous report
+            while index < len(rows) and rows[index]["month"].date() < from_date:
+                balance = rows[index]["balance"]
+                index += 1
 
-def update_reports_of_currency(currency, user):
-    month_ranges = get_last_n_months(48)
+            report = {
+                "to_date": to_date,
+                "initial_balance": balance,
+                "end_balance": balance,
+                "total_income": 0,
+                "total_expenses": 0,
+            }
+            if index < len(rows) and rows[index]["month"].date() == from_date:
+                report["end_balance"] = rows[index]["balance"]
+                report["total_income"] = rows[index]["income"]
+                report["total_expenses"] = rows[index]["expenses"]
 
-    for month_range in month_ranges:
-        from_date = month_range[0]
-        to_date = month_range[1]
+            reports[(user_id, account_id, from_date)] = report
 
-        report_currency = ReportCurrency.objects.filter(
-            user=user, currency=currency, from_date=from_date, to_date=to_date
+    return reports
+
+
+def calculate_currency_reports(accounts, months, account_reports):
+    currencies = dict(accounts.values_list("pk", "currency"))
+    reports = {}
+
+    # balances are the sum of the account reports of the currency
+    for (user_id, account_id, from_date), account_report in account_reports.items():
+        report = reports.setdefault(
+            (user_id, currencies[account_id], from_date),
+            {
+                "to_date": account_report["to_date"],
+                "initial_balance": 0,
+                "end_balance": 0,
+                "total_income": 0,
+                "total_expenses": 0,
+            },
         )
-        if not report_currency.exists():
-            report_currency = ReportCurrency.objects.create(
-                user=user, currency=currency, from_date=from_date, to_date=to_date
+        report["initial_balance"] += account_report["initial_balance"]
+        report["end_balance"] += account_report["end_balance"]
+
+    for row in get_monthly_currency_movements(accounts, months[0][0]):
+        key = (row["user"], row["account__currency"], row["month"].date())
+        if key in reports:
+            reports[key]["total_income"] = row["income"]
+            reports[key]["total_expenses"] = row["expenses"]
+
+    return reports
+
+
+def save_reports(model, key_field, reports):
+    """
+    Upserts the calculated reports, one INSERT ... ON CONFLICT per batch
+    on the unique period of the reports.
+    """
+    fields = ["initial_balance", "end_balance", "total_income", "total_expenses"]
+    now = timezone.now()
+
+    model.objects.bulk_create(
+        [
+            model(
+                user_id=user_id,
+                from_date=from_date,
+                created_at=now,
+                updated_at=now,
+                **{f"{key_field}_id": key_id},
+                **values,
             )
-        else:
-            # check for duplicated reports
-            if report_currency.count() > 1:
-                report_currency.exclude(pk=report_currency.first().pk).delete()
-            report_currency = report_currency.first()
+            for (user_id, key_id, from_date), values in reports.items()
+        ],
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=["user", key_field, "from_date", "to_date"],
+        update_fields=fields + ["updated_at"],
+    )
+
+
+def lock_account_balances(accounts):
+    """
+    Locks the balance ledger rows of the accounts until the end of the
+    transaction. Every saved transaction updates the ledger row of its account
+    before applying its delta to the reports, so while the rows are locked no
+    delta can be applied, and the rebuild reads the transactions committed
+    before it. Missing rows are created first, a missing row is a zero balance.
+    """
+    AccountBalance.lock(accounts.values_list("pk", flat=True))
+
+
+def rebuild_reports(accounts, n=48):
+    """
+    Recalculates the account and currency reports of the last `n` months of the
+    accounts with a couple of grouped queries instead of per report aggregates.
+    Currency reports are only built for the currencies the users have accounts in.
+    The reports are read and written in one transaction with the ledgers of the
+    accounts locked, so deltas of concurrent saves are not overwritten.
+    """
+    months = get_last_n_months(n)
 
-        report_currency.calculate_initial_balance()\
-            .calculate_end_balance()\
-            .calculate_total_income()\
-            .calculate_total_expenses()\
-            .save()
+    with transaction.atomic():
+        lock_account_balances(accounts)
 
+        account_reports = calculate_account_reports(accounts, months)
+        currency_reports = calculate_currency_reports(accounts, months, account_reports)
 
-def update_account_reports():
-    accounts = Account.objects.all()
+        save_reports(ReportAccount, "account", account_reports)
+        save_reports(ReportCurrency, "currency", currency_reports)
 
-    for account in accounts:
-        update_reports_of_account(account)
 
+def get_user_chunks(chunk_size):
+    user_ids = [
+        str(user_id) if user_id else None
+        for user_id in Account.objects.order_by("user").values_list("user", flat=True).distinct()
+    ]
+    return [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
 
-def update_currency_reports():
-    users = User.objects.all()
-    currencies = Currency.objects.all()
 
-    for user in users:
-        for currency in currencies:
-            update_reports_of_currency(currency, user)
+@app.task(bind=True)
+def update_reports_of_users(self, user_ids, chunk=1, chunks=1):
+    if self.request.id:
+        self.update_state(state="PROGRESS", meta={"chunk": chunk, "chunks": chunks})
+    print(f"Updating reports of {len(user_ids)} users (chunk {chunk} of {chunks})")
+
+    # accounts without user are rebuilt with the chunk that includes None
+    users_filter = Q(user__in=[user_id for user_id in user_ids if user_id])
+    if None in user_ids:
+        users_filter |= Q(user__isnull=True)
+    accounts = Account.objects.filter(users_filter)
+
+    rebuild_reports(accounts)
+    return {"users": len(user_ids), "accounts": accounts.count()}
+
+
+@app.task
+def summarize_user_reports(results):
+    summary = {
+        "chunks": len(results),
+        "users": sum(result["users"] for result in results),
+        "accounts": sum(result["accounts"] for result in results),
+    }
+    print(
+        f"Reports updated for {summary['users']} users and {summary['accounts']} accounts "
+        f"in {summary['chunks']} chunks"
+    )
+    return summary
 
 
 @app.task
-def update_user_reports():
-    update_account_reports()
-    update_currency_reports()
-    return "Reports updated successfully"
+def update_user_reports(chunk_size=None):
+    """
+    Splits the users with accounts in chunks and rebuilds the reports of every
+    chunk in its own subtask, so the rebuild runs in parallel on all the workers.
+    The results of the subtasks are aggregated by summarize_user_reports.
+    """
+    chunks = get_user_chunks(chunk_size or settings.REPORTS_REBUILD_CHUNK_SIZE)
+    if not chunks:
+        return "No reports to update"
+
+    result = chord(
+        update_reports_of_users.s(user_ids, index + 1, len(chunks))
+        for index, user_ids in enumerate(chunks)
+    )(summarize_user_reports.s())
+    return f"Updating reports in {len(chunks)} chunks ({result.id})"
@@ -358,3 +358,149 @@ class TestReportCurrencyModel(TestCase):
         self.assertEquals(report.end_balance, 14228)
         self.assertEquals(report.total_income, 2328)
         self.assertEquals(report.total_expenses, -100)
+
+
+class TestReportsIncrementalUpdates(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.currency = Currency.objects.create(name="Test Currency", symbol="T")
+        self.account = Account.objects.create(
+            user=self.user, name="Test Account", currency=self.currency
+        )
+        self.account2 = Account.objects.create(
+            user=self.user, name="Test Account 2", currency=self.currency
+        )
+        self.months = [
+            (date(2023, 1, 1), date(2023, 1, 31)),
+            (date(2023, 2, 1), date(2023, 2, 28)),
+            (date(2023, 3, 1), date(2023, 3, 31)),
+        ]
+        for from_date, to_date in self.months:
+            for account in [self.account, self.account2]:
+                ReportAccount.objects.create(
+                    user=self.user, account=account, from_date=from_date, to_date=to_date
+                )
+            ReportCurrency.objects.create(
+                user=self.user, currency=self.currency, from_date=from_date, to_date=to_date
+            )
+
+    def assertReportsAreUpToDate(self):
+        for report in list(ReportAccount.objects.all()) + list(ReportCurrency.objects.all()):
+            stored = (
+                report.initial_balance,
+                report.end_balance,
+                report.total_income,
+                report.total_expenses,
+            )
+            report.calculate_initial_balance()\
+                .calculate_end_balance()\
+                .calculate_total_income()\
+                .calculate_total_expenses()
+            calculated = (
+                report.initial_balance,
+                report.end_balance,
+                report.total_income,
+                report.total_expenses,
+            )
+            self.assertEqual(stored, calculated, f"{report.from_date} {report}")
+
+    def test_backdated_transaction_updates_its_month_and_later_months(self):
+        TransactionFactory(
+            user=self.user,
+            account=self.account,
+            amount=1000,
+            date=datetime(2023, 3, 10, tzinfo=pytz.UTC),
+        )
+        TransactionFactory(
+            user=self.user,
+            account=self.account,
+            amount=-300,
+            date=datetime(2023, 1, 15, tzinfo=pytz.UTC),
+        )
+
+        january = ReportAccount.objects.get(account=self.account, from_date=date(2023, 1, 1))
+        february = ReportAccount.objects.get(account=self.account, from_date=date(2023, 2, 1))
+        self.assertEqual(january.total_expenses, -300)
+        self.assertEqual(january.end_balance, -300)
+        self.assertEqual(february.initial_balance, -300)
+        self.assertEqual(february.end_balance, -300)
+        self.assertReportsAreUpToDate()
+
+    def test_updated_transaction_moves_its_amount(self):
+        transaction = TransactionFactory(
+            user=self.user,
+            account=self.account,
+            amount=1000,
+            date=datetime(2023, 1, 10, tzinfo=pytz.UTC),
+        )
+
+        transaction = Transaction.objects.get(pk=transaction.pk)
+        transaction.amount = -500
+        transaction.account = self.account2
+        transaction.date = datetime(2023, 2, 20, tzinfo=pytz.UTC)
+        transaction.save()
+
+        self.assertReportsAreUpToDate()
+
+    def test_deleted_transaction_is_reverted(self):
+        TransactionFactory(
+            user=self.user,
+            account=self.account,
+            amount=1000,
+            date=datetime(2023, 1, 10, tzinfo=pytz.UTC),
+        )
+        transaction = TransactionFactory(
+            user=self.user,
+            account=self.account,
+            amount=250,
+            date=datetime(2023, 2, 10, tzinfo=pytz.UTC),
+        )
+
+        transaction.delete()
+
+        self.assertReportsAreUpToDate()
+
+    def test_same_currency_exchanges_are_not_currency_income_or_expenses(self):
+        ex1 = CurrencyExchangeFactory(
+            user=self.user,
+            account=self.account,
+            amount=-700,
+            date=datetime(2023, 2, 1, tzinfo=pytz.UTC),
+            type="from_same_currency",
+        )
+        ex2 = CurrencyExchangeFactory(
+            user=self.user,
+            account=self.account2,
+            related_transaction=ex1,
+            amount=700,
+            date=datetime(2023, 2, 1, tzinfo=pytz.UTC),
+            type="to_same_currency",
+        )
+        ex1.related_transaction = ex2
+        ex1.save()
+
+        report = ReportCurrency.objects.get(from_date=date(2023, 2, 1))
+        self.assertEqual(report.total_income, 0)
+        self.assertEqual(report.total_expenses, 0)
+        self.assertReportsAreUpToDate()
+
+        ex1.delete()
+
+        self.assertReportsAreUpToDate()
+
+    def test_bulk_created_transactions_update_reports(self):
+        Transaction.objects.bulk_create(
+            [
+                Transaction(
+                    user=self.user,
+                    account=account,
+                    amount=amount,
+                    description="bulk",
+                    date=datetime(2023, month, 5, tzinfo=pytz.UTC),
+                )
+                for account in [self.account, self.account2]
+                for month, amount in [(1, 400), (1, -100), (2, 50), (3, -20)]
+            ]
+        )
+
+        self.assertReportsAreUpToDate()
@@ -0,0 +1,212 @@
+import pytz
+from datetime import date, datetime
+from unittest.mock import Mock, patch
+from django.test import TestCase
+from freezegun import freeze_time
+
+from japb_api.users.factories import UserFactory
+from japb_api.currencies.models import Currency
+from japb_api.accounts.models import Account, AccountBalance
+from japb_api.transactions.factories import TransactionFactory, CurrencyExchangeFactory
+from japb_api.reports.models import ReportAccount, ReportCurrency
+from japb_api.reports import tasks
+from japb_api.reports.tasks import (
+    rebuild_reports,
+    get_last_n_months,
+    get_user_chunks,
+    update_reports_of_users,
+    update_user_reports,
+)
+from japb_api.celery import app
+
+
+@freeze_time("2023-03-15")
+class TestRebuildReports(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.currency = Currency.objects.create(name="Test Currency", symbol="T")
+        self.currency2 = Currency.objects.create(name="Test Currency 2", symbol="T2")
+        self.unused_currency = Currency.objects.create(name="Unused", symbol="U")
+        self.account = Account.objects.create(
+            user=self.user, name="Test Account", currency=self.currency
+        )
+        self.account2 = Account.objects.create(
+            user=self.user, name="Test Account 2", currency=self.currency
+        )
+        self.account3 = Account.objects.create(
+            user=self.user, name="Test Account 3", currency=self.currency2
+        )
+
+        for account, month, amount in [
+            (self.account, 10, 5000),
+            (self.account, 1, 1200),
+            (self.account, 1, -300),
+            (self.account, 3, -150),
+            (self.account2, 2, 800),
+            (self.account3, 1, 70),
+        ]:
+            TransactionFactory(
+                user=self.user,
+                account=account,
+                amount=amount,
+                date=datetime(2023 if month < 4 else 2022, month, 10, tzinfo=pytz.UTC),
+            )
+
+        ex1 = CurrencyExchangeFactory(
+            user=self.user,
+            account=self.account,
+            amount=-400,
+            date=datetime(2023, 2, 5, tzinfo=pytz.UTC),
+            type="from_same_currency",
+        )
+        ex2 = CurrencyExchangeFactory(
+            user=self.user,
+            account=self.account2,
+            related_transaction=ex1,
+            amount=400,
+            date=datetime(2023, 2, 5, tzinfo=pytz.UTC),
+            type="to_same_currency",
+        )
+        ex1.related_transaction = ex2
+        ex1.save()
+
+    def assertReportMatchesCalculation(self, report):
+        stored = (
+            report.initial_balance,
+            report.end_balance,
+            report.total_income,
+            report.total_expenses,
+        )
+        report.calculate_initial_balance()\
+            .calculate_end_balance()\
+            .calculate_total_income()\
+            .calculate_total_expenses()
+        calculated = (
+            report.initial_balance,
+            report.end_balance,
+            report.total_income,
+            report.total_expenses,
+        )
+        self.assertEqual(stored, calculated, f"{report.from_date} {report}")
+
+    def test_get_last_n_months_returns_consecutive_months(self):
+        months = get_last_n_months(4)
+
+        self.assertEqual(
+            months,
+            [
+                (date(2022, 12, 1), date(2022, 12, 31)),
+                (date(2023, 1, 1), date(2023, 1, 31)),
+                (date(2023, 2, 1), date(2023, 2, 28)),
+                (date(2023, 3, 1), date(2023, 3, 31)),
+            ],
+        )
+
+    def test_rebuild_matches_report_calculations(self):
+        rebuild_reports(Account.objects.all(), n=6)
+
+        months = get_last_n_months(6)
+        self.assertEqual(ReportAccount.objects.count(), 3 * len(months))
+        self.assertEqual(ReportCurrency.objects.count(), 2 * len(months))
+        for report in ReportAccount.objects.all():
+            self.assertReportMatchesCalculation(report)
+        for report in ReportCurrency.objects.all():
+            self.assertReportMatchesCalculation(report)
+
+        february = ReportCurrency.objects.get(
+            currency=self.currency, from_date=date(2023, 2, 1)
+        )
+        self.assertEqual(february.initial_balance, 5900)
+        self.assertEqual(february.total_income, 800)
+        self.assertEqual(february.total_expenses, 0)
+
+    def test_rebuild_skips_currencies_without_accounts(self):
+        rebuild_reports(Account.objects.all(), n=6)
+
+        self.assertFalse(ReportCurrency.objects.filter(currency=self.unused_currency).exists())
+
+    def test_rebuild_upserts_existing_reports(self):
+        ReportAccount.objects.create(
+            user=self.user,
+            account=self.account,
+            from_date=date(2023, 1, 1),
+            to_date=date(2023, 1, 31),
+            initial_balance=1,
+            end_balance=1,
+        )
+
+        rebuild_reports(Account.objects.all(), n=6)
+        rebuild_reports(Account.objects.all(), n=6)
+
+        reports = ReportAccount.objects.filter(account=self.account, from_date=date(2023, 1, 1))
+        self.assertEqual(reports.count(), 1)
+        self.assertEqual(reports.get().initial_balance, 5000)
+        self.assertEqual(reports.get().end_balance, 5900)
+        self.assertEqual(ReportAccount.objects.count(), 3 * 6)
+
+    def test_rebuild_locks_the_ledgers_before_reading(self):
+        account = Account.objects.create(user=self.user, name="No movements", currency=self.currency)
+
+        with patch(
+            "japb_api.reports.tasks.lock_account_balances", wraps=tasks.lock_account_balances
+        ) as lock, patch(
+            "japb_api.reports.tasks.calculate_account_reports", wraps=tasks.calculate_account_reports
+        ) as calculate:
+            calls = Mock()
+            calls.attach_mock(lock, "lock")
+            calls.attach_mock(calculate, "calculate")
+            rebuild_reports(Account.objects.all(), n=6)
+
+        self.assertEqual([call[0] for call in calls.mock_calls], ["lock", "calculate"])
+        # missing ledgers are created so they can be locked, with a zero balance
+        self.assertEqual(AccountBalance.objects.get(account=account).balance, 0)
+        self.assertEqual(AccountBalance.objects.get(account=self.account).balance, 5350)
+
+@freeze_time("2023-03-15")
+class TestUpdateUserReports(TestCase):
+    def setUp(self):
+        app.conf.task_always_eager = True
+        self.currency = Currency.objects.create(name="Test Currency", symbol="T")
+        self.users = [UserFactory() for _ in range(5)]
+        for user in self.users:
+            account = Account.objects.create(user=user, name="Account", currency=self.currency)
+            TransactionFactory(
+                user=user,
+                account=account,
+                amount=1000,
+                date=datetime(2023, 2, 10, tzinfo=pytz.UTC),
+            )
+
+    def tearDown(self):
+        app.conf.task_always_eager = False
+
+    def test_get_user_chunks_splits_users_with_accounts(self):
+        UserFactory()  # without accounts
+
+        chunks = get_user_chunks(2)
+
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertCountEqual(
+            [user_id for chunk in chunks for user_id in chunk],
+            [str(user.id) for user in self.users],
+        )
+
+    def test_update_reports_of_users_only_rebuilds_their_accounts(self):
+        result = update_reports_of_users([str(self.users[0].id)])
+
+        self.assertEqual(result, {"users": 1, "accounts": 1})
+        self.assertEqual(
+            {str(user_id) for user_id in ReportAccount.objects.values_list("user", flat=True)},
+            {str(self.users[0].id)},
+        )
+
+    def test_update_user_reports_rebuilds_every_chunk(self):
+        update_user_reports.delay(chunk_size=2)
+
+        self.assertEqual(
+            ReportAccount.objects.count(), len(self.users) * len(get_last_n_months(48))
+        )
+        self.assertEqual(
+            {str(user_id) for user_id in ReportCurrency.objects.values_list("user", flat=True)},
+            {str(user.id) for user in self.users},
+        )
@@ -4,10 +4,12 @@ from datetime import datetime
 from faker import Faker
 from django.urls import reverse
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APITestCase
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from ..models import ReportAccount, ReportCurrency
+from ..serializers import ReportAccountSerializer, ReportCurrencySerializer
 from japb_api.users.factories import UserFactory
 from japb_api.accounts.models import Account
 from japb_api.currencies.models import Currency
@@ -94,6 +96,12 @@ class TestReportAccountViews(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertEqual(ReportAccount.objects.count(), 0)
 
+    def test_api_create_report_duplicated_period(self):
+        self.client.post(reverse("reports-list"), self.data, format="json")
+        response = self.client.post(reverse("reports-list"), self.data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(ReportAccount.objects.count(), 1)
+
     def test_api_create_report_calculates_balances_income_and_expences(self):
         Transaction.objects.bulk_create(self.transactions)
 
@@ -304,23 +312,6 @@ class TestReportCurrencyViews(APITestCase):
             amount=-25000,
         )
 
-        self.get_report_account_factory(
-            from_date=date(2023, 1, 1),
-            to_date=date(2023, 1, 31),
-            account=self.account1,
-        )
-        self.get_report_account_factory(
-            from_date=date(2023, 1, 1),
-            to_date=date(2023, 1, 31),
-            account=self.account2,
-        )
-
-        # not same currency and out of date range
-        self.get_report_account_factory(
-            from_date=date(2022, 1, 1),
-            to_date=date(2022, 1, 31),
-            account=self.account3,
-        )
         self.get_transaction_factory(
             account=self.account3,
             date=datetime(2023, 1, 1, tzinfo=pytz.UTC),
@@ -360,6 +351,25 @@ class TestReportCurrencyViews(APITestCase):
         ex3.related_transaction = ex4
         ex3.save()
 
+        # account reports already calculated for the month
+        self.get_report_account_factory(
+            from_date=date(2023, 1, 1),
+            to_date=date(2023, 1, 31),
+            account=self.account1,
+        )
+        self.get_report_account_factory(
+            from_date=date(2023, 1, 1),
+            to_date=date(2023, 1, 31),
+            account=self.account2,
+        )
+
+        # not same currency and out of date range
+        self.get_report_account_factory(
+            from_date=date(2022, 1, 1),
+            to_date=date(2022, 1, 31),
+            account=self.account3,
+        )
+
         response = self.client.post(
             reverse("reports-currency-list"), self.data, format="json"
         )
@@ -511,19 +521,6 @@ class TestReportCurrencyViews(APITestCase):
         self.assertEqual(json_data["to_date"], "2023-02-28")
 
     def test_api_updates_report_and_updates_calculations(self):
-        ReportAccountFactory(
-            user=self.user,
-            from_date=date(2023, 1, 1),
-            to_date=date(2023, 1, 31),
-            account=self.account1,
-        )
-        ReportAccountFactory(
-            user=self.user,
-            from_date=date(2023, 1, 1),
-            to_date=date(2023, 1, 31),
-            account=self.account2,
-        )
-        report = ReportCurrencyFactory(currency=self.currency, user=self.user)
         TransactionFactory.create_batch(
             2,
             account=self.account1,
@@ -538,6 +535,20 @@ class TestReportCurrencyViews(APITestCase):
             amount=-25000,
             user=self.user,
         )
+        # account reports already calculated for the month
+        ReportAccountFactory(
+            user=self.user,
+            from_date=date(2023, 1, 1),
+            to_date=date(2023, 1, 31),
+            account=self.account1,
+        )
+        ReportAccountFactory(
+            user=self.user,
+            from_date=date(2023, 1, 1),
+            to_date=date(2023, 1, 31),
+            account=self.account2,
+        )
+        report = ReportCurrencyFactory(currency=self.currency, user=self.user)
 
         url = reverse("reports-currency-detail", kwargs={"pk": report.id})
         data = {
@@ -574,3 +585,60 @@ class TestReportCurrencyViews(APITestCase):
 
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(ReportCurrency.objects.count(), 0)
+
+
+class TestReportListRendering(APITestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token.access_token}")
+
+        self.currency = Currency.objects.create(name="Test Currency", symbol="T")
+        self.other_currency = Currency.objects.create(name="Other Currency", symbol="O")
+        accounts = [
+            AccountFactory(user=self.user, currency=self.currency, decimal_places=2),
+            AccountFactory(user=self.user, currency=self.currency, decimal_places=3),
+            AccountFactory(user=self.user, currency=self.other_currency, decimal_places=0),
+        ]
+        balances = [(200000, 250000), (-1005, -2), (7, 7), (0, -123456789)]
+        for month, (initial_balance, end_balance) in enumerate(balances, start=1):
+            for account in accounts:
+                ReportAccountFactory(
+                    user=self.user,
+                    account=account,
+                    from_date=date(2023, month, 1),
+                    to_date=date(2023, month, 28),
+                    initial_balance=initial_balance,
+                    end_balance=end_balance,
+                    total_income=initial_balance + 1,
+                    total_expenses=-end_balance - 1,
+                )
+            for currency in (self.currency, self.other_currency):
+                ReportCurrencyFactory(
+                    user=self.user,
+                    currency=currency,
+                    from_date=date(2023, month, 1),
+                    to_date=date(2023, month, 28),
+                    initial_balance=initial_balance,
+                    end_balance=end_balance,
+                    total_income=initial_balance + 1,
+                    total_expenses=-end_balance - 1,
+                )
+
+    def test_report_list_renders_like_the_serializer(self):
+        response = self.client.get(reverse("reports-list"), {"ordering": "-from_date"})
+
+        expected = ReportAccountSerializer(
+            ReportAccount.objects.filter(user=self.user).order_by("-from_date"), many=True
+        ).data
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+    def test_currency_report_list_renders_like_the_serializer(self):
+        response = self.client.get(reverse("reports-currency-list"), {"ordering": "-from_date"})
+
+        expected = ReportCurrencySerializer(
+            ReportCurrency.objects.filter(user=self.user).order_by("-from_date"), many=True
+        ).data
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, JSONRenderer().render(expected))
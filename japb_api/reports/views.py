@@ -4,19 +4,24 @@ from .serializers import (
     ReportCurrencySerializer,
     ReportAccountFilterSet,
     ReportCurrencyFilterSet,
+    serialize_report_account_rows,
+    serialize_report_currency_rows,
 )
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status, viewsets, filters
+from rest_framework.renderers import BrowsableAPIRenderer
 
 from japb_api.core.permissions import IsOwner
+from japb_api.core.renderers import FastJSONRenderer
 
 
 class ReportAccountViewSet(viewsets.ModelViewSet):
     serializer_class = ReportAccountSerializer
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_class = ReportAccountFilterSet
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
     ordering_fields = ["from_date"]
     permission_classes = (
         IsAuthenticated,
@@ -53,8 +58,7 @@ class ReportAccountViewSet(viewsets.ModelViewSet):
 
     def list(self, request):
         reports = self.filter_queryset(self.get_queryset())
-        serializer = ReportAccountSerializer(reports, many=True)
-        return Response(serializer.data)
+        return Response(serialize_report_account_rows(reports))
 
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
@@ -88,6 +92,7 @@ class ReportCurrencyViewSet(viewsets.ModelViewSet):
     serializer_class = ReportCurrencySerializer
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_class = ReportCurrencyFilterSet
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
     ordering_fields = ["from_date"]
     permission_classes = (
         IsAuthenticated,
@@ -124,8 +129,7 @@ class ReportCurrencyViewSet(viewsets.ModelViewSet):
 
     def list(self, request):
         reports = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(reports, many=True)
-        return Response(serializer.data)
+        return Response(serialize_report_currency_rows(reports))
 
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
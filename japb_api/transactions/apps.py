@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class TransactionsConfig(AppConfig):
+    name = "japb_api.transactions"
+
+    def ready(self):
+        # Import signals here to ensure they are registered when the app is ready
+        from . import signals  # noqa
@@ -0,0 +1,168 @@
+from django.core.cache import cache
+from rest_framework import serializers
+
+from japb_api.accounts.models import Account
+from japb_api.core.money import parse_amount
+from .importer import validate_rows
+from .models import Transaction, CurrencyExchange, ExchangeComission, Category
+from .serializers import CurrencyExchangeSerializer, ExchangeComissionSerializer
+
+SYSTEM_CATEGORIES_KEY = "transactions:system_categories"
+SYSTEM_CATEGORIES_TIMEOUT = 60 * 60
+# the global categories given to the exchanges and their comissions
+SYSTEM_CATEGORY_NAMES = {
+    "from": "Exchanges",
+    "to": "Exchanges Income",
+    "comission": "Comissions",
+}
+
+
+def load_system_category_ids():
+    ids = dict(
+        Category.objects.filter(
+            user__isnull=True, name__in=SYSTEM_CATEGORY_NAMES.values()
+        ).values_list("name", "id")
+    )
+    # the categories are only used when all of them exist
+    if set(ids) != set(SYSTEM_CATEGORY_NAMES.values()):
+        return {}
+    return {key: ids[name] for key, name in SYSTEM_CATEGORY_NAMES.items()}
+
+
+def get_system_category_ids():
+    """
+    Ids of the exchange categories by "from", "to" and "comission", empty
+    when they don't exist. Kept in the shared cache until a change of the
+    categories is committed.
+    """
+    ids = cache.get(SYSTEM_CATEGORIES_KEY)
+    if ids:
+        return ids
+
+    ids = load_system_category_ids()
+    # missing categories are looked up again, they may be created at any time
+    if ids:
+        cache.set(SYSTEM_CATEGORIES_KEY, ids, SYSTEM_CATEGORIES_TIMEOUT)
+    return ids
+
+
+def invalidate_system_categories():
+    cache.delete(SYSTEM_CATEGORIES_KEY)
+
+
+class CurrencyExchangeInputSerializer(serializers.Serializer):
+    from_account = serializers.IntegerField()
+    to_account = serializers.IntegerField()
+    # read as Decimals, parse_amount scales them to the decimal places of the accounts
+    from_amount = serializers.DecimalField(max_digits=None, decimal_places=None)
+    to_amount = serializers.DecimalField(max_digits=None, decimal_places=None)
+    description = serializers.CharField(max_length=500, required=False, allow_blank=True)
+    date = serializers.DateTimeField()
+
+
+class CurrencyExchangeCreator:
+    """
+    Creates currency exchanges of a user, each one is a pair of related
+    CurrencyExchange rows and, between accounts of the same currency, an
+    ExchangeComission for the difference of the amounts.
+
+    Accounts are prefetched once for the whole batch and the categories come
+    from the cache. Every exchange is validated before anything is written,
+    then all the rows are inserted already linked to each other with a
+    single bulk_create, in one database transaction.
+    """
+
+    def __init__(self, user, context=None):
+        self.user = user
+        self.context = context or {}
+        self.errors = []
+        self.exchanges = []
+
+    def is_valid(self, rows):
+        """Validates the rows and builds the exchanges of the valid ones"""
+        validated_rows, errors = validate_rows(CurrencyExchangeInputSerializer, rows)
+        account_ids = {row[key] for _, row in validated_rows for key in ("from_account", "to_account")}
+        # accounts of other users are invalid like missing ones
+        accounts = Account.objects.filter(user=self.user, pk__in=account_ids).select_related(
+            "currency"
+        )
+        accounts = {account.pk: account for account in accounts}
+        categories = get_system_category_ids()
+
+        self.errors = errors
+        self.exchanges = []
+        for index, row in validated_rows:
+            account_from = accounts.get(row["from_account"])
+            account_to = accounts.get(row["to_account"])
+            if account_from is None or account_to is None:
+                self.errors[index] = {"errors": {"accounts": "Invalid Accounts"}}
+                continue
+
+            self.exchanges.append(self.build_exchange(row, account_from, account_to, categories))
+
+        return not any(self.errors)
+
+    def build_exchange(self, row, account_from, account_to, categories):
+        description = row.get(
+            "description", f"Exchange from {account_from.name} to {account_to.name}"
+        )
+        from_amount = parse_amount(row["from_amount"], account_from.decimal_places)
+        to_amount = parse_amount(row["to_amount"], account_to.decimal_places)
+        same_currency = account_from.currency_id == account_to.currency_id
+        comission_amount = from_amount - to_amount
+
+        exchange_from = CurrencyExchange(
+            user=self.user,
+            account=account_from,
+            category_id=categories.get("from"),
+            # between accounts of the same currency the comission is its own transaction
+            amount=-to_amount if same_currency else -from_amount,
+            description=description,
+            date=row["date"],
+            type="from_same_currency" if same_currency else "from_different_currency",
+        )
+        exchange_to = CurrencyExchange(
+            user=self.user,
+            account=account_to,
+            category_id=categories.get("to"),
+            amount=to_amount,
+            description=description,
+            date=row["date"],
+            type="to_same_currency" if same_currency else "to_different_currency",
+            related_transaction=exchange_from,
+        )
+        exchange_from.related_transaction = exchange_to
+
+        comission = None
+        if same_currency and comission_amount != 0:
+            comission = ExchangeComission(
+                user=self.user,
+                account=account_from,
+                category_id=categories.get("comission"),
+                amount=-comission_amount,
+                description=f"Comission for {description}",
+                date=row["date"],
+                type="comission" if from_amount >= to_amount else "profit",
+                exchange_from=exchange_from,
+                exchange_to=exchange_to,
+            )
+        return exchange_from, exchange_to, comission
+
+    def save(self):
+        """Inserts every exchange, returns them as (from, to, comission or None)"""
+        # balances and reports are applied by bulk_create itself
+        Transaction.objects.bulk_create(
+            [row for exchange in self.exchanges for row in exchange if row is not None]
+        )
+        return self.exchanges
+
+    def get_data(self, exchange):
+        """The exchange as returned by the create endpoint"""
+        exchange_from, exchange_to, comission = exchange
+        data = [
+            CurrencyExchangeSerializer(exchange_from, context=self.context).data,
+            CurrencyExchangeSerializer(exchange_to, context=self.context).data,
+        ]
+        if comission is not None:
+            data.append(ExchangeComissionSerializer(comission, context=self.context).data)
+        return data
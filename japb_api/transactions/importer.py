@@ -0,0 +1,119 @@
+from django.db.models import Q
+from rest_framework import serializers
+
+from japb_api.accounts.models import Account
+from japb_api.core.money import parse_amount
+from japb_api.currencies.rates import get_rate_timeline
+from .models import Transaction, Category
+
+
+class TransactionImportSerializer(serializers.Serializer):
+    """
+    Validates a single imported row, accounts and categories are resolved
+    by the importer against prefetched maps instead of a query per row
+    """
+
+    # read as a Decimal, parse_amount scales it without a float round-trip
+    amount = serializers.DecimalField(max_digits=None, decimal_places=None)
+    description = serializers.CharField(max_length=500)
+    account = serializers.IntegerField()
+    category = serializers.IntegerField(required=False, allow_null=True)
+    date = serializers.DateTimeField()
+
+
+def validate_rows(serializer_class, rows):
+    """
+    Validates every row with the serializer like a list serializer does,
+    returns the (index, validated data) of the valid rows and the errors of
+    every row, empty for the valid ones
+    """
+    validated_rows = []
+    errors = []
+    for row in rows:
+        serializer = serializer_class(data=row)
+        if serializer.is_valid():
+            validated_rows.append((len(errors), serializer.validated_data))
+            errors.append({})
+        else:
+            errors.append(serializer.errors)
+    return validated_rows, errors
+
+
+class TransactionImporter:
+    """
+    Imports transactions of a user in bulk.
+
+    Accounts and categories are prefetched once for the whole batch and
+    conversion rates are resolved in memory from the rate timelines. Every
+    row is validated before anything is written and the transactions are
+    inserted with a single bulk_create.
+    """
+
+    batch_size = 1000
+
+    def __init__(self, user):
+        self.user = user
+        self.errors = []
+        self.transactions = []
+
+    def is_valid(self, rows):
+        """
+        Validates the rows and builds the transactions of the valid ones,
+        errors are kept per row like a list serializer does
+        """
+        validated_rows, errors = validate_rows(TransactionImportSerializer, rows)
+        rows = [row for _, row in validated_rows]
+        accounts = Account.objects.filter(
+            user=self.user, pk__in={row["account"] for row in rows}
+        ).select_related("currency")
+        accounts = {account.pk: account for account in accounts}
+        categories = set(
+            Category.objects.filter(
+                Q(user=self.user) | Q(user__isnull=True),
+                pk__in={row.get("category") for row in rows} - {None},
+            ).values_list("pk", flat=True)
+        )
+        # currencies without a default conversion source have no rates
+        timelines = {
+            currency.id: get_rate_timeline(currency.id, "USD", currency.default_conversion_source)
+            for currency in {account.currency for account in accounts.values()}
+            if currency.default_conversion_source
+        }
+
+        self.errors = errors
+        self.transactions = []
+        for index, row in validated_rows:
+            row_errors = self.errors[index]
+            account = accounts.get(row["account"])
+            if account is None:
+                row_errors["account"] = [f'Invalid pk "{row["account"]}" - object does not exist.']
+            category = row.get("category")
+            if category is not None and category not in categories:
+                row_errors["category"] = [f'Invalid pk "{category}" - object does not exist.']
+
+            if row_errors:
+                continue
+
+            timeline = timelines.get(account.currency_id)
+            rate = timeline.rate_at(row["date"]) if timeline else None
+            self.transactions.append(
+                Transaction(
+                    user=self.user,
+                    account=account,
+                    category_id=category,
+                    amount=parse_amount(row["amount"], account.decimal_places),
+                    description=row["description"],
+                    date=row["date"],
+                    to_main_currency_amount=(
+                        int(parse_amount(row["amount"], 2) / rate) if rate else None
+                    ),
+                )
+            )
+
+        return not any(self.errors)
+
+    def save(self):
+        # balances and reports are applied by bulk_create itself
+        return Transaction.objects.bulk_create(
+            self.transactions, batch_size=self.batch_size
+        )
@@ -0,0 +1,123 @@
+from collections import namedtuple, defaultdict
+from django.utils import timezone
+
+from japb_api.accounts.models import Account, AccountBalance
+from japb_api.reports.models import ReportAccount, ReportCurrency
+from .models import Transaction, CurrencyExchange
+
+# What a stored transaction contributes to the account balance and reports
+TransactionEntry = namedtuple(
+    "TransactionEntry",
+    ["user_id", "account_id", "currency_id", "amount", "day", "exchange_type"],
+)
+
+
+def get_report_day(date):
+    date = Transaction._meta.get_field("date").to_python(date)
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return timezone.localtime(date).date()
+
+
+def load_entry(pk):
+    row = (
+        Transaction.objects.select_for_update(of=("self",))
+        .filter(pk=pk)
+        .values_list(
+            "user_id",
+            "account_id",
+            "account__currency_id",
+            "amount",
+            "date",
+            "currencyexchange__type",
+        )
+        .first()
+    )
+    if not row:
+        return None
+
+    user_id, account_id, currency_id, amount, date, exchange_type = row
+    return TransactionEntry(
+        user_id, account_id, currency_id, amount, get_report_day(date), exchange_type
+    )
+
+
+def entry_from_instance(instance, previous=None):
+    exchange_type = previous.exchange_type if previous else None
+    if isinstance(instance, CurrencyExchange):
+        exchange_type = instance.type
+
+    if previous and previous.account_id == instance.account_id:
+        currency_id = previous.currency_id
+    else:
+        currency_id = instance.account.currency_id
+
+    return TransactionEntry(
+        instance.user_id,
+        instance.account_id,
+        currency_id,
+        Transaction._meta.get_field("amount").to_python(instance.amount),
+        get_report_day(instance.date),
+        exchange_type,
+    )
+
+
+def apply_entry_to_reports(entry, reverse=False):
+    ReportAccount.apply_transaction(
+        entry.user_id, entry.account_id, entry.day, entry.amount, reverse=reverse
+    )
+    ReportCurrency.apply_transaction(
+        entry.user_id,
+        entry.currency_id,
+        entry.day,
+        entry.amount,
+        entry.exchange_type,
+        reverse=reverse,
+    )
+
+
+def apply_entry(entry, reverse=False):
+    AccountBalance.apply_delta(entry.account_id, -entry.amount if reverse else entry.amount)
+    apply_entry_to_reports(entry, reverse=reverse)
+
+
+def apply_changed_entry(previous, current):
+    if previous == current:
+        return
+
+    if previous:
+        apply_entry(previous, reverse=True)
+    if current:
+        apply_entry(current)
+
+
+def apply_created_transactions(transactions):
+    """
+    Applies many new transactions at once, each account balance is updated
+    once and the reports once per day and kind of movement.
+    """
+    currencies = dict(
+        Account.objects.filter(
+            pk__in={transaction.account_id for transaction in transactions}
+        ).values_list("pk", "currency_id")
+    )
+
+    balances = defaultdict(int)
+    movements = defaultdict(int)
+    for transaction in transactions:
+        amount = Transaction._meta.get_field("amount").to_python(transaction.amount)
+        day = get_report_day(transaction.date)
+        exchange_type = transaction.type if isinstance(transaction, CurrencyExchange) else None
+        balances[transaction.account_id] += amount
+        movements[
+            (transaction.user_id, transaction.account_id, day, amount > 0, exchange_type)
+        ] += amount
+
+    # ledger rows are locked in account order, like the report rebuild does
+    for account_id, amount in sorted(balances.items()):
+        AccountBalance.apply_delta(account_id, amount)
+
+    for (user_id, account_id, day, _, exchange_type), amount in movements.items():
+        apply_entry_to_reports(
+            TransactionEntry(user_id, account_id, currencies[account_id], amount, day, exchange_type)
+        )
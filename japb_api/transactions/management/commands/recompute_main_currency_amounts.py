@@ -0,0 +1,51 @@
+from datetime import date
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from japb_api.transactions.tasks import recompute_main_currency_amounts, update_main_currency_amounts
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes to_main_currency_amount of the transactions in a date range "
+        "from the rates at their dates, after rates were backfilled or corrected"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="First day (YYYY-MM-DD)")
+        parser.add_argument("--end", type=date.fromisoformat, help="Last day (YYYY-MM-DD)")
+        parser.add_argument("--currency", type=int, help="Only the transactions of this currency id")
+        parser.add_argument(
+            "--after", type=int, default=0, help="Resume after this transaction id"
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=settings.MAIN_CURRENCY_RECOMPUTE_CHUNK_SIZE
+        )
+        parser.add_argument(
+            "--background", action="store_true", help="Queue the recompute as a celery task"
+        )
+
+    def handle(self, *args, **options):
+        if options["background"]:
+            task = update_main_currency_amounts.delay(
+                options["start"] and options["start"].isoformat(),
+                options["end"] and options["end"].isoformat(),
+                options["currency"],
+                options["after"],
+                options["chunk_size"],
+            )
+            self.stdout.write(self.style.SUCCESS(f"Recompute queued ({task.id})"))
+            return
+
+        total = 0
+        for last_pk, updated in recompute_main_currency_amounts(
+            options["start"],
+            options["end"],
+            options["currency"],
+            options["after"],
+            options["chunk_size"],
+        ):
+            total += updated
+            self.stdout.write(f"Recomputed up to transaction {last_pk} ({total} updated)")
+
+        self.stdout.write(self.style.SUCCESS(f"{total} transactions recomputed"))
@@ -0,0 +1,42 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("transactions", "0013_transactionitem"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "account", "date"], name="transaction_user_acc_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "-date"], name="transaction_user_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("amount__gt", 0)),
+                fields=["user", "account", "date"],
+                include=("amount",),
+                name="transaction_income_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("amount__lt", 0)),
+                fields=["user", "account", "date"],
+                include=("amount",),
+                name="transaction_expense_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("transactions", "0014_transaction_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="transaction",
+            name="transaction_user_date_idx",
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["user", "-date", "-id"], name="transaction_user_date_idx"
+            ),
+        ),
+    ]
@@ -1,8 +1,63 @@
-from django.db import models
+from django.db import connections, models, transaction as db_transaction
 from django.core.validators import MinValueValidator
 from ..accounts.models import Account
 
 
+class TransactionQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create doesn't send signals, apply the new transactions to the
+        # account balance ledger and reports in grouped updates instead
+        from .ledger import apply_created_transactions
+
+        objs = list(objs)
+        with db_transaction.atomic(using=self.db):
+            if any(obj._meta.parents for obj in objs):
+                self._bulk_create_inherited(objs, kwargs.get("batch_size"))
+            else:
+                objs = super().bulk_create(objs, *args, **kwargs)
+            apply_created_transactions(objs)
+        return objs
+
+    def _bulk_create_inherited(self, objs, batch_size=None):
+        """
+        Django can't bulk_create multi-table children like exchanges and
+        comissions. The Transaction rows of every object are inserted with a
+        single bulk_create, then the rows of each child table with one insert,
+        so children may point to each other (related_transaction) before any
+        of them exists. Needs a database that returns the ids of bulk inserts.
+        """
+        parent_fields = [field for field in Transaction._meta.concrete_fields if not field.primary_key]
+        parents = [
+            Transaction(**{field.attname: getattr(obj, field.attname) for field in parent_fields})
+            for obj in objs
+        ]
+        models.QuerySet(Transaction, using=self.db).bulk_create(parents, batch_size=batch_size)
+
+        children = {}
+        for obj, parent in zip(objs, parents):
+            # the auto_now dates are set on the parents by the insert
+            for field in parent_fields:
+                setattr(obj, field.attname, getattr(parent, field.attname))
+            obj.id = parent.id
+            if obj._meta.parents:
+                setattr(obj, obj._meta.pk.attname, parent.id)
+                children.setdefault(type(obj), []).append(obj)
+            obj._state.adding = False
+            obj._state.db = self.db
+
+        ops = connections[self.db].ops
+        for model, rows in children.items():
+            fields = model._meta.local_concrete_fields
+            for obj in rows:
+                # links to objects of the same batch now have their ids
+                obj._prepare_related_fields_for_save(operation_name="bulk_create")
+            size = ops.bulk_batch_size(fields, rows)
+            if batch_size:
+                size = min(size, batch_size)
+            for start in range(0, len(rows), size):
+                model._base_manager._insert(rows[start:start + size], fields=fields, using=self.db)
+
+
 class Transaction(models.Model):
     user = models.ForeignKey("users.User", null=True, on_delete=models.CASCADE)
     account = models.ForeignKey(Account, on_delete=models.PROTECT)
@@ -14,9 +69,39 @@ class Transaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = TransactionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # reports and account filters: user + account + date range
+            models.Index(fields=["user", "account", "date"], name="transaction_user_acc_date_idx"),
+            # currency reports and listings: user + date range / ordering,
+            # the id breaks date ties for the keyset pagination of the listings
+            models.Index(fields=["user", "-date", "-id"], name="transaction_user_date_idx"),
+            # income and expenses sums only read the amount of one sign
+            models.Index(
+                fields=["user", "account", "date"],
+                include=["amount"],
+                condition=models.Q(amount__gt=0),
+                name="transaction_income_idx",
+            ),
+            models.Index(
+                fields=["user", "account", "date"],
+                include=["amount"],
+                condition=models.Q(amount__lt=0),
+                name="transaction_expense_idx",
+            ),
+        ]
+
     def __str__(self):
         return f"{self.description} {self.amount}"
 
+    def save(self, *args, **kwargs):
+        # the account balance ledger and reports are updated by signals
+        # around the save, keep all the writes in the same database transaction
+        with db_transaction.atomic():
+            super().save(*args, **kwargs)
+
 class TransactionItem(models.Model):
     transaction = models.ForeignKey("Transaction", on_delete=models.CASCADE)
     product = models.ForeignKey("products.Product", on_delete=models.CASCADE)
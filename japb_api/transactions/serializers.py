@@ -2,6 +2,8 @@ import django_filters
 from rest_framework import serializers
 from .models import Transaction, CurrencyExchange, ExchangeComission, Category, TransactionItem
 from japb_api.accounts.models import Account
+from .statements import DECIMAL_SEPARATORS, STATEMENT_FORMATS, get_statement_format
+from japb_api.core.money import format_amount
 
 
 class TransactionItemSerializer(serializers.ModelSerializer):
@@ -45,13 +47,13 @@ class TransactionSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         rep = super().to_representation(instance)
-        amount = rep.get("amount") / (10**instance.account.decimal_places)
-        rep["amount"] = f"{amount:.{instance.account.decimal_places}f}"
+        decimal_places = instance.account.decimal_places
+        rep["amount"] = format_amount(rep.get("amount"), decimal_places)
         if instance.to_main_currency_amount:
-            to_main_currency_amount = instance.to_main_currency_amount / (
-                10**instance.account.decimal_places
+            # scaled by the decimal places of the account, shown with 2 decimals
+            rep["to_main_currency_amount"] = format_amount(
+                instance.to_main_currency_amount, decimal_places, 2
             )
-            rep["to_main_currency_amount"] = f"{to_main_currency_amount:.2f}"
         return rep
 
     def update(self, instance, validated_data):
@@ -76,6 +78,55 @@ class TransactionSerializer(serializers.ModelSerializer):
         return instance
 
 
+# values() of the transactions read by serialize_transaction_rows
+TRANSACTION_ROW_FIELDS = (
+    "id",
+    "amount",
+    "to_main_currency_amount",
+    "description",
+    "account",
+    "category",
+    "date",
+    "account__decimal_places",
+)
+
+
+def serialize_transaction_rows(rows):
+    """
+    Same output as TransactionSerializer(many=True).data for the values() rows
+    of TRANSACTION_ROW_FIELDS, without the per field work of the serializer.
+    The items of all the rows are read with a single query.
+    """
+    rows = list(rows)
+    items = {}
+    transaction_items = (
+        TransactionItem.objects.filter(transaction__in=[row["id"] for row in rows])
+        .order_by("id")
+        .values("id", "transaction", "product", "quantity", "price", "total_price")
+    )
+    for item in transaction_items:
+        items.setdefault(item.pop("transaction"), []).append(item)
+
+    date_field = serializers.DateTimeField()
+    return [
+        {
+            "id": row["id"],
+            "amount": format_amount(row["amount"], row["account__decimal_places"]),
+            "to_main_currency_amount": format_amount(
+                row["to_main_currency_amount"], row["account__decimal_places"], 2
+            )
+            if row["to_main_currency_amount"]
+            else row["to_main_currency_amount"],
+            "description": row["description"],
+            "account": row["account"],
+            "category": row["category"],
+            "date": date_field.to_representation(row["date"]),
+            "transaction_items": items.get(row["id"], []),
+        }
+        for row in rows
+    ]
+
+
 class CurrencyExchangeSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
 
@@ -96,8 +147,7 @@ class CurrencyExchangeSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         rep = super().to_representation(instance)
-        amount = rep.get("amount") / (10**instance.account.decimal_places)
-        rep["amount"] = f"{amount:.{instance.account.decimal_places}f}"
+        rep["amount"] = format_amount(rep.get("amount"), instance.account.decimal_places)
         return rep
 
 
@@ -120,8 +170,7 @@ class ExchangeComissionSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         rep = super().to_representation(instance)
-        amount = rep.get("amount") / (10**instance.account.decimal_places)
-        rep["amount"] = f"{amount:.{instance.account.decimal_places}f}"
+        rep["amount"] = format_amount(rep.get("amount"), instance.account.decimal_places)
         return rep
 
 
@@ -149,6 +198,29 @@ class CategorySerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
 
 
+class StatementUploadSerializer(serializers.Serializer):
+    file = serializers.FileField()
+    account = serializers.PrimaryKeyRelatedField(queryset=Account.objects.all())
+    format = serializers.ChoiceField(choices=STATEMENT_FORMATS, required=False)
+    # detected from every amount when not given
+    decimal_separator = serializers.ChoiceField(choices=DECIMAL_SEPARATORS, required=False)
+
+    def validate_account(self, account):
+        if account.user != self.context["request"].user:
+            raise serializers.ValidationError(
+                f'Invalid pk "{account.pk}" - object does not exist.'
+            )
+        return account
+
+    def validate(self, data):
+        data["format"] = data.get("format") or get_statement_format(data["file"].name)
+        if not data["format"]:
+            raise serializers.ValidationError(
+                {"format": f"Unsupported statement format, use one of: {', '.join(STATEMENT_FORMATS)}"}
+            )
+        return data
+
+
 class TransactionFilterSet(django_filters.FilterSet):
     start_date = django_filters.DateTimeFilter(field_name="date", lookup_expr="gte")
     end_date = django_filters.DateTimeFilter(field_name="date", lookup_expr="lte")
@@ -0,0 +1,55 @@
+from django.db import transaction as db_transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+
+from .exchanges import invalidate_system_categories
+from .ledger import load_entry, entry_from_instance, apply_changed_entry
+from .models import Transaction, CurrencyExchange, ExchangeComission, Category
+
+# Every change of a transaction is applied as a delta to the balance ledger
+# of its account and to the stored reports of the account and its currency.
+#
+# post_save is sent with the concrete class of the saved instance, while
+# pre/post_delete are also sent for the parent Transaction row of exchanges
+# and comissions, so deletes are only tracked through Transaction.
+TRANSACTION_MODELS = (Transaction, CurrencyExchange, ExchangeComission)
+
+
+def store_previous_entry(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    instance._previous_entry = None
+    if instance.pk is not None:
+        instance._previous_entry = load_entry(instance.pk)
+
+
+def apply_saved_transaction(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+
+    previous = getattr(instance, "_previous_entry", None)
+    apply_changed_entry(previous, entry_from_instance(instance, previous))
+    instance._previous_entry = None
+
+
+def apply_deleted_transaction(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_entry", None)
+    apply_changed_entry(previous or entry_from_instance(instance), None)
+
+
+for model in TRANSACTION_MODELS:
+    pre_save.connect(store_previous_entry, sender=model)
+    post_save.connect(apply_saved_transaction, sender=model)
+
+pre_delete.connect(store_previous_entry, sender=Transaction)
+post_delete.connect(apply_deleted_transaction, sender=Transaction)
+
+
+# the ids of the exchange categories are cached until a category changes,
+# dropped after the commit so nothing reloads the ids of the old rows
+def invalidate_cached_categories(sender, **kwargs):
+    db_transaction.on_commit(invalidate_system_categories)
+
+
+post_save.connect(invalidate_cached_categories, sender=Category)
+post_delete.connect(invalidate_cached_categories, sender=Category)
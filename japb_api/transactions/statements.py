@@ -0,0 +1,231 @@
+import codecs
+import csv
+import html
+import re
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from itertools import islice
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+STATEMENT_FORMATS = ("csv", "ofx")
+DECIMAL_SEPARATORS = (".", ",")
+
+# OFX dates: YYYYMMDD[HHMMSS[.XXX]][[offset:TZ]]
+OFX_DATE_RE = re.compile(
+    r"^(?P<date>\d{8})(?P<time>\d{6})?(?:\.\d+)?(?:\[(?P<offset>[+-]?\d+(?:\.\d+)?)(?::\w+)?\])?"
+)
+
+AMOUNT_RE = re.compile(r"^(?P<sign>[+-]?)(?P<number>\d(?:[\d.,]*\d)?)$")
+# integer part with a thousands separator, the separator is the group
+GROUPED_RE = r"^\d{1,3}(?:%s\d{3})+$"
+
+
+class StatementError(ValueError):
+    pass
+
+
+def get_statement_format(filename):
+    extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+    if extension == "qfx":
+        return "ofx"
+    return extension if extension in STATEMENT_FORMATS else None
+
+
+def parse_statement_date(value):
+    value = value.strip()
+    date = parse_datetime(value)
+    if date is None:
+        day = parse_date(value)
+        if day is None:
+            raise StatementError(f'Invalid date "{value}"')
+        date = datetime.combine(day, time.min)
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def parse_ofx_date(value):
+    match = OFX_DATE_RE.match(value.strip())
+    if not match:
+        raise StatementError(f'Invalid date "{value}"')
+
+    date = datetime.strptime(match["date"] + (match["time"] or "000000"), "%Y%m%d%H%M%S")
+    if match["offset"] is None:
+        return timezone.make_aware(date)
+    offset = timedelta(hours=float(match["offset"]))
+    return date.replace(tzinfo=dt_timezone(offset))
+
+
+def get_decimal_separator(number, grouped=True):
+    """
+    Decimal separator of an amount: the last of "." and "," when both are
+    used, and the other one when a separator is used more than once. None
+    for a single separator followed by three digits, "1.234" could also
+    group thousands unless the amount starts with 0.
+    """
+    position = max(number.rfind("."), number.rfind(","))
+    if position == -1:
+        return "."
+    separator = number[position]
+    other = "," if separator == "." else "."
+    if other in number:
+        return separator
+    if number.count(separator) > 1:
+        return other
+    if grouped and len(number) - position == 4 and not number.startswith("0"):
+        return None
+    return separator
+
+
+def normalize_amount(value, decimal_separator=None, grouped=True):
+    """
+    Amount of a statement as a decimal string with a "." separator, like
+    "1234.56" for "1.234,56". The decimal separator is detected when not
+    given, amounts of statements without thousands separators are not
+    grouped. Raises StatementError for invalid and ambiguous amounts.
+    """
+    match = AMOUNT_RE.match(value.strip().replace(" ", ""))
+    if not match:
+        raise StatementError(f'Invalid amount "{value}"')
+    number = match["number"]
+    if decimal_separator is None:
+        decimal_separator = get_decimal_separator(number, grouped)
+        if decimal_separator is None:
+            raise StatementError(
+                f'Ambiguous amount "{value}", the decimal separator of the statement is needed'
+            )
+
+    thousands = "," if decimal_separator == "." else "."
+    units, _, decimals = number.partition(decimal_separator)
+    if decimal_separator in decimals or thousands in decimals:
+        raise StatementError(f'Invalid amount "{value}"')
+    if thousands in units:
+        if not grouped or not re.match(GROUPED_RE % re.escape(thousands), units):
+            raise StatementError(f'Invalid amount "{value}"')
+        units = units.replace(thousands, "")
+    return match["sign"] + units + (f".{decimals}" if decimals else "")
+
+
+def iter_text(file, encoding="utf-8", chunk_size=64 * 1024):
+    """decodes a binary file in chunks"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        yield decoder.decode(chunk)
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_lines(file, encoding="utf-8"):
+    buffer = ""
+    for text in iter_text(file, encoding):
+        buffer += text
+        # the last piece may be an incomplete line, keep it for the next chunk
+        *lines, buffer = buffer.splitlines(keepends=True) or [""]
+        yield from lines
+    if buffer:
+        yield buffer
+
+
+def parse_csv(file, encoding="utf-8-sig"):
+    """
+    Yields the rows of a CSV statement with date, description and amount
+    columns and an optional category column (by name)
+    """
+    reader = csv.DictReader(iter_lines(file, encoding))
+    columns = {name.strip().lower() for name in reader.fieldnames or []}
+    missing = {"date", "description", "amount"} - columns
+    if missing:
+        raise StatementError(f"Missing columns: {', '.join(sorted(missing))}")
+
+    for row in reader:
+        row = {(key or "").strip().lower(): (value or "").strip() for key, value in row.items()}
+        yield reader.line_num, {
+            "date": row["date"],
+            "description": row["description"],
+            "amount": row["amount"],
+            "category": row.get("category") or None,
+        }
+
+
+def iter_ofx_tags(file, encoding="utf-8"):
+    """
+    Yields (tag, value) pairs of an OFX file, closing tags are yielded with a
+    leading "/". Works for SGML (v1) and XML (v2) files with or without newlines.
+    """
+    buffer = ""
+    for text in iter_text(file, encoding):
+        buffer += text
+        *tokens, buffer = buffer.split("<")
+        for token in tokens:
+            if ">" in token:
+                tag, value = token.split(">", 1)
+                yield tag.strip().upper(), html.unescape(value.strip())
+    if ">" in buffer:
+        tag, value = buffer.split(">", 1)
+        yield tag.strip().upper(), html.unescape(value.strip())
+
+
+def parse_ofx(file, encoding="utf-8"):
+    """Yields the STMTTRN entries of an OFX/QFX statement"""
+    entry = None
+    number = 0
+    for tag, value in iter_ofx_tags(file, encoding):
+        if tag == "STMTTRN":
+            entry = {}
+        elif tag == "/STMTTRN" and entry is not None:
+            number += 1
+            yield number, {
+                "date": entry.get("DTPOSTED", ""),
+                "description": entry.get("NAME") or entry.get("MEMO") or "",
+                "amount": entry.get("TRNAMT", ""),
+                "category": None,
+            }
+            entry = None
+        elif entry is not None and value:
+            entry.setdefault(tag, value)
+
+
+def parse_row_date(parse, value):
+    # invalid dates are left as they are to be reported by the row validation
+    try:
+        return parse(value)
+    except ValueError:
+        return value
+
+
+def parse_row(row, parse_date, **amount_options):
+    try:
+        amount, errors = normalize_amount(row["amount"], **amount_options), {}
+    except StatementError as error:
+        amount, errors = None, {"amount": [str(error)]}
+    return dict(row, date=parse_row_date(parse_date, row["date"]), amount=amount, errors=errors)
+
+
+def parse_statement(file, statement_format, decimal_separator=None):
+    """
+    Yields (line, row) pairs of a statement file, rows have date, description,
+    amount, category and errors keys. Dates are parsed and amounts use a "."
+    decimal separator, detected when decimal_separator is not given. Rows
+    with an invalid or ambiguous amount have no amount and the reason in errors.
+    """
+    if statement_format == "csv":
+        for line, row in parse_csv(file):
+            yield line, parse_row(row, parse_statement_date, decimal_separator=decimal_separator)
+    elif statement_format == "ofx":
+        # OFX amounts have no thousands separators
+        for number, row in parse_ofx(file):
+            yield number, parse_row(
+                row, parse_ofx_date, decimal_separator=decimal_separator, grouped=False
+            )
+    else:
+        raise StatementError(f'Unsupported statement format "{statement_format}"')
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
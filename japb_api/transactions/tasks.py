@@ -1,35 +1,236 @@
-from celery import shared_task
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction as db_transaction
+from django.db.models import Q, Case, When, Subquery, OuterRef, FloatField, IntegerField
+from django.db.models.functions import Cast, Ceil, Floor
+from django.utils import timezone
 
-from japb_api.reports.models import ReportAccount, ReportCurrency
 from japb_api.accounts.models import Account
+from japb_api.celery import app
+from japb_api.currencies.models import CurrencyConversionHistorial
+from japb_api.products.tasks import schedule_product_list_refresh
+from japb_api.users.models import User
+from .importer import TransactionImporter
+from .models import Category, Transaction
+from .statements import StatementError, chunked, parse_statement
 
-@shared_task
-def update_reports(account_pk):
-    account = Account.objects.get(pk=account_pk)
-    print(f"Updating reports for account {account.name} for user {account.user.pk}")
-    # get most recent report
-    report = (
-        ReportAccount.objects.filter(user=account.user, account=account)
-        .order_by("-to_date")
-        .first()
+MAX_REPORTED_ERRORS = 100
+
+
+class StatementCategories:
+    """
+    Maps category names of a statement to the user or global categories,
+    unknown names are created as categories of the user once a transaction
+    using them is saved
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.categories = {}
+        categories = Category.objects.filter(Q(user=user) | Q(user__isnull=True)).order_by("id")
+        for pk, name, user_id in categories.values_list("pk", "name", "user_id"):
+            # user categories win over global categories with the same name
+            if user_id or name.lower() not in self.categories:
+                self.categories[name.lower()] = pk
+
+    def get_id(self, name):
+        """pk of the category with that name, None when it doesn't exist yet"""
+        return self.categories.get(name.lower()) if name else None
+
+    def create_missing(self, transactions, names):
+        """
+        Sets the category of the transactions with unknown category names,
+        creating every missing category once. Called in the transaction that
+        saves them, so rows that fail validation never leave categories behind.
+        """
+        for transaction, name in zip(transactions, names):
+            if not name or transaction.category_id is not None:
+                continue
+            key = name.lower()
+            if key not in self.categories:
+                self.categories[key] = Category.objects.create(
+                    user=self.user,
+                    name=name[:50],
+                    color="#000000",
+                    description="",
+                    type="expense" if transaction.amount < 0 else "income",
+                ).pk
+            transaction.category_id = self.categories[key]
+
+
+@app.task(bind=True)
+def import_statement(
+    self, user_id, account_id, path, statement_format, chunk_size=None, decimal_separator=None
+):
+    """
+    Streams a stored CSV/OFX statement into transactions of an account.
+    Rows are validated and inserted in chunks with bulk_create, so memory
+    stays bounded, invalid rows are skipped and reported with their line.
+    The decimal separator of the amounts is detected when not given.
+    """
+    chunk_size = chunk_size or settings.STATEMENT_IMPORT_CHUNK_SIZE
+    user = User.objects.get(pk=user_id)
+    importer = TransactionImporter(user)
+    categories = StatementCategories(user)
+    result = {"rows": 0, "imported": 0, "errors": []}
+
+    try:
+        with default_storage.open(path, "rb") as file:
+            statement = parse_statement(file, statement_format, decimal_separator)
+            for chunk in chunked(statement, chunk_size):
+                rows = [
+                    dict(row, account=account_id, category=categories.get_id(row["category"]))
+                    for _, row in chunk
+                ]
+                importer.is_valid(rows)
+                # the transactions are built in the order of the valid rows
+                names = [
+                    row["category"]
+                    for (_, row), errors in zip(chunk, importer.errors)
+                    if not errors
+                ]
+                with db_transaction.atomic():
+                    categories.create_missing(importer.transactions, names)
+                    result["imported"] += len(importer.save())
+                result["rows"] += len(chunk)
+
+                for (line, row), errors in zip(chunk, importer.errors):
+                    # amounts the statement parser couldn't read have no amount
+                    errors = {**errors, **row["errors"]}
+                    if errors and len(result["errors"]) < MAX_REPORTED_ERRORS:
+                        result["errors"].append({"line": line, "errors": errors})
+
+                if self.request.id:
+                    self.update_state(
+                        state="PROGRESS",
+                        meta={"rows": result["rows"], "imported": result["imported"]},
+                    )
+    except StatementError as error:
+        result["errors"].append({"line": None, "errors": {"non_field_errors": [str(error)]}})
+    finally:
+        default_storage.delete(path)
+
+    if result["imported"]:
+        schedule_product_list_refresh(user.id)
+
+    print(
+        f"Imported {result['imported']} of {result['rows']} statement rows "
+        f"into account {account_id}"
+    )
+    return result
+
+
+def truncate(expression):
+    # int() truncates towards zero, the expression has the sign of the amount
+    return Case(When(amount__lt=0, then=Ceil(expression)), default=Floor(expression))
+
+
+def get_main_currency_amount(decimal_places, rate):
+    """
+    SQL version of the to_main_currency_amount computed on write, from the
+    stored amount: int(amount * 100 / 10**decimal_places / rate). The stored
+    amount is the source of truth, so it matches the write only for accounts
+    with 2 or more decimal places. The digits an account with fewer places
+    dropped on write are not converted, "5.75" in an account without decimal
+    places is converted on write from 575 cents and recomputed from 500.
+    """
+    cents = truncate(Cast("amount", FloatField()) * 100 / 10**decimal_places)
+    return Cast(truncate(cents / rate), IntegerField())
+
+
+def get_day_range(start=None, end=None):
+    """aware datetimes of the start of the first day and the end of the last one"""
+    if start is not None:
+        start = timezone.make_aware(datetime.combine(start, time.min))
+    if end is not None:
+        end = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+    return start, end
+
+
+def recompute_main_currency_amounts(start=None, end=None, currency_id=None, after_pk=0, chunk_size=1000):
+    """
+    Recomputes to_main_currency_amount of the transactions between the start
+    and end dates (inclusive) from the rate of the default source of their
+    currency at the transaction date.
+
+    Transactions are processed in chunks of ascending pk, every chunk is one
+    UPDATE per currency and decimal places, joined to the point-in-time rate
+    with a subquery. Yields (last_pk, updated) after every chunk, so a
+    recompute can be resumed from the last pk and running it again gives the
+    same amounts.
+    """
+    # currencies without a default conversion source are never converted
+    groups = (
+        Account.objects.exclude(currency__default_conversion_source__isnull=True)
+        .exclude(currency__default_conversion_source="")
+        .values_list("currency_id", "currency__default_conversion_source", "decimal_places")
+        .distinct()
     )
-    report.calculate_initial_balance()\
-        .calculate_end_balance()\
-        .calculate_total_income()\
-        .calculate_total_expenses()\
-        .save()
-
-    # get most recent report
-    currency_report = (
-        ReportCurrency.objects.filter(user=account.user, currency=account.currency)
-        .order_by("-to_date")
-        .first()
+    if currency_id is not None:
+        groups = groups.filter(currency=currency_id)
+    groups = list(groups)
+
+    start, end = get_day_range(start, end)
+    transactions = Transaction.objects.filter(
+        account__currency__in={currency for currency, _, _ in groups}
     )
+    if start is not None:
+        transactions = transactions.filter(date__gte=start)
+    if end is not None:
+        transactions = transactions.filter(date__lt=end)
+
+    while True:
+        pks = list(
+            transactions.filter(pk__gt=after_pk).order_by("pk").values_list("pk", flat=True)[
+                :chunk_size
+            ]
+        )
+        if not pks:
+            return
+
+        chunk = transactions.filter(pk__gt=after_pk, pk__lte=pks[-1])
+        updated = 0
+        with db_transaction.atomic():
+            for currency, source, decimal_places in groups:
+                rate = CurrencyConversionHistorial.objects.filter(
+                    currency_from=currency,
+                    currency_to__name="USD",
+                    source=source,
+                    date__lte=OuterRef("date"),
+                ).order_by("-date")
+                updated += chunk.filter(
+                    account__currency=currency, account__decimal_places=decimal_places
+                ).update(
+                    to_main_currency_amount=get_main_currency_amount(
+                        decimal_places, Subquery(rate.values("rate")[:1])
+                    )
+                )
+
+        after_pk = pks[-1]
+        yield after_pk, updated
+
+
+@app.task(bind=True)
+def update_main_currency_amounts(
+    self, start=None, end=None, currency_id=None, after_pk=0, chunk_size=None
+):
+    """
+    Recomputes to_main_currency_amount after rates were backfilled or
+    corrected, dates are ISO strings. A failed run can be resumed by
+    passing the last_pk of its progress as after_pk.
+    """
+    start = datetime.fromisoformat(start).date() if start else None
+    end = datetime.fromisoformat(end).date() if end else None
+    result = {"last_pk": after_pk, "updated": 0}
 
-    currency_report.calculate_initial_balance()\
-        .calculate_end_balance()\
-        .calculate_total_income()\
-        .calculate_total_expenses()\
-        .save()
+    for last_pk, updated in recompute_main_currency_amounts(
+        start, end, currency_id, after_pk, chunk_size or settings.MAIN_CURRENCY_RECOMPUTE_CHUNK_SIZE
+    ):
+        result["last_pk"] = last_pk
+        result["updated"] += updated
+        if self.request.id:
+            self.update_state(state="PROGRESS", meta=result)
 
-    print("Reports updated")
+    print(f"Recomputed the main currency amount of {result['updated']} transactions")
+    return result
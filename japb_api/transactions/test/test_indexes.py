@@ -0,0 +1,68 @@
+from datetime import date, datetime, timezone
+
+from django.urls import reverse
+
+from japb_api.core.pagination import DateKeysetPagination
+from japb_api.core.testing import QueryPlanTestMixin, APITestCase
+from japb_api.currencies.factories import CurrencyFactory
+from japb_api.accounts.factories import AccountFactory
+from japb_api.accounts.models import Account
+from japb_api.users.factories import UserFactory
+from japb_api.reports.models import ReportAccount
+from japb_api.reports.tasks import get_monthly_account_movements, get_monthly_currency_movements
+from japb_api.transactions.models import Transaction
+from japb_api.transactions.factories import TransactionFactory
+
+
+class TestTransactionIndexes(QueryPlanTestMixin, APITestCase):
+    def setUp(self) -> None:
+        self.user = UserFactory()
+        self.currency = CurrencyFactory()
+        self.account = AccountFactory(currency=self.currency, user=self.user)
+        for amount in (1000, -500, 2000):
+            TransactionFactory(account=self.account, user=self.user, amount=amount)
+        self.to_date = datetime(2023, 1, 31, tzinfo=timezone.utc)
+        self.report = ReportAccount(
+            user=self.user,
+            account=self.account,
+            from_date=date(2023, 1, 1),
+            to_date=date(2023, 1, 31),
+        )
+
+    def test_report_balances_use_index(self) -> None:
+        for calculate in (self.report.calculate_initial_balance, self.report.calculate_end_balance):
+            (plan,) = self.get_executed_query_plans(calculate)
+            self.assertIn("transaction_user_acc_date_idx", plan)
+
+    def test_report_income_uses_partial_index(self) -> None:
+        (plan,) = self.get_executed_query_plans(self.report.calculate_total_income)
+        self.assertIn("transaction_income_idx", plan)
+
+    def test_report_expenses_uses_partial_index(self) -> None:
+        (plan,) = self.get_executed_query_plans(self.report.calculate_total_expenses)
+        self.assertIn("transaction_expense_idx", plan)
+
+    def test_monthly_account_movements_use_index(self) -> None:
+        accounts = Account.objects.filter(pk=self.account.pk)
+        plan = self.get_query_plan(get_monthly_account_movements(accounts))
+        self.assertIn("transaction_user_acc_date_idx", plan)
+
+    def test_monthly_currency_movements_use_index(self) -> None:
+        accounts = Account.objects.filter(pk=self.account.pk)
+        plan = self.get_query_plan(get_monthly_currency_movements(accounts, date(2023, 1, 1)))
+        self.assertIn("transaction_user_date_idx", plan)
+
+    def test_listing_uses_index(self) -> None:
+        self.client.force_authenticate(self.user)
+        plans = self.get_executed_query_plans(self.client.get, reverse("transactions-list"))
+        # the page of the listing, the count may be read from any index of the user
+        self.assertTrue(any("transaction_user_date_idx" in plan for plan in plans), plans)
+
+    def test_cursor_page_reads_an_index_range(self) -> None:
+        queryset = DateKeysetPagination().get_keyset_queryset(
+            Transaction.objects.filter(user=self.user), (self.to_date, 100)
+        )
+        plan = self.get_query_plan(queryset[:10])
+        self.assertIn("transaction_user_date_idx", plan)
+        # the position bounds the index scan instead of filtering from the newest row
+        self.assertRegex(plan, r"Index Cond: .*\bdate <=|user_id=\? AND date<")
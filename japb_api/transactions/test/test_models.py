@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
-from django.test import TestCase
 
+from japb_api.core.testing import TestCase
 from japb_api.currencies.factories import CurrencyFactory
 from japb_api.accounts.factories import AccountFactory
 from japb_api.transactions.models import CurrencyExchange
@@ -0,0 +1,242 @@
+import io
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import override_settings
+
+from japb_api.core.testing import TestCase
+from japb_api.users.factories import UserFactory
+from japb_api.accounts.models import Account
+from japb_api.currencies.models import Currency
+from ..models import Transaction, Category
+from ..statements import (
+    StatementError,
+    chunked,
+    get_statement_format,
+    iter_lines,
+    normalize_amount,
+    parse_statement,
+)
+from ..tasks import import_statement
+
+CSV_STATEMENT = (
+    "\ufeffDate,Description,Amount,Category\r\n"
+    "2023-01-15,Supermarket,-25.50,Food\r\n"
+    '2023-01-20T10:30:00Z,"Salary, January",1500,\r\n'
+    "2023-01-31,Rent,-700,Housing\r\n"
+)
+
+OFX_STATEMENT = (
+    "OFXHEADER:100\nDATA:OFXSGML\n\n"
+    "<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>"
+    "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20230115120000[-4:VET]<TRNAMT>-25.50"
+    "<NAME>Supermarket &amp; co</STMTTRN>"
+    "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20230120<TRNAMT>1500<MEMO>Salary</STMTTRN>"
+    "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>"
+)
+
+
+class TestStatementParsers(TestCase):
+    def test_get_statement_format(self):
+        self.assertEqual(get_statement_format("statement.CSV"), "csv")
+        self.assertEqual(get_statement_format("statement.qfx"), "ofx")
+        self.assertIsNone(get_statement_format("statement.pdf"))
+        self.assertIsNone(get_statement_format("statement"))
+
+    def test_iter_lines_across_chunks(self):
+        lines = list(iter_lines(io.BytesIO("first\r\nsecond é\nthird".encode())))
+        self.assertEqual(lines, ["first\r\n", "second é\n", "third"])
+
+    def test_parse_csv(self):
+        rows = list(parse_statement(io.BytesIO(CSV_STATEMENT.encode()), "csv"))
+
+        self.assertEqual([line for line, _ in rows], [2, 3, 4])
+        _, supermarket = rows[0]
+        self.assertEqual(supermarket["description"], "Supermarket")
+        self.assertEqual(supermarket["amount"], "-25.50")
+        self.assertEqual(supermarket["category"], "Food")
+        self.assertEqual(supermarket["date"].date(), datetime(2023, 1, 15).date())
+        _, salary = rows[1]
+        self.assertEqual(salary["description"], "Salary, January")
+        self.assertIsNone(salary["category"])
+        self.assertEqual(salary["date"], datetime(2023, 1, 20, 10, 30, tzinfo=timezone.utc))
+
+    def test_normalize_amount(self):
+        for value, expected in [
+            ("-25.50", "-25.50"),
+            ("1500", "1500"),
+            ("12,50", "12.50"),
+            ("1.234,56", "1234.56"),
+            ("-1,234.56", "-1234.56"),
+            ("1.234.567", "1234567"),
+            ("0,125", "0.125"),
+        ]:
+            self.assertEqual(normalize_amount(value), expected)
+
+        # a single separator before three digits may group thousands
+        for value in ("1,234", "-1.234"):
+            with self.assertRaisesMessage(StatementError, "Ambiguous amount"):
+                normalize_amount(value)
+        self.assertEqual(normalize_amount("1.234", decimal_separator=","), "1234")
+        self.assertEqual(normalize_amount("1,234", decimal_separator=","), "1.234")
+        self.assertEqual(normalize_amount("1.234", grouped=False), "1.234")
+
+        for value in ("abc", "", "1,23,4", "12.5,0", "1.234.5"):
+            with self.assertRaisesMessage(StatementError, "Invalid amount"):
+                normalize_amount(value)
+
+    def test_parse_csv_comma_decimals(self):
+        statement = (
+            "Date,Description,Amount\n"
+            '2023-01-15,Supermarket,"-12,50"\n'
+            '2023-01-16,Rent,"-1.234,56"\n'
+            '2023-01-17,Transfer,"1.234"\n'
+        )
+        rows = [row for _, row in parse_statement(io.BytesIO(statement.encode()), "csv")]
+
+        self.assertEqual([row["amount"] for row in rows], ["-12.50", "-1234.56", None])
+        self.assertEqual([bool(row["errors"]) for row in rows], [False, False, True])
+        self.assertIn("amount", rows[2]["errors"])
+
+        rows = parse_statement(io.BytesIO(statement.encode()), "csv", decimal_separator=",")
+        self.assertEqual([row["amount"] for _, row in rows], ["-12.50", "-1234.56", "1234"])
+
+    def test_parse_csv_missing_columns(self):
+        with self.assertRaises(StatementError):
+            list(parse_statement(io.BytesIO(b"Date,Amount\n2023-01-15,10\n"), "csv"))
+
+    def test_parse_ofx(self):
+        rows = [row for _, row in parse_statement(io.BytesIO(OFX_STATEMENT.encode()), "ofx")]
+
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]["description"], "Supermarket & co")
+        self.assertEqual(rows[0]["amount"], "-25.50")
+        self.assertEqual(
+            rows[0]["date"],
+            datetime(2023, 1, 15, 12, tzinfo=timezone(timedelta(hours=-4))),
+        )
+        self.assertEqual(rows[1]["description"], "Salary")
+        self.assertEqual(rows[1]["amount"], "1500")
+
+        # OFX amounts have no thousands separators
+        statement = OFX_STATEMENT.replace("-25.50", "-25,50").replace("1500", "1.500")
+        rows = [row for _, row in parse_statement(io.BytesIO(statement.encode()), "ofx")]
+        self.assertEqual([row["amount"] for row in rows], ["-25.50", "1.500"])
+
+    def test_parse_is_lazy(self):
+        statement = CSV_STATEMENT + "not a date,Broken,10,\n" * 1000
+        rows = parse_statement(io.BytesIO(statement.encode()), "csv")
+
+        line, row = next(rows)
+        self.assertEqual(line, 2)
+        self.assertEqual(row["description"], "Supermarket")
+
+    def test_chunked(self):
+        self.assertEqual(list(chunked(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+
+class TestImportStatement(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+
+        self.user = UserFactory()
+        self.currency = Currency.objects.create(name="VES")
+        self.account = Account.objects.create(
+            name="Bank", currency=self.currency, decimal_places=2, user=self.user
+        )
+        self.food = Category.objects.create(
+            name="Food", color="#000000", description="Food expenses"
+        )
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def save_statement(self, content, statement_format):
+        return default_storage.save(
+            f"statements/test.{statement_format}", ContentFile(content.encode())
+        )
+
+    def test_import_csv_statement_in_chunks(self):
+        path = self.save_statement(CSV_STATEMENT + "not a date,Broken,10,\n", "csv")
+
+        result = import_statement(str(self.user.id), self.account.id, path, "csv", chunk_size=2)
+
+        self.assertEqual(result["rows"], 4)
+        self.assertEqual(result["imported"], 3)
+        self.assertEqual(len(result["errors"]), 1)
+        self.assertEqual(result["errors"][0]["line"], 5)
+        self.assertIn("date", result["errors"][0]["errors"])
+        self.assertFalse(default_storage.exists(path))
+
+        transactions = Transaction.objects.filter(account=self.account).order_by("date")
+        self.assertEqual(
+            list(transactions.values_list("amount", flat=True)), [-2550, 150000, -70000]
+        )
+        supermarket, salary, rent = transactions
+        # existing categories are reused, unknown ones are created for the user
+        self.assertEqual(supermarket.category, self.food)
+        self.assertIsNone(salary.category)
+        self.assertEqual(rent.category.name, "Housing")
+        self.assertEqual(str(rent.category.user_id), str(self.user.id))
+        self.assertEqual(self.account.get_balance(), 77450)
+
+    def test_categories_of_invalid_rows_are_not_created(self):
+        path = self.save_statement(
+            "Date,Description,Amount,Category\n"
+            "not a date,Broken,10,Gifts\n"
+            "2023-01-15,Supermarket,-25.50,Groceries\n"
+            "2023-01-16,Market,-10,groceries\n",
+            "csv",
+        )
+
+        result = import_statement(str(self.user.id), self.account.id, path, "csv")
+
+        self.assertEqual(result["imported"], 2)
+        self.assertFalse(Category.objects.filter(name="Gifts").exists())
+        # created once, as an expense of the user
+        groceries = Category.objects.get(name__iexact="groceries")
+        self.assertEqual(groceries.type, "expense")
+        self.assertEqual(Transaction.objects.filter(category=groceries).count(), 2)
+
+    def test_import_comma_decimal_statement(self):
+        path = self.save_statement(
+            'Date,Description,Amount\n2023-01-15,Supermarket,"-12,50"\n2023-01-16,Rent,"1.234"\n',
+            "csv",
+        )
+
+        result = import_statement(str(self.user.id), self.account.id, path, "csv")
+
+        self.assertEqual(result["imported"], 1)
+        self.assertEqual(result["errors"][0]["line"], 3)
+        self.assertIn("Ambiguous amount", result["errors"][0]["errors"]["amount"][0])
+        self.assertEqual(list(Transaction.objects.values_list("amount", flat=True)), [-1250])
+
+        path = self.save_statement('Date,Description,Amount\n2023-01-16,Rent,"1.234"\n', "csv")
+        result = import_statement(
+            str(self.user.id), self.account.id, path, "csv", decimal_separator=","
+        )
+        self.assertEqual(result["errors"], [])
+        self.assertEqual(self.account.get_balance(), -1250 + 123400)
+
+    def test_import_ofx_statement(self):
+        path = self.save_statement(OFX_STATEMENT, "ofx")
+
+        result = import_statement(str(self.user.id), self.account.id, path, "ofx")
+
+        self.assertEqual(result["imported"], 2)
+        self.assertEqual(result["errors"], [])
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+
+    def test_import_invalid_statement(self):
+        path = self.save_statement("Date,Amount\n2023-01-15,10\n", "csv")
+
+        result = import_statement(str(self.user.id), self.account.id, path, "csv")
+
+        self.assertEqual(result["imported"], 0)
+        self.assertIsNone(result["errors"][0]["line"])
+        self.assertEqual(Transaction.objects.count(), 0)
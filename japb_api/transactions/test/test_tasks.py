@@ -0,0 +1,138 @@
+from datetime import date, datetime, timezone
+from io import StringIO
+from django.core.management import call_command
+
+from japb_api.core.testing import TestCase
+from japb_api.users.factories import UserFactory
+from japb_api.accounts.models import Account
+from japb_api.core.money import parse_amount
+from japb_api.currencies.factories import CurrencyFactory
+from japb_api.currencies.models import Currency, CurrencyConversionHistorial
+from ..factories import TransactionFactory
+from ..tasks import recompute_main_currency_amounts, update_main_currency_amounts
+
+
+class TestRecomputeMainCurrencyAmounts(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.ves = Currency.objects.create(name="VES", default_conversion_source="bcv")
+        self.usd = CurrencyFactory(name="USD")
+        self.no_source = Currency.objects.create(name="COP")
+        self.account = Account.objects.create(
+            name="Bank", currency=self.ves, decimal_places=2, user=self.user
+        )
+        self.crypto = Account.objects.create(
+            name="Wallet", currency=self.ves, decimal_places=4, user=self.user
+        )
+        self.other = Account.objects.create(
+            name="Pesos", currency=self.no_source, decimal_places=2, user=self.user
+        )
+
+        self.create_rate(20, "bcv", datetime(2023, 1, 1, tzinfo=timezone.utc))
+        self.create_rate(40, "bcv", datetime(2023, 2, 1, tzinfo=timezone.utc))
+        self.create_rate(80, "paralelo", datetime(2023, 1, 1, tzinfo=timezone.utc))
+
+        # amounts stored with stale or missing conversions
+        self.january = self.create_transaction(self.account, -10050, datetime(2023, 1, 15))
+        self.february = self.create_transaction(self.account, 40000, datetime(2023, 2, 15))
+        self.before_rates = self.create_transaction(self.account, 500, datetime(2022, 12, 15))
+        self.crypto_january = self.create_transaction(self.crypto, 1234567, datetime(2023, 1, 20))
+        self.pesos = self.create_transaction(self.other, 1000, datetime(2023, 1, 15))
+
+    def create_rate(self, rate, source, date):
+        conversion = CurrencyConversionHistorial.objects.create(
+            currency_from=self.ves, currency_to=self.usd, rate=rate, source=source
+        )
+        CurrencyConversionHistorial.objects.filter(pk=conversion.pk).update(date=date)
+
+    def create_transaction(self, account, amount, date):
+        return TransactionFactory(
+            account=account,
+            user=self.user,
+            amount=amount,
+            date=date.replace(tzinfo=timezone.utc),
+            to_main_currency_amount=1,
+        )
+
+    def get_amounts(self):
+        return {
+            transaction: transaction.__class__.objects.get(pk=transaction.pk).to_main_currency_amount
+            for transaction in (
+                self.january,
+                self.february,
+                self.before_rates,
+                self.crypto_january,
+                self.pesos,
+            )
+        }
+
+    def test_recompute_all(self):
+        progress = list(recompute_main_currency_amounts(chunk_size=2))
+
+        # the transactions of currencies without a default source are skipped
+        self.assertEqual([updated for _, updated in progress], [2, 2])
+        amounts = self.get_amounts()
+        # same truncation as int(parse_amount(amount, 2) / rate)
+        self.assertEqual(amounts[self.january], int(-10050 / 20))
+        self.assertEqual(amounts[self.february], int(40000 / 40))
+        self.assertIsNone(amounts[self.before_rates])
+        self.assertEqual(amounts[self.crypto_january], int(int(1234567 * 100 / 10**4) / 20))
+        self.assertEqual(amounts[self.pesos], 1)
+
+    def test_recompute_from_the_stored_amount(self):
+        account = Account.objects.create(
+            name="Cash", currency=self.ves, decimal_places=0, user=self.user
+        )
+        # "5.75" is stored as 5 and converted on write from 575 cents
+        transaction = TransactionFactory(
+            account=account,
+            user=self.user,
+            amount=parse_amount("5.75", 0),
+            date=datetime(2023, 1, 15, tzinfo=timezone.utc),
+            to_main_currency_amount=int(parse_amount("5.75", 2) / 20),
+        )
+        self.assertEqual(transaction.to_main_currency_amount, 28)
+
+        list(recompute_main_currency_amounts())
+
+        transaction.refresh_from_db()
+        self.assertEqual(transaction.to_main_currency_amount, int(500 / 20))
+
+    def test_recompute_date_range(self):
+        list(recompute_main_currency_amounts(date(2023, 2, 1), date(2023, 2, 28)))
+
+        amounts = self.get_amounts()
+        self.assertEqual(amounts[self.january], 1)
+        self.assertEqual(amounts[self.february], 1000)
+
+    def test_recompute_is_resumable_and_idempotent(self):
+        first_chunk = next(recompute_main_currency_amounts(chunk_size=1))
+        self.assertEqual(first_chunk, (self.january.pk, 1))
+        self.assertEqual(self.get_amounts()[self.february], 1)
+
+        list(recompute_main_currency_amounts(after_pk=first_chunk[0]))
+        amounts = self.get_amounts()
+        list(recompute_main_currency_amounts())
+        self.assertEqual(self.get_amounts(), amounts)
+        self.assertEqual(amounts[self.february], 1000)
+
+    def test_recompute_does_not_change_balances(self):
+        balance = self.account.get_balance()
+        list(recompute_main_currency_amounts())
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.get_balance(), balance)
+
+    def test_update_main_currency_amounts_task(self):
+        result = update_main_currency_amounts("2023-01-01", "2023-01-31", self.ves.id)
+
+        self.assertEqual(result, {"last_pk": self.crypto_january.pk, "updated": 2})
+        self.assertEqual(self.get_amounts()[self.january], -502)
+
+    def test_recompute_command(self):
+        out = StringIO()
+        call_command(
+            "recompute_main_currency_amounts", "--start", "2023-01-01", "--chunk-size", "10", stdout=out
+        )
+
+        self.assertIn("3 transactions recomputed", out.getvalue())
+        self.assertEqual(self.get_amounts()[self.january], -502)
@@ -1,21 +1,37 @@
 import pytz
+import shutil
+from unittest.mock import patch
+import tempfile
+from uuid import uuid4
 from faker import Faker
 from datetime import datetime, timezone
+from django.core.cache import cache
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.renderers import JSONRenderer
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from ..models import Transaction, CurrencyExchange, ExchangeComission, Category, TransactionItem
-from ..factories import TransactionFactory, CategoryFactory
+from ..exchanges import SYSTEM_CATEGORIES_KEY, get_system_category_ids
+from ..serializers import TransactionSerializer
+from ..factories import TransactionFactory, CategoryFactory, CurrencyExchangeFactory
+from japb_api.core.testing import APITestCase
+from japb_api.accounts.factories import AccountFactory
+from japb_api.users.factories import UserFactory
 from japb_api.users.models import User
-from japb_api.accounts.models import Account
+from japb_api.accounts.models import Account, AccountBalance
 from japb_api.currencies.factories import (
     CurrencyFactory,
     CurrencyConversionHistorialFactory,
 )
-from japb_api.currencies.models import Currency
+from japb_api.currencies.models import Currency, CurrencyConversionHistorial
 from japb_api.products.models import Product
+from japb_api.reports.models import ReportCurrency
+from japb_api.celery import app
 
 
 class TestCurrencyTransaction(APITestCase):
@@ -30,7 +46,7 @@ class TestCurrencyTransaction(APITestCase):
 
         self.currency = Currency.objects.create(name="VES", default_conversion_source="paralelo")
         self.account = Account.objects.create(
-            name="Test Account", currency=self.currency, decimal_places=2
+            name="Test Account", currency=self.currency, decimal_places=2, user=self.user
         )
         self.category = Category.objects.create(
             name="Food", color="#000000", description="Food expenses"
@@ -119,6 +135,22 @@ class TestCurrencyTransaction(APITestCase):
         # in the account serializer, the amount is divided by 10 ** account.decimal_places
         self.assertEqual(transaction.amount, 40000)
 
+    def test_api_create_transaction_without_float_round_trips(self):
+        Transaction.objects.all().delete()
+        account = Account.objects.create(name="Bank VES", currency=self.currency, decimal_places=2)
+        data = {
+            # int(0.29 * 100) is 28
+            "amount": "0.29",
+            "description": "Purchase",
+            "account": account.id,
+            "date": datetime.now(tz=timezone.utc),
+        }
+        response = self.client.post(reverse("transactions-list"), data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Transaction.objects.get().amount, 29)
+        self.assertEqual(response.json()[0]["amount"], "0.29")
+
     def test_api_create_multiple_transactions(self):
         data = [self.data, self.data2, self.data3]
         self.client.post(reverse("transactions-list"), data, format="json")
@@ -524,7 +556,7 @@ class TestCurrencyTransaction(APITestCase):
         Transaction.objects.get().delete()
         to_currency = Currency.objects.create(name="VES", symbol="bs")
         from_account = self.account
-        to_account = Account.objects.create(name="Mercantil", currency=to_currency)
+        to_account = Account.objects.create(name="Mercantil", currency=to_currency, user=self.user)
         data_payload = {
             "from_amount": "50.50",
             "to_amount": 1250,
@@ -563,7 +595,7 @@ class TestCurrencyTransaction(APITestCase):
         Transaction.objects.get().delete()
         to_currency = Currency.objects.create(name="VES", symbol="bs")
         from_account = self.account
-        to_account = Account.objects.create(name="Mercantil", currency=to_currency)
+        to_account = Account.objects.create(name="Mercantil", currency=to_currency, user=self.user)
         data_payload = {
             "from_amount": "50.50",
             "to_amount": 1250,
@@ -582,7 +614,7 @@ class TestCurrencyTransaction(APITestCase):
         # the default description should be "Exchange from {from_account_name} to {to_account_name}"
         to_currency = Currency.objects.create(name="VES", symbol="bs")
         from_account = self.account
-        to_account = Account.objects.create(name="Mercantil", currency=to_currency)
+        to_account = Account.objects.create(name="Mercantil", currency=to_currency, user=self.user)
         data_payload = {
             "from_amount": "50.5",
             "to_amount": 1250,
@@ -606,7 +638,7 @@ class TestCurrencyTransaction(APITestCase):
         # the type should be from_same_currency if the from_account and to_account are the same currency
         from_account = self.account
         to_currency = Currency.objects.create(name="USD")
-        to_account = Account.objects.create(name="Mercantil", currency=to_currency)
+        to_account = Account.objects.create(name="Mercantil", currency=to_currency, user=self.user)
         data_payload = {
             "from_amount": "50.5",
             "to_amount": 1250,
@@ -629,7 +661,7 @@ class TestCurrencyTransaction(APITestCase):
         # the endpoint should create a comission transaction
         # when the from_account and to_account are the same currency
         from_account = self.account
-        to_account = Account.objects.create(name="Mercantil", currency=self.currency)
+        to_account = Account.objects.create(name="Mercantil", currency=self.currency, user=self.user)
         data_payload = {
             "from_amount": "1250",
             "to_amount": "1200",
@@ -678,7 +710,7 @@ class TestCurrencyTransaction(APITestCase):
         )
         to_currency = Currency.objects.create(name="VES", symbol="bs")
         from_account = self.account
-        to_account = Account.objects.create(name="Mercantil", currency=to_currency)
+        to_account = Account.objects.create(name="Mercantil", currency=to_currency, user=self.user)
         data_payload = {
             "from_amount": "50.5",
             "to_amount": 1250,
@@ -702,7 +734,7 @@ class TestCurrencyTransaction(APITestCase):
         # delete the initial transaction
         from_account = self.account
         to_currency = Currency.objects.create(name="VES")
-        to_account = Account.objects.create(name="Mercantil", currency=to_currency)
+        to_account = Account.objects.create(name="Mercantil", currency=to_currency, user=self.user)
         data_payload = {
             "from_amount": -50,
             "to_amount": 1250,
@@ -729,7 +761,7 @@ class TestCurrencyTransaction(APITestCase):
         # delete the initial transaction
         from_account = self.account
         to_currency = Currency.objects.create(name="VES")
-        to_account = Account.objects.create(name="Mercantil", currency=to_currency)
+        to_account = Account.objects.create(name="Mercantil", currency=to_currency, user=self.user)
         data_payload = {
             "from_amount": -50,
             "to_amount": 1250,
@@ -951,3 +983,634 @@ class TestCategories(APITestCase):
         )
 
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TestBulkTransactionImport(APITestCase):
+    def setUp(self):
+        self.fake = Faker(["en-US"])
+        self.user = User.objects.create_user(
+            email=self.fake.email(),
+            username=self.fake.user_name(),
+            password=self.fake.password(),
+        )
+        self.token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token.access_token}")
+
+        self.currency = Currency.objects.create(name="VES", default_conversion_source="bcv")
+        self.main_currency = CurrencyFactory(name="USD")
+        self.account = Account.objects.create(
+            name="Bank", currency=self.currency, decimal_places=2, user=self.user
+        )
+        self.usd_account = Account.objects.create(
+            name="Cash", currency=self.main_currency, decimal_places=2, user=self.user
+        )
+        self.category = Category.objects.create(
+            name="Food", color="#000000", description="Food expenses"
+        )
+
+        # auto_now_add ignores the given date, move the rates afterwards
+        old_rate = CurrencyConversionHistorialFactory(
+            currency_from=self.currency, currency_to=self.main_currency, rate=20, source="bcv"
+        )
+        new_rate = CurrencyConversionHistorialFactory(
+            currency_from=self.currency, currency_to=self.main_currency, rate=40, source="bcv"
+        )
+        CurrencyConversionHistorialFactory(
+            currency_from=self.currency, currency_to=self.main_currency, rate=80, source="paralelo"
+        )
+        CurrencyConversionHistorial.objects.filter(pk=old_rate.pk).update(
+            date=datetime(2023, 1, 1, tzinfo=timezone.utc)
+        )
+        CurrencyConversionHistorial.objects.filter(pk=new_rate.pk).update(
+            date=datetime(2023, 2, 1, tzinfo=timezone.utc)
+        )
+
+        self.rows = [
+            {
+                "amount": -100,
+                "description": "January purchase",
+                "account": self.account.id,
+                "date": "2023-01-15T00:00:00Z",
+                "category": self.category.id,
+            },
+            {
+                "amount": 400,
+                "description": "February income",
+                "account": self.account.id,
+                "date": "2023-02-15T00:00:00Z",
+            },
+            {
+                "amount": 12.5,
+                "description": "Cash",
+                "account": self.usd_account.id,
+                "date": "2023-02-15T00:00:00Z",
+            },
+        ]
+
+    def test_api_bulk_import_transactions(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                reverse("transactions-bulk"), self.rows, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json()["count"], 3)
+        # a single product list refresh for the whole import
+        self.assertEqual(len(callbacks), 1)
+
+        transactions = Transaction.objects.order_by("date", "id")
+        self.assertEqual(list(transactions.values_list("id", flat=True)), response.json()["ids"])
+        january, february, cash = transactions
+        self.assertEqual(january.amount, -10000)
+        self.assertEqual(january.user, self.user)
+        self.assertEqual(january.category, self.category)
+        # the rate of the transaction date and the currency default source
+        self.assertEqual(january.to_main_currency_amount, -500)
+        self.assertEqual(february.to_main_currency_amount, 1000)
+        self.assertIsNone(cash.to_main_currency_amount)
+        self.assertEqual(cash.amount, 1250)
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.get_balance(), 30000)
+
+    def test_api_bulk_import_uses_constant_queries(self):
+        # create the account balance rows first, they are created only once
+        self.client.post(reverse("transactions-bulk"), self.rows, format="json")
+
+        with CaptureQueriesContext(connection) as few_rows_queries:
+            self.client.post(reverse("transactions-bulk"), self.rows, format="json")
+
+        with CaptureQueriesContext(connection) as many_rows_queries:
+            self.client.post(reverse("transactions-bulk"), self.rows * 20, format="json")
+
+        self.assertEqual(Transaction.objects.count(), 66)
+        self.assertEqual(len(many_rows_queries), len(few_rows_queries))
+
+    def test_api_bulk_import_is_all_or_nothing(self):
+        other_account = Account.objects.create(
+            name="Other", currency=self.currency, decimal_places=2
+        )
+        self.rows.append(
+            {
+                "amount": 10,
+                "description": "Not mine",
+                "account": other_account.id,
+                "date": "2023-02-15T00:00:00Z",
+            }
+        )
+        self.rows.append({"amount": "abc", "description": "Invalid"})
+
+        response = self.client.post(reverse("transactions-bulk"), self.rows, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.json()
+        self.assertEqual(errors[:3], [{}, {}, {}])
+        self.assertIn("amount", errors[4])
+        self.assertIn("account", errors[4])
+        self.assertEqual(Transaction.objects.count(), 0)
+
+    def test_api_bulk_import_invalid_account(self):
+        other_account = Account.objects.create(
+            name="Other", currency=self.currency, decimal_places=2
+        )
+        self.rows[1]["account"] = other_account.id
+
+        response = self.client.post(reverse("transactions-bulk"), self.rows, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json()[1].keys(), {"account"})
+        self.assertEqual(Transaction.objects.count(), 0)
+
+
+class TestStatementUpload(APITestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        self.settings_override.enable()
+        app.conf.task_always_eager = True
+
+        self.fake = Faker(["en-US"])
+        self.user = User.objects.create_user(
+            email=self.fake.email(),
+            username=self.fake.user_name(),
+            password=self.fake.password(),
+        )
+        self.token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token.access_token}")
+
+        self.currency = Currency.objects.create(name="VES")
+        self.account = Account.objects.create(
+            name="Bank", currency=self.currency, decimal_places=2, user=self.user
+        )
+
+    def tearDown(self):
+        app.conf.task_always_eager = False
+        self.settings_override.disable()
+        shutil.rmtree(self.media_root)
+
+    def upload(self, content, name, **data):
+        statement = SimpleUploadedFile(name, content.encode())
+        return self.client.post(
+            reverse("transactions-upload"),
+            {"file": statement, "account": self.account.id, **data},
+            format="multipart",
+        )
+
+    def test_api_upload_statement(self):
+        response = self.upload(
+            "date,description,amount\n2023-01-15,Supermarket,-25.50\n2023-01-20,Salary,1500\n",
+            "statement.csv",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(response.json()["task_id"].startswith(str(self.user.id)))
+        self.assertEqual(
+            sorted(Transaction.objects.filter(user=self.user).values_list("amount", flat=True)),
+            [-2550, 150000],
+        )
+
+    def test_api_upload_statement_unknown_format(self):
+        response = self.upload("date,description,amount\n", "statement.pdf")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("format", response.json())
+
+    def test_api_upload_statement_explicit_format(self):
+        response = self.upload(
+            "date,description,amount\n2023-01-15,Supermarket,-25.50\n",
+            "statement.txt",
+            format="csv",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 1)
+
+    def test_api_upload_statement_decimal_separator(self):
+        response = self.upload(
+            'date,description,amount\n2023-01-15,Transfer,"1.500"\n',
+            "statement.csv",
+            decimal_separator=",",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(
+            list(Transaction.objects.filter(user=self.user).values_list("amount", flat=True)),
+            [150000],
+        )
+
+        response = self.upload("date,description,amount\n", "statement.csv", decimal_separator=";")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("decimal_separator", response.json())
+
+    def test_api_upload_statement_other_user_account(self):
+        self.account.user = None
+        self.account.save()
+
+        response = self.upload("date,description,amount\n", "statement.csv")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("account", response.json())
+
+    def test_api_upload_status(self):
+        task_id = f"{self.user.id}-{uuid4()}"
+        response = self.client.get(reverse("transactions-upload-status", args=[task_id]))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {"task_id": task_id, "state": "PENDING"})
+
+    def test_api_upload_status_of_other_user(self):
+        response = self.client.get(
+            reverse("transactions-upload-status", args=[f"{uuid4()}-{uuid4()}"])
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TestKeysetPagination(APITestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token.access_token}")
+        self.account = AccountFactory(user=self.user)
+        self.url = reverse("transactions-list")
+
+        self.transactions = []
+        for day in range(1, 13):
+            # two transactions per day to have date ties
+            for _ in range(2):
+                self.transactions.append(
+                    TransactionFactory(
+                        user=self.user, account=self.account, date=datetime(2024, 1, day, tzinfo=timezone.utc)
+                    )
+                )
+        self.expected_ids = [
+            transaction.id
+            for transaction in sorted(self.transactions, key=lambda t: (t.date, t.id), reverse=True)
+        ]
+
+    def get_all_pages(self, url, params):
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            ids += [result["id"] for result in response.json()["results"]]
+            if not response.json()["next"]:
+                return ids, response
+            response = self.client.get(response.json()["next"])
+
+    def test_cursor_pages(self):
+        ids, response = self.get_all_pages(self.url, {"cursor": "", "page_size": 5})
+
+        self.assertEqual(ids, self.expected_ids)
+        self.assertNotIn("count", response.json())
+
+    def test_cursor_pages_with_count(self):
+        response = self.client.get(self.url, {"cursor": "", "count": "true"})
+
+        self.assertEqual(response.json()["count"], 24)
+        self.assertEqual(len(response.json()["results"]), 10)
+
+    def test_cursor_pages_with_filters(self):
+        other_account = AccountFactory(user=self.user)
+        TransactionFactory(
+            user=self.user, account=other_account, date=datetime(2024, 1, 5, tzinfo=timezone.utc)
+        )
+
+        ids, _ = self.get_all_pages(self.url, {"cursor": "", "account": self.account.id, "page_size": 7})
+
+        self.assertEqual(ids, self.expected_ids)
+
+    def test_deep_pages_run_the_same_queries(self):
+        with CaptureQueriesContext(connection) as first_page:
+            response = self.client.get(self.url, {"cursor": "", "page_size": 2})
+        url = response.json()["next"]
+        for _ in range(8):
+            url = self.client.get(url).json()["next"]
+
+        with CaptureQueriesContext(connection) as deep_page:
+            response = self.client.get(url)
+
+        self.assertEqual(len(deep_page), len(first_page))
+        self.assertFalse(any("COUNT(" in query["sql"] for query in deep_page.captured_queries))
+        self.assertFalse(any("OFFSET" in query["sql"] for query in deep_page.captured_queries))
+        self.assertEqual([result["id"] for result in response.json()["results"]], self.expected_ids[18:20])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {"cursor": "not a cursor"})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_cursor_with_ordering(self):
+        response = self.client.get(self.url, {"cursor": "", "ordering": "amount"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("ordering", response.json())
+
+    def test_page_number_pagination_without_cursor(self):
+        response = self.client.get(self.url, {"page": 2})
+
+        self.assertEqual(response.json()["count"], 24)
+        self.assertEqual(len(response.json()["results"]), 10)
+
+    def test_exchanges_cursor_pages(self):
+        exchanges = [
+            CurrencyExchangeFactory(
+                user=self.user, account=self.account, date=datetime(2024, 2, day, tzinfo=timezone.utc)
+            )
+            for day in (1, 1, 2, 3)
+        ]
+
+        ids, _ = self.get_all_pages(reverse("exchanges-list"), {"cursor": "", "page_size": 3})
+
+        self.assertEqual(
+            ids, [exchange.id for exchange in sorted(exchanges, key=lambda e: (e.date, e.id), reverse=True)]
+        )
+
+
+class TestListQueries(APITestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token.access_token}")
+        self.product = Product.objects.create(name="Test Product")
+        self.category = CategoryFactory()
+
+    def create_rows(self, count):
+        for _ in range(count):
+            account = AccountFactory(user=self.user, decimal_places=3)
+            transaction = TransactionFactory(
+                user=self.user, account=account, category=self.category, amount=1000
+            )
+            TransactionItem.objects.create(transaction=transaction, product=self.product, quantity=2)
+            exchange_from = CurrencyExchangeFactory(
+                user=self.user, account=account, amount=-1500, type="from_same_currency"
+            )
+            exchange_to = CurrencyExchangeFactory(
+                user=self.user, account=account, type="to_same_currency"
+            )
+            ExchangeComission.objects.create(
+                user=self.user,
+                account=account,
+                amount=-500,
+                date=datetime(2024, 1, 1, tzinfo=timezone.utc),
+                type="comission",
+                exchange_from=exchange_from,
+                exchange_to=exchange_to,
+            )
+
+    def assertListQueriesDoNotGrow(self, url):
+        self.create_rows(1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"page_size": 100})
+        few_rows = len(response.json()["results"])
+
+        self.create_rows(5)
+        with self.assertNumQueries(len(queries)):
+            response = self.client.get(url, {"page_size": 100})
+        self.assertGreater(len(response.json()["results"]), few_rows)
+        return response
+
+    def test_transaction_list_queries(self):
+        response = self.assertListQueriesDoNotGrow(reverse("transactions-list"))
+
+        results = response.json()["results"]
+        items = [result["transaction_items"] for result in results if result["transaction_items"]]
+        self.assertEqual(len(items), 6)
+        self.assertEqual(items[0][0]["quantity"], 2)
+
+    def test_transaction_list_with_commissions_queries(self):
+        response = self.assertListQueriesDoNotGrow(reverse("transactions-list") + "?cursor=")
+
+        amounts = {result["amount"] for result in response.json()["results"]}
+        # transactions, exchanges and commissions
+        self.assertEqual(amounts, {"1.000", "-1.500", "-0.500"})
+
+    def test_exchange_list_queries(self):
+        response = self.assertListQueriesDoNotGrow(reverse("exchanges-list"))
+
+        self.assertEqual(len(response.json()["results"]), 12)
+        self.assertEqual({result["amount"] for result in response.json()["results"]}, {"1.000", "-1.500"})
+
+    def test_updated_items_are_rendered(self):
+        account = AccountFactory(user=self.user)
+        transaction = TransactionFactory(user=self.user, account=account)
+        TransactionItem.objects.create(transaction=transaction, product=self.product, quantity=2)
+
+        response = self.client.put(
+            reverse("transactions-detail", kwargs={"pk": transaction.id}),
+            {
+                "amount": 10,
+                "account": account.id,
+                "date": "2024-01-01T00:00:00Z",
+                "transaction_items": [{"product": self.product.id, "quantity": 5}],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["quantity"] for item in response.json()["transaction_items"]], [5])
+
+
+class TestListRendering(APITestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token.access_token}")
+        self.product = Product.objects.create(name="Test Product")
+        self.category = CategoryFactory()
+
+        account = AccountFactory(user=self.user, decimal_places=3)
+        other_account = AccountFactory(user=self.user, decimal_places=2)
+        rows = [
+            (account, -123456, 0, "caf\u00e9 \u2028 \"quoted\" \\ \n\t\x01", self.category),
+            (account, 7, 1234, "", None),
+            (other_account, 2**31 - 1, 5, "plain", self.category),
+            (other_account, 0, None, "\U0001f600", None),
+        ]
+        for day, (row_account, amount, to_main_currency_amount, description, category) in enumerate(rows):
+            transaction = TransactionFactory(
+                user=self.user,
+                account=row_account,
+                amount=amount,
+                to_main_currency_amount=to_main_currency_amount,
+                description=description,
+                category=category,
+                date=datetime(2024, 1, day + 1, 12, 30, 15, tzinfo=timezone.utc),
+            )
+            if day % 2 == 0:
+                TransactionItem.objects.create(transaction=transaction, product=self.product, quantity=3)
+                TransactionItem.objects.create(transaction=transaction, product=self.product, quantity=1)
+
+    def assertSameContent(self, response, queryset):
+        expected = response.json()
+        expected["results"] = TransactionSerializer(queryset, many=True).data
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, JSONRenderer().render(expected))
+
+    def test_list_renders_like_the_serializer(self):
+        response = self.client.get(reverse("transactions-list"))
+
+        self.assertSameContent(response, Transaction.objects.filter(user=self.user).order_by("-date"))
+
+    def test_cursor_list_renders_like_the_serializer(self):
+        response = self.client.get(reverse("transactions-list"), {"cursor": "", "page_size": 3})
+
+        self.assertSameContent(response, Transaction.objects.filter(user=self.user).order_by("-date")[:3])
+
+    def test_indented_list(self):
+        response = self.client.get(reverse("transactions-list"), HTTP_ACCEPT="application/json; indent=2")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'\n  "count": 4', response.content)
+
+
+class TestCurrencyExchangeCreation(APITestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.token = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token.access_token}")
+
+        self.categories = [
+            CategoryFactory(name=name, user=None)
+            for name in ("Exchanges", "Exchanges Income", "Comissions")
+        ]
+        self.currency = CurrencyFactory(name="USD")
+        self.other_currency = CurrencyFactory(name="VES")
+        self.account = AccountFactory(user=self.user, currency=self.currency, decimal_places=2)
+        self.account2 = AccountFactory(user=self.user, currency=self.currency, decimal_places=2)
+        self.ves_account = AccountFactory(user=self.user, currency=self.other_currency, decimal_places=3)
+        self.date = datetime(2024, 1, 10, tzinfo=timezone.utc)
+        self.report = ReportCurrency.objects.create(
+            user=self.user,
+            currency=self.currency,
+            from_date="2024-01-01",
+            to_date="2024-01-31",
+            initial_balance=0,
+            end_balance=0,
+            total_income=0,
+            total_expenses=0,
+        )
+
+    def exchange(self, from_account, to_account, from_amount, to_amount):
+        return {
+            "from_amount": from_amount,
+            "to_amount": to_amount,
+            "from_account": from_account.id,
+            "to_account": to_account.id,
+            "date": self.date,
+        }
+
+    def test_create_same_currency_exchange(self):
+        # warm up the cached categories
+        self.client.post(
+            reverse("exchanges-list"), self.exchange(self.account, self.ves_account, "1", "36"), format="json"
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                reverse("exchanges-list"),
+                self.exchange(self.account, self.account2, "12.50", "12"),
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # the categories come from the cache
+        self.assertFalse(any('FROM "transactions_category"' in query["sql"] for query in queries))
+        exchange_from, exchange_to, comission = response.json()
+        self.assertEqual(exchange_from["related_transaction"], exchange_to["id"])
+        self.assertEqual(exchange_to["related_transaction"], exchange_from["id"])
+        self.assertEqual((exchange_from["amount"], exchange_to["amount"]), ("-12.00", "12.00"))
+        self.assertEqual((comission["amount"], comission["type"]), ("-0.50", "comission"))
+        self.assertEqual(comission["category"], self.categories[2].id)
+
+        exchange = CurrencyExchange.objects.get(pk=exchange_from["id"])
+        self.assertEqual(exchange.related_transaction_id, exchange_to["id"])
+        self.assertEqual(exchange.category, self.categories[0])
+        self.assertEqual(ExchangeComission.objects.get().exchange_to_id, exchange_to["id"])
+        # the same balances the signals of single saves would leave
+        self.assertEqual(AccountBalance.objects.get(account=self.account).balance, -100 - 1250)
+        self.assertEqual(AccountBalance.objects.get(account=self.account2).balance, 1200)
+        self.report.refresh_from_db()
+        self.assertEqual(self.report.end_balance, -100 - 50)
+        # only the comission and the exchange to another currency are expenses
+        self.assertEqual((self.report.total_income, self.report.total_expenses), (0, -100 - 50))
+
+    def test_bulk_create_exchanges(self):
+        rows = [
+            self.exchange(self.account, self.account2, "10", "10"),
+            self.exchange(self.account, self.ves_account, "1", "36.125"),
+            self.exchange(self.account2, self.account, "5", "5.25"),
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("exchanges-bulk"), rows, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # the transactions, then the exchanges and the comissions
+        inserts = [query for query in queries if query["sql"].startswith('INSERT INTO "transactions_')]
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual([len(exchange) for exchange in response.json()], [2, 2, 3])
+        self.assertEqual(response.json()[1][1]["amount"], "36.125")
+        self.assertEqual(response.json()[2][2]["type"], "profit")
+        self.assertEqual(CurrencyExchange.objects.count(), 6)
+        self.assertEqual(ExchangeComission.objects.count(), 1)
+        for exchange in CurrencyExchange.objects.select_related("related_transaction"):
+            self.assertEqual(exchange.related_transaction.related_transaction_id, exchange.id)
+        self.assertEqual(AccountBalance.objects.get(account=self.ves_account).balance, 36125)
+
+    def test_bulk_create_exchanges_with_errors(self):
+        rows = [
+            self.exchange(self.account, self.account2, "10", "10"),
+            self.exchange(self.account, self.ves_account, "abc", "1"),
+            {**self.exchange(self.account, self.account2, "1", "1"), "to_account": 0},
+        ]
+        response = self.client.post(reverse("exchanges-bulk"), rows, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertIn("from_amount", errors[1])
+        self.assertEqual(errors[2], {"errors": {"accounts": "Invalid Accounts"}})
+        self.assertEqual(Transaction.objects.count(), 0)
+
+    def test_exchanges_with_accounts_of_other_users(self):
+        other_account = AccountFactory(user=UserFactory(), currency=self.currency, decimal_places=2)
+        rows = [
+            self.exchange(self.account, other_account, "10", "10"),
+            self.exchange(other_account, self.account, "10", "10"),
+        ]
+
+        response = self.client.post(reverse("exchanges-bulk"), rows, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), [{"errors": {"accounts": "Invalid Accounts"}}] * 2)
+        response = self.client.post(
+            reverse("exchanges-list"), self.exchange(other_account, self.account2, "1", "1"), format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Transaction.objects.count(), 0)
+        self.assertFalse(AccountBalance.objects.filter(account=other_account).exists())
+
+    def test_failed_exchange_leaves_no_rows(self):
+        with patch("japb_api.transactions.ledger.AccountBalance.apply_delta", side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.client.post(
+                    reverse("exchanges-list"),
+                    self.exchange(self.account, self.account2, "12.50", "12"),
+                    format="json",
+                )
+
+        self.assertEqual(Transaction.objects.count(), 0)
+
+    def test_category_changes_refresh_the_cached_ids(self):
+        self.assertEqual(get_system_category_ids()["from"], self.categories[0].id)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.categories[0].delete()
+            # dropped after the commit only
+            self.assertIsNotNone(cache.get(SYSTEM_CATEGORIES_KEY))
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertIsNone(cache.get(SYSTEM_CATEGORIES_KEY))
+        response = self.client.post(
+            reverse("exchanges-list"), self.exchange(self.account, self.ves_account, "1", "36"), format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([exchange["category"] for exchange in response.json()], [None, None])
@@ -1,26 +1,54 @@
+from uuid import uuid4
+from django.core.files.storage import default_storage
+from django.db import transaction as db_transaction
 from django.db.models import Q
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets, filters
 from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.parsers import MultiPartParser
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
-from .tasks import update_reports
 from ..accounts.models import Account
-from japb_api.currencies.models import CurrencyConversionHistorial
+from japb_api.core.money import parse_amount
+from japb_api.core.pagination import DateKeysetPagination
+from japb_api.core.renderers import FastJSONRenderer
+from japb_api.currencies.rates import get_rate_at
 from .permissions import IsOwnerOrReadOnly, IsOwner
 from .models import Transaction, CurrencyExchange, Category
 from .serializers import (
     TransactionSerializer,
     CurrencyExchangeSerializer,
-    ExchangeComissionSerializer,
     CategorySerializer,
+    StatementUploadSerializer,
     TransactionFilterSet,
+    TRANSACTION_ROW_FIELDS,
+    serialize_transaction_rows,
 )
-from japb_api.products.tasks import update_user_product_list_items
-
-def parse_amount(amount, decimal_places):
-    return int(amount * (10**decimal_places))
+from .exchanges import CurrencyExchangeCreator
+from .importer import TransactionImporter
+from .tasks import import_statement
+from japb_api.products.tasks import schedule_product_list_refresh
+
+
+def get_transaction_rate(account, date, by_default_source=False):
+    """rate to USD of the account currency at the date of a transaction"""
+    source = None
+    if by_default_source:
+        # currencies without a default conversion source have no rates
+        source = account.currency.default_conversion_source
+        if not source:
+            return None
+    if not date:
+        return None
+    try:
+        date = serializers.DateTimeField().to_internal_value(date)
+    except serializers.ValidationError:
+        # invalid dates are reported by the transaction serializer
+        return None
+    return get_rate_at(account.currency_id, date, "USD", source)
 
 
 class TransactionViewSet(viewsets.ModelViewSet):
@@ -28,6 +56,8 @@ class TransactionViewSet(viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_class = TransactionFilterSet
+    pagination_class = DateKeysetPagination
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
     ordering_fields = ["date"]
     ordering = ["-date"]
     permission_classes = (
@@ -36,7 +66,25 @@ class TransactionViewSet(viewsets.ModelViewSet):
     )
 
     def get_queryset(self):
-        return Transaction.objects.filter(user=self.request.user)
+        # the serializer reads the decimal places of the account and the items
+        return (
+            Transaction.objects.filter(user=self.request.user)
+            .select_related("account")
+            .prefetch_related("transactionitem_set")
+        )
+
+    def list(self, request, *args, **kwargs):
+        # values() rows and FastJSONRenderer instead of TransactionSerializer,
+        # the payload is the same
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .prefetch_related(None)
+            .values(*TRANSACTION_ROW_FIELDS)
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize_transaction_rows(page))
+        return Response(serialize_transaction_rows(queryset))
 
     def create(self, request):
         transactions_data = request.data
@@ -50,7 +98,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
                 pk=transaction_serializer.initial_data.get("account")
             )
 
-            amount = float(transaction_serializer.initial_data.get("amount"))
+            amount = transaction_serializer.initial_data.get("amount")
             decimal_places = account.decimal_places
 
             transaction_serializer.initial_data["amount"] = parse_amount(
@@ -58,28 +106,22 @@ class TransactionViewSet(viewsets.ModelViewSet):
             )
 
             # Get conversion for the transaction date
-            conversion = (
-                CurrencyConversionHistorial.objects.filter(
-                    currency_from=account.currency,
-                    currency_to__name="USD",
-                    source=account.currency.default_conversion_source,
-                    date__lte=transaction_serializer.initial_data.get("date"),
-                )
-                .order_by("-date")
-                .first()
+            conversion = get_transaction_rate(
+                account,
+                transaction_serializer.initial_data.get("date"),
+                by_default_source=True,
             )
 
             if conversion:
                 transaction_serializer.initial_data["to_main_currency_amount"] = int(
-                    parse_amount(amount, 2) / conversion.rate
+                    parse_amount(amount, 2) / conversion
                 )
 
             if transaction_serializer.is_valid():
                 transaction = transaction_serializer.save()
                 created_transactions.append(transaction_serializer.data)
 
-                update_reports.delay(transaction.account.id)
-                update_user_product_list_items.delay(transaction.user.id)
+                schedule_product_list_refresh(transaction.user.id)
             else:
                 return Response(
                     transaction_serializer.errors, status=status.HTTP_400_BAD_REQUEST
@@ -87,6 +129,69 @@ class TransactionViewSet(viewsets.ModelViewSet):
 
         return Response(created_transactions, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Imports a list of transactions at once, nothing is created
+        unless every row is valid
+        """
+        rows = request.data
+        if not isinstance(rows, list):
+            rows = [rows]
+
+        importer = TransactionImporter(request.user)
+        if not importer.is_valid(rows):
+            return Response(importer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with db_transaction.atomic():
+            transactions = importer.save()
+            schedule_product_list_refresh(request.user.id)
+        return Response(
+            {"count": len(transactions), "ids": [t.id for t in transactions]},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=False, methods=["post"], parser_classes=[MultiPartParser])
+    def upload(self, request):
+        """
+        Stores a CSV/OFX bank statement and imports it into an account in the
+        background, the progress of the import is available at upload/<task_id>/
+        """
+        serializer = StatementUploadSerializer(
+            data=request.data, context=self.get_serializer_context()
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        statement_format = serializer.validated_data["format"]
+        user_id = str(request.user.id)
+        path = default_storage.save(
+            f"statements/{user_id}/{uuid4().hex}.{statement_format}",
+            serializer.validated_data["file"],
+        )
+        # task ids are prefixed with the user, only the owner can query them
+        task = import_statement.apply_async(
+            (user_id, serializer.validated_data["account"].id, path, statement_format),
+            {"decimal_separator": serializer.validated_data.get("decimal_separator")},
+            task_id=f"{user_id}-{uuid4()}",
+        )
+        return Response({"task_id": task.id}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=["get"], url_path=r"upload/(?P<task_id>[^/.]+)")
+    def upload_status(self, request, task_id=None):
+        if not task_id.startswith(f"{request.user.id}-"):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+
+        result = import_statement.AsyncResult(task_id)
+        data = {"task_id": task_id, "state": result.state}
+        if result.state == "PROGRESS":
+            data["progress"] = result.info
+        elif result.successful():
+            data["result"] = result.result
+        elif result.failed():
+            data["error"] = str(result.result)
+        return Response(data)
+
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
 
@@ -98,7 +203,7 @@ class TransactionViewSet(viewsets.ModelViewSet):
 
         serializer = self.get_serializer(transaction, data=request.data, partial=True)
 
-        amount = float(serializer.initial_data.get("amount"))
+        amount = serializer.initial_data.get("amount")
         decimal_places = Account.objects.get(
             pk=serializer.initial_data.get("account")
         ).decimal_places
@@ -109,32 +214,24 @@ class TransactionViewSet(viewsets.ModelViewSet):
             serializer.initial_data["to_main_currency_amount"] = None
 
         # Get conversion for the transaction date
-        conversion = (
-            CurrencyConversionHistorial.objects.filter(
-                currency_from=account.currency,
-                currency_to__name="USD",
-                date__lte=serializer.initial_data.get("date"),
-            )
-            .order_by("-date")
-            .first()
-        )
+        conversion = get_transaction_rate(account, serializer.initial_data.get("date"))
 
         if conversion:
             serializer.initial_data["to_main_currency_amount"] = int(
-                parse_amount(amount, 2) / conversion.rate
+                parse_amount(amount, 2) / conversion
             )
 
         if serializer.is_valid():
             serializer.save()
-            update_reports.delay(transaction.account.id)
-            update_user_product_list_items.delay(transaction.user.id)
+            # the items may have been replaced, don't render the prefetched ones
+            transaction._prefetched_objects_cache = {}
+            schedule_product_list_refresh(transaction.user.id)
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def destroy(self, request, *args, **kwargs):
         transaction_pk = self.get_queryset().get(pk=kwargs["pk"])
-        update_reports.delay(transaction_pk.account.id)
-        update_user_product_list_items.delay(transaction_pk.user.id)
+        schedule_product_list_refresh(transaction_pk.user.id)
         return super().destroy(request, *args, **kwargs)
 
 
@@ -146,6 +243,7 @@ class CurrencyExchangeViewSet(viewsets.ModelViewSet):
     serializer_class = CurrencyExchangeSerializer
     filter_backends = (DjangoFilterBackend, filters.OrderingFilter)
     filterset_class = TransactionFilterSet
+    pagination_class = DateKeysetPagination
     ordering_fields = ["date"]
     permission_classes = (
         IsAuthenticated,
@@ -153,138 +251,35 @@ class CurrencyExchangeViewSet(viewsets.ModelViewSet):
     )
 
     def get_queryset(self):
-        return CurrencyExchange.objects.filter(user=self.request.user)
+        return CurrencyExchange.objects.filter(user=self.request.user).select_related("account")
 
     def create(self, request):
-        try:
-            account_from = Account.objects.get(pk=request.data["from_account"])
-            account_to = Account.objects.get(pk=request.data["to_account"])
-        except Account.DoesNotExist:
-            return Response(
-                {"errors": {"accounts": "Invalid Accounts"}},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        description = request.data.get(
-            "description", f"Exchange from {account_from.name} to {account_to.name}"
-        )
-
-        from_amount = float(request.data.get("from_amount"))
-        from_decimal_places = account_from.decimal_places
-        request.data["from_amount"] = parse_amount(from_amount, from_decimal_places)
-
-        to_amount = float(request.data.get("to_amount"))
-        to_decimal_places = account_to.decimal_places
-        request.data["to_amount"] = parse_amount(to_amount, to_decimal_places)
-
-        comission_amount = request.data["from_amount"] - request.data["to_amount"]
-
-        from_account_transaction_data = {
-            "amount": -float(request.data["from_amount"]) - (
-                -comission_amount if account_from.currency == account_to.currency else 0
-            ),
-            "account": request.data["from_account"],
-            "description": description,
-            "date": request.data["date"],
-        }
-        to_account_transaction_data = {
-            "amount": float(request.data["to_amount"]),
-            "account": request.data["to_account"],
-            "description": description,
-            "date": request.data["date"],
-        }
-
-        # check if categories "Exchanges" and "Exchanges Income exists"
-        try:
-            category_from = Category.objects.get(name="Exchanges")
-            category_to = Category.objects.get(name="Exchanges Income")
-            category_comission = Category.objects.get(name="Comissions")
-        except Category.DoesNotExist:
-            category_from = None
-            category_to = None
-            category_comission = None
-
-        if category_from:
-            from_account_transaction_data["category"] = category_from.id
-        if category_to:
-            to_account_transaction_data["category"] = category_to.id
-
-        # check if the from_account and to_account are the same currency
-        if account_from.currency == account_to.currency:
-            from_account_transaction_data["type"] = "from_same_currency"
-            to_account_transaction_data["type"] = "to_same_currency"
-        else:
-            from_account_transaction_data["type"] = "from_different_currency"
-            to_account_transaction_data["type"] = "to_different_currency"
-
-        transaction_from_serializer = self.get_serializer(
-            data=from_account_transaction_data
+        creator = CurrencyExchangeCreator(request.user, self.get_serializer_context())
+        if not creator.is_valid([request.data]):
+            return Response(creator.errors[0], status=status.HTTP_400_BAD_REQUEST)
+
+        (exchange,) = creator.save()
+        return Response(creator.get_data(exchange), status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Creates a list of exchanges at once, nothing is created
+        unless every exchange is valid
+        """
+        rows = request.data
+        if not isinstance(rows, list):
+            rows = [rows]
+
+        creator = CurrencyExchangeCreator(request.user, self.get_serializer_context())
+        if not creator.is_valid(rows):
+            return Response(creator.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        exchanges = creator.save()
+        return Response(
+            [creator.get_data(exchange) for exchange in exchanges],
+            status=status.HTTP_201_CREATED,
         )
-        transaction_to_serializer = self.get_serializer(
-            data=to_account_transaction_data
-        )
-
-        if transaction_from_serializer.is_valid():
-            from_account_transaction = transaction_from_serializer.save()
-        else:
-            return Response(
-                {"from_data": transaction_from_serializer.errors},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        if transaction_to_serializer.is_valid():
-            to_account_transaction = transaction_to_serializer.save()
-        else:
-            return Response(
-                {"to_data": transaction_to_serializer.errors},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        # Set the related_transaction field of the to_account_transaction
-        to_account_transaction.related_transaction = from_account_transaction
-        to_account_transaction.save()
-
-        # Set the related_transaction field of the from_account_transaction
-        from_account_transaction.related_transaction = to_account_transaction
-        from_account_transaction.save()
-
-        response = [
-            transaction_from_serializer.data,
-            transaction_to_serializer.data,
-        ]
-        # Create the comission transaction
-        if account_from.currency == account_to.currency and comission_amount != 0:
-            comission_transaction_data = {
-                "amount": request.data["to_amount"] - request.data["from_amount"],
-                "account": request.data["from_account"],
-                "description": f"Comission for {description}",
-                "date": request.data["date"],
-                "type": "comission"
-                if request.data["from_amount"] >= request.data["to_amount"]
-                else "profit",
-                "exchange_from": from_account_transaction.id,
-                "exchange_to": to_account_transaction.id,
-                "user": request.user.id,
-            }
-            if category_comission:
-                comission_transaction_data["category"] = category_comission.id
-
-            comission_transaction_serializer = ExchangeComissionSerializer(
-                data=comission_transaction_data
-            )
-
-            if comission_transaction_serializer.is_valid():
-                comission_transaction_serializer.save()
-                update_reports.delay(from_account_transaction.account.id)
-                update_reports.delay(to_account_transaction.account.id)
-                response.append(comission_transaction_serializer.data)
-            else:
-                return Response(
-                    {"comission_data": comission_transaction_serializer.errors},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-        return Response(response, status=status.HTTP_201_CREATED)
 
 
 class CategoryViewSet(viewsets.ModelViewSet):